@@ -0,0 +1,151 @@
+"""Headless batch assessment of recordings listed in a manifest.
+
+The manifest is a CSV or JSONL file with `audio_path`, `reference_text` and
+`language` fields (plus an optional `id`); `--language` fills in rows that leave
+the language empty. Results are appended to a JSONL file as they complete;
+re-running with the same output file skips items that already succeeded.
+
+    python batch_assess.py manifest.csv --output results.jsonl --workers 4 --rate 2
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import *
+from utils.audio_utils import prepare_pcm_audio, trim_silence
+from utils.rate_limit import RateLimiter, backoff_delay
+from utils.recognizer_pool import get_recognizer_pool
+from utils.result_cache import get_cached_assessment
+from utils.speech_router import get_speech_router
+
+
+def load_manifest(manifest_path, default_language=None):
+    """Items of a CSV or JSONL manifest; rows without a known language raise ValueError listing every one"""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding="utf-8") as f:
+        if manifest_path.endswith(".jsonl"):
+            rows = [(number, json.loads(line)) for number, line in enumerate(f, 1) if line.strip()]
+        else:
+            rows = list(enumerate(csv.DictReader(f), 2))  # line 1 is the header
+
+    items, problems = [], []
+    for number, row in rows:
+        language = row.get("language") or default_language
+        if language not in LANGUAGE_CONFIG:
+            problems.append(f"line {number}: " + (f"unknown language {language!r}" if language
+                                                  else "no language (add the column or pass --language)"))
+            continue
+        audio_path = row["audio_path"]
+        if not os.path.isabs(audio_path):
+            audio_path = os.path.join(base_dir, audio_path)
+        items.append({
+            'id': row.get("id") or row["audio_path"],
+            'audio_path': audio_path,
+            'reference_text': row["reference_text"],
+            'language': language
+        })
+    if problems:
+        raise ValueError(f"{manifest_path}: {len(problems)} rows cannot be assessed\n" + "\n".join(problems))
+    return items
+
+
+def load_finished_ids(output_path):
+    """IDs that already have a successful result, so a resumed run can skip them"""
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partially written line from an interrupted run
+            if record.get('success'):
+                finished.add(record['id'])
+    return finished
+
+
+def assess_item(item, rate_limiter, max_retries):
+    started = time.monotonic()
+    with open(item['audio_path'], "rb") as f:
+        audio_format = os.path.splitext(item['audio_path'])[1].lstrip(".").lower() or "wav"
+        pcm_audio = prepare_pcm_audio(f.read(), audio_format)
+    if pcm_audio is None:
+        return dict(item, success=False, error="Failed to process audio", attempts=0)
+    trimmed_seconds = 0.0
+    if VAD_ENABLED:
+        pcm_audio, trimmed_seconds = trim_silence(pcm_audio)
+
+    attempts = 0
+
+    def run_with_retries():
+        nonlocal attempts
+        pool = get_recognizer_pool()
+        for attempt in range(max_retries + 1):
+            attempts += 1
+            rate_limiter.acquire()
+            with pool.acquire(item['language']) as assessor:
+                result = assessor.assess_recording(pcm_audio, item['reference_text'])
+                retryable = not assessor.healthy
+
+            # Throttling and connection errors mark the assessor unhealthy; NoMatch and the like are final
+            if result['success'] or not retryable or attempt == max_retries:
+                return result
+            time.sleep(backoff_delay(attempt))
+
+    result = get_cached_assessment(pcm_audio, item['reference_text'], item['language'], run_with_retries)
+    return dict(item, **result, attempts=attempts, trimmed_seconds=round(trimmed_seconds, 3),
+                elapsed=round(time.monotonic() - started, 3))
+
+
+def run_batch(items, output_path, workers=BATCH_WORKERS, rate=BATCH_RATE_LIMIT, max_retries=BATCH_MAX_RETRIES):
+    finished = load_finished_ids(output_path)
+    pending = [item for item in items if item['id'] not in finished]
+    print(f"{len(items)} items, {len(items) - len(pending)} already done, {len(pending)} to assess", file=sys.stderr)
+
+    rate_limiter = RateLimiter(rate, burst=workers)
+    succeeded = 0
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(assess_item, item, rate_limiter, max_retries): item for item in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = dict(futures[future], success=False, error=f"Assessment error: {str(e)}")
+            succeeded += bool(record.get('success'))
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+    print(f"{succeeded}/{len(pending)} assessed successfully", file=sys.stderr)
+    return succeeded == len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assess a manifest of recordings without the web UI")
+    parser.add_argument("manifest", help="CSV or JSONL with audio_path, reference_text and language")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="concurrent Azure requests")
+    parser.add_argument("--rate", type=float, default=BATCH_RATE_LIMIT, help="max requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=BATCH_MAX_RETRIES, help="retries after throttling or errors")
+    parser.add_argument("--language", choices=list(LANGUAGE_CONFIG), help="for rows that leave language empty")
+    args = parser.parse_args()
+
+    try:
+        items = load_manifest(args.manifest, args.language)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    if not get_speech_router().endpoints:
+        sys.exit("Azure Speech Service not configured (set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION, "
+                 "or AZURE_SPEECH_ENDPOINTS, in secrets)")
+
+    ok = run_batch(items, args.output, args.workers, args.rate, args.retries)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
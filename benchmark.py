@@ -0,0 +1,194 @@
+"""Offline microbenchmarks for the audio and result-processing hot paths.
+
+Uses synthetic audio (1-60 s, mono/stereo, 44.1/48 kHz) and synthetic Azure
+detailed results (up to thousands of words with phonemes and prosody), so no
+Azure credentials or network access are needed. Each case reports time,
+throughput and peak traced memory, and is compared with the stored baseline.
+
+    python benchmark.py                  # compare with benchmark_baselines.json
+    python benchmark.py --save-baseline  # record the current machine's numbers
+    python benchmark.py --quick          # smaller inputs for a fast smoke run
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+from pydub import AudioSegment
+
+from config import BENCHMARK_BASELINE_PATH, BENCHMARK_REGRESSION_THRESHOLD
+from utils.assessment_result import AssessmentResult
+from utils.local_scoring import compare_features, extract_features
+from utils.pitch import track_pitch
+from utils.audio_utils import convert_audio_format, get_audio_duration, trim_silence
+from utils.result_html import build_result_html, build_reference_html
+from utils.speech_service import PronunciationAssessment
+
+ENGLISH_PHONEMES = ["h", "ə", "l", "oʊ", "w", "ɝ", "d", "θ", "æ", "ŋ", "k", "j", "u", "s", "t", "ɪ"]
+
+
+def make_audio(duration, frame_rate, channels):
+    """Speech-like test signal: a few harmonics with amplitude modulation and noise"""
+    rng = np.random.default_rng(int(duration * frame_rate) + channels)
+    t = np.arange(int(duration * frame_rate)) / frame_rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    signal = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+    signal = 0.2 * envelope * signal + 0.01 * rng.standard_normal(len(t))
+    samples = np.repeat(signal[:, None], channels, axis=1)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    return AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=frame_rate, channels=channels)
+
+
+def make_detailed_result(n_words, phonemes_per_word=4):
+    """Azure-shaped assessment result with word, phoneme and prosody details"""
+    rng = random.Random(n_words)
+    words = []
+    offset = 5_000_000
+    for i in range(n_words):
+        phonemes = []
+        for _ in range(phonemes_per_word):
+            duration = rng.randint(500_000, 1_500_000)
+            phonemes.append({
+                'Phoneme': rng.choice(ENGLISH_PHONEMES),
+                'PronunciationAssessment': {'AccuracyScore': rng.uniform(30, 100)},
+                'Offset': offset,
+                'Duration': duration
+            })
+            offset += duration
+        words.append({
+            'Word': f"word{i}",
+            'Offset': phonemes[0]['Offset'],
+            'Duration': offset - phonemes[0]['Offset'],
+            'PronunciationAssessment': {
+                'AccuracyScore': rng.uniform(30, 100),
+                'ErrorType': rng.choice(['None'] * 8 + ['Mispronunciation', 'Omission']),
+                'Feedback': {'Prosody': {
+                    'Break': {'ErrorTypes': ['None'], 'BreakLength': 0},
+                    'Intonation': {'ErrorTypes': [], 'Monotone': {'SyllablePitchDeltaConfidence': 0.9}}
+                }}
+            },
+            'Phonemes': phonemes
+        })
+    return {
+        'success': True,
+        'recognized_text': " ".join(w['Word'] for w in words),
+        'accuracy_score': 80.0, 'fluency_score': 75.0, 'completeness_score': 90.0,
+        'prosody_score': 70.0, 'pronunciation_score': 78.0,
+        'detailed_result': {'NBest': [{'Words': words}]}
+    }
+
+
+def build_cases(quick):
+    durations = [1, 10] if quick else [1, 10, 60]
+    word_counts = [10, 100] if quick else [10, 100, 1000, 5000]
+    cases = []
+
+    for duration in durations:
+        for frame_rate in (44100, 48000):
+            for channels in (1, 2):
+                audio = make_audio(duration, frame_rate, channels)
+                name = f"convert_audio_format/{duration}s/{frame_rate}Hz/{channels}ch"
+                cases.append((name, lambda a=audio: convert_audio_format(a), duration, "audio s/s"))
+        audio = make_audio(duration, 48000, 2)
+        cases.append((f"get_audio_duration/{duration}s", lambda a=audio: get_audio_duration(a), duration, "audio s/s"))
+        pcm = make_audio(duration, 16000, 1)
+        cases.append((f"trim_silence/{duration}s", lambda a=pcm: trim_silence(a, compress_pauses=True),
+                      duration, "audio s/s"))
+        samples = np.frombuffer(pcm.raw_data, dtype='<i2')
+        reference = extract_features(np.frombuffer(make_audio(duration * 1.1, 16000, 1).raw_data, dtype='<i2'))
+        cases.append((f"local_score/{duration}s",
+                      lambda s=samples, r=reference: compare_features(extract_features(s), r), duration, "audio s/s"))
+        cases.append((f"track_pitch/{duration}s", lambda s=samples: track_pitch(s), duration, "audio s/s"))
+
+    assessor = SimpleNamespace(language="English")
+    for n_words in word_counts:
+        result = make_detailed_result(n_words)
+        detailed = result['detailed_result']
+        assessment = AssessmentResult.from_result(result, "English")
+        cases.append((f"get_word_level_assessment/{n_words}w",
+                      lambda d=detailed: PronunciationAssessment.get_word_level_assessment(assessor, d),
+                      n_words, "words/s"))
+        cases.append((f"AssessmentResult.from_result/{n_words}w",
+                      lambda r=result: AssessmentResult.from_result(r, "English"), n_words, "words/s"))
+        # The two calls display_assessment_results makes, without and with phoneme analysis
+        cases.append((f"html/word_analysis/{n_words}w",
+                      lambda a=assessment: build_result_html(a, phonemes=False), n_words, "words/s"))
+        cases.append((f"html/all_sections/{n_words}w",
+                      lambda a=assessment: build_result_html(a), n_words, "words/s"))
+        romaji = [(f"単語{i}", f"tango{i}") for i in range(n_words)]
+        cases.append((f"html/reference/{n_words}w",
+                      lambda r=romaji: build_reference_html(r), n_words, "words/s"))
+    return cases
+
+
+def run_case(fn, min_repeats=5, min_time=0.5, max_repeats=200):
+    """Best wall time over repeated runs, then peak traced memory of one extra run"""
+    fn()  # warm caches such as resampling filters
+    best = float("inf")
+    started = time.perf_counter()
+    for repeat in range(max_repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+        if repeat + 1 >= min_repeats and time.perf_counter() - started > min_time:
+            break
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio and result-processing hot paths")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs for a fast run")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                        help="allowed slowdown versus baseline, e.g. 0.25 for 25%%")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':50} {'time':>10} {'throughput':>20} {'peak mem':>10} {'vs base':>8}")
+    for name, fn, units, unit_label in build_cases(args.quick):
+        if args.filter not in name:
+            continue
+        seconds, peak = run_case(fn)
+        results[name] = {'seconds': seconds, 'peak_bytes': peak}
+
+        change = ""
+        if name in baseline:
+            ratio = seconds / baseline[name]['seconds']
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio > 1 + args.threshold:
+                regressions.append((name, ratio))
+        print(f"{name:50} {seconds * 1000:8.2f}ms {units / seconds:14.0f} {unit_label:5} "
+              f"{peak / 1e6:8.1f}MB {change:>8}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        return
+
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} is {(ratio - 1) * 100:.0f}% slower than baseline")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
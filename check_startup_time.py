@@ -0,0 +1,67 @@
+"""Fail when a cold import of the app exceeds the startup budget.
+
+Runs `python -X importtime -c "import streamlit_app"` in a fresh interpreter,
+reports the slowest imports and exits non-zero if the total is over
+STARTUP_IMPORT_BUDGET_MS or if a module that should load lazily was imported.
+
+    python check_startup_time.py [--budget-ms 1000] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from config import STARTUP_IMPORT_BUDGET_MS, STARTUP_LAZY_MODULES
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_imports(module="streamlit_app"):
+    """Return {module name: (self µs, cumulative µs, depth)} for one cold import"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold import time of the app against a budget")
+    parser.add_argument("--module", default="streamlit_app")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="best of N runs, to smooth out disk cache noise")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to report")
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    timings = min(runs, key=lambda t: t[args.module][1])
+    total_ms = timings[args.module][1] / 1000
+
+    print(f"Cold import of {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    direct = [(name, t) for name, t in timings.items() if t[2] == 1]
+    for name, (_, cumulative_us, _) in sorted(direct, key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    eager = [name for name in STARTUP_LAZY_MODULES if name in timings]
+    for name in eager:
+        print(f"FAIL: {name} is imported at startup but should load on first use")
+    if total_ms > args.budget_ms:
+        print(f"FAIL: startup import time {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    sys.exit(1 if eager or total_ms > args.budget_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
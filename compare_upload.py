@@ -0,0 +1,83 @@
+"""Compare PCM and compressed (Ogg/Opus) upload on the same clip.
+
+Runs the clip through each upload format several times and reports bytes sent,
+encode time, end-to-end assessment latency and the resulting scores, so the
+bandwidth saving can be weighed against encode cost and any change in scoring.
+
+    python compare_upload.py recording.wav --language English --text "Hello world"
+    python compare_upload.py --backend fake --upload-kbps 1000   # synthetic clip, simulated uplink
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from config import *
+from utils.audio_utils import prepare_pcm_audio
+from utils.pcm_engine import encode_ogg_opus
+from utils.speech_service import PronunciationAssessment
+
+UPLOAD_FORMATS = ("pcm", "ogg_opus")
+
+
+def load_clip(path, seconds):
+    if path:
+        with open(path, "rb") as f:
+            return prepare_pcm_audio(f.read(), path.rsplit(".", 1)[-1].lower())
+    from benchmark import make_audio
+    return prepare_pcm_audio(make_audio(seconds, 48000, 2))
+
+
+def measure(assessor, audio, reference_text, runs):
+    latencies, results = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = assessor.assess_pronunciation(audio, reference_text)
+        latencies.append(time.perf_counter() - started)
+        results.append(result)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bytes sent and latency of PCM and Ogg/Opus upload")
+    parser.add_argument("audio", nargs="?", help="recording to assess (default: a synthetic clip)")
+    parser.add_argument("--language", default="English", choices=sorted(LANGUAGE_CONFIG))
+    parser.add_argument("--text", default="The quick brown fox jumps over the lazy dog.")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the synthetic clip")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", default="azure", choices=["azure", "fake"])
+    parser.add_argument("--upload-kbps", type=float, default=1000, help="simulated uplink for the fake backend")
+    args = parser.parse_args()
+
+    audio = load_clip(args.audio, args.seconds)
+    if audio is None:
+        raise SystemExit("Could not decode the recording")
+    print(f"Clip: {audio.duration_seconds:.1f}s, {len(audio.raw_data)} bytes of 16 kHz PCM")
+
+    started = time.perf_counter()
+    encoded = encode_ogg_opus(np.frombuffer(audio.raw_data, dtype='<i2'))
+    print(f"Ogg/Opus encode: {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{len(encoded) * 8 / audio.duration_seconds / 1000:.0f} kbit/s")
+
+    print(f"{'format':10} {'bytes sent':>12} {'ratio':>6} {'median ms':>10} {'min ms':>8} {'score':>6}")
+    baseline_bytes = None
+    for upload_format in UPLOAD_FORMATS:
+        options = {'upload_format': upload_format}
+        if args.backend == "fake":
+            options.update(upload_kbps=args.upload_kbps, jitter=0, failure_rate=0, seed=0)
+        assessor = PronunciationAssessment(args.language, args.backend, **options)
+        latencies, results = measure(assessor, audio, args.text, args.runs)
+        bytes_sent = assessor.backend.bytes_sent
+        baseline_bytes = baseline_bytes or bytes_sent
+        scores = [r['pronunciation_score'] for r in results if r.get('success')]
+        score = f"{statistics.mean(scores):6.1f}" if scores else "  fail"
+        print(f"{upload_format:10} {bytes_sent:>12} {bytes_sent / baseline_bytes:>6.2f} "
+              f"{statistics.median(latencies) * 1000:>10.0f} {min(latencies) * 1000:>8.0f} {score}")
+        for result in results:
+            if not result.get('success'):
+                print(f"  {upload_format} error: {result.get('error')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import streamlit as st
 
-# Azure Speech Service Configuration
-AZURE_SPEECH_KEY = st.secrets.get("AZURE_SPEECH_KEY", "")
-AZURE_SPEECH_REGION = st.secrets.get("AZURE_SPEECH_REGION", "")
-POE_API_KEY = st.secrets.get("POE_API_KEY", "")
+
+def get_secret(name):
+    """Read a secret (AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, POE_API_KEY) on first use, not at import"""
+    return st.secrets.get(name, "")
+
 
 # Language Settings
 LANGUAGE_CONFIG = {
@@ -17,6 +18,18 @@ LANGUAGE_CONFIG = {
 # Audio Settings
 SAMPLE_RATE = 16000
 MAX_RECORDING_DURATION = 60  # 1 minute
+AUDIO_CHUNK_FRAMES = 3200  # 200 ms of 16 kHz audio per stream write
+RESAMPLE_ZERO_CROSSINGS = 16  # sinc filter half-length, higher is sharper but slower
+RESAMPLE_ROLLOFF = 0.945  # lowpass cutoff as a fraction of the target Nyquist
+PCM_DITHER = True  # TPDF dither when quantizing to 16-bit
+CONTINUOUS_RESULT_TIMEOUT = 30  # extra seconds to wait for the service beyond the clip length
+AUDIO_UPLOAD_FORMAT = "pcm"  # "pcm", or "ogg_opus" to send about 1/8 of the bytes to Azure
+STREAMING_CAPTURE = False  # record over WebRTC and assess while the learner speaks (needs streamlit-webrtc)
+VAD_ENABLED = True  # trim silence before and after speech prior to upload
+VAD_ENERGY_MARGIN_DB = 12  # how far above the noise floor a frame must be to count as speech
+VAD_PADDING_MS = 250  # silence kept around speech so onsets and fluency pauses stay intact
+VAD_COMPRESS_PAUSES = False  # also shorten long pauses inside the recording
+VAD_MAX_PAUSE_MS = 1000  # length internal pauses are shortened to
 
 # Assessment Settings
 GRADING_SYSTEM = "HundredMark"
@@ -24,7 +37,119 @@ GRANULARITY = "Phoneme"
 ENABLE_MISCUE = True
 ENABLE_PROSODY = True
 
+# Recognizer Backend Settings
+RECOGNIZER_BACKEND = "azure"  # "azure", or "fake" to run without the service (load tests)
+FAKE_BACKEND_LATENCY = 0.6  # seconds of simulated service overhead per request
+FAKE_BACKEND_REAL_TIME_FACTOR = 0.15  # extra simulated seconds per second of audio
+FAKE_BACKEND_JITTER = 0.2  # standard deviation of the simulated delay, seconds
+FAKE_BACKEND_FAILURE_RATE = 0.01  # share of requests that fail like a service error
+FAKE_BACKEND_UPLOAD_KBPS = 0  # simulated uplink bandwidth in kbit/s, 0 for unlimited
+
+# Speech Endpoint Routing Settings
+# Endpoints come from the AZURE_SPEECH_ENDPOINTS secret (see README), plus AZURE_SPEECH_KEY/REGION if set
+ROUTER_MAX_ATTEMPTS = 3  # endpoints tried per assessment before the failure is returned
+ROUTER_DEFAULT_CONCURRENCY = 100  # concurrent requests per endpoint when not configured (Azure S0 default)
+ROUTER_LATENCY_DECAY = 0.2  # weight of the newest sample in each endpoint's latency average
+ROUTER_INITIAL_LATENCY = 1.0  # seconds assumed for an endpoint until it has been measured
+ROUTER_FAILURE_THRESHOLD = 3  # consecutive failures that open an endpoint's circuit
+ROUTER_OPEN_SECONDS = 30  # time an open circuit keeps traffic away before one trial request
+ROUTER_THROTTLE_SECONDS = 10  # back-off after the service answers 429 (TooManyRequests)
+
+# Recognizer Pool Settings
+RECOGNIZER_POOL_SIZE = 4  # warm recognizers kept per locale
+RECOGNIZER_IDLE_TIMEOUT = 120  # seconds before an idle connection is recycled
+RECOGNIZER_WARM_ON_STARTUP = 1  # assessors opened per language when the server starts, 0 to disable
+
+# Assessment Executor Settings
+ASSESSMENT_MAX_CONCURRENCY = 8  # assessments running at once across all sessions (Azure quota)
+ASSESSMENT_MAX_QUEUE = 32  # waiting assessments before new ones are turned away
+ASSESSMENT_POLL_INTERVAL = 0.5  # seconds between progress refreshes while a job is pending
+
+# Session Memory Settings
+SESSION_MEMORY_BUDGET = 32 * 1024 * 1024  # bytes of audio and results kept per browser session
+SESSION_MAX_ENTRIES = 50  # generated audio paths, results and recordings kept per session
+SESSION_MEMORY_PROCESS_BUDGET = 1024 * 1024 * 1024  # all sessions of one replica together
+
+# Result Cache Settings
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH = ".cache/assessments.sqlite3"
+RESULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+RESULT_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# Practice Corpus Settings
+CORPUS_DIR = "corpus"  # <language>.tsv files with one "level<TAB>sentence" per line
+CORPUS_INDEX_DIR = ".cache/corpus"
+CORPUS_LEVELS = ("Beginner", "Intermediate", "Advanced")
+CORPUS_PAGE_SIZE = 6  # practice texts shown per page
+CORPUS_QUERY_CACHE_SIZE = 64  # filter combinations whose matches are kept per language
+CORPUS_DIGRAPHS = {  # letter groups indexed as one sound, longest first
+    "English": ("tch", "th", "sh", "ch", "ng", "ph", "wh", "ck", "qu"),
+    "German": ("tsch", "sch", "ch", "ei", "ie", "eu", "äu", "pf", "ng", "ß")
+}
+
+# Learner History Settings
+HISTORY_ENABLED = True
+HISTORY_PATH = ".cache/history.sqlite3"
+HISTORY_WINDOW = 5000  # attempts considered when ranking a learner's weakest phonemes
+HISTORY_MIN_PHONEME_COUNT = 5  # ignore phonemes seen fewer times than this in the window
+HISTORY_ERROR_SCORE = 60  # phoneme scores below this count as errors
+
+# Batch Assessment Settings
+BATCH_WORKERS = 4  # concurrent Azure requests
+BATCH_RATE_LIMIT = 2.0  # requests per second, 0 for unlimited
+BATCH_MAX_RETRIES = 3
+
+# Text-to-Speech Settings
+TTS_MODEL = "ElevenLabs-v3"
+TTS_API_URL = "https://api.poe.com/v1/chat/completions"
+TTS_CACHE_DIR = ".cache/tts"
+TTS_CACHE_MAX_BYTES = 500 * 1024 * 1024
+TTS_PREFETCH_ON_STARTUP = True  # generate audio for every sample text in the background
+TTS_PREFETCH_WORKERS = 4
+
+# Local Scoring Settings
+LOCAL_SCORING_ENABLED = True  # offer an offline quick check against the reference audio
+LOCAL_SCORING_CACHE_DIR = ".cache/reference_features"
+LOCAL_SCORING_MEMORY_ENTRIES = 64  # reference clips whose features stay in memory
+LOCAL_DTW_BAND = 0.15  # Sakoe-Chiba band radius as a fraction of the longer clip
+LOCAL_SIMILARITY_RANGE = (0.2, 0.8)  # mean aligned MFCC cosine distances scored 100 and 0
+LOCAL_RHYTHM_TOLERANCE = 1.0  # mean |log2| local tempo deviation that scores 0 for rhythm
+
+# Tone Analysis Settings
+TONE_LANGUAGES = ["Mandarin", "Cantonese"]  # languages whose results include a pitch contour per syllable
+PITCH_MIN_F0 = 70
+PITCH_MAX_F0 = 500
+PITCH_YIN_THRESHOLD = 0.2  # YIN aperiodicity above which a frame counts as unvoiced
+PITCH_MIN_POWER_DB = -55  # frames quieter than this are unvoiced
+PITCH_CACHE_SIZE = 32  # recordings whose pitch tracks stay in memory
+TONE_CHANGE_SEMITONES = 2  # pitch movement within a syllable heard as rising or falling
+
+# HTTP Client Settings
+HTTP_POOL_SIZE = 16  # keep-alive connections per host
+HTTP_MAX_CONCURRENCY = 8  # in-flight requests across the process
+HTTP_MAX_RETRIES = 3  # on 429/5xx and connection errors
+HTTP_TIMEOUT = 30  # seconds per attempt
+HTTP_DEADLINE = 60  # seconds for a request including retries
+
+# Metrics Settings
+METRICS_ENABLED = True  # per-stage latency histograms, error counters and gauges
+METRICS_PORT = 0  # serve Prometheus metrics on this port, 0 to disable
+METRICS_LOG = False  # also log every measurement as a JSON line
+
+# Japanese Romanization
+ROMANIZATION_CACHE_SIZE = 4096  # distinct words/texts kept converted in memory
+
+# Startup Budget (checked by check_startup_time.py)
+STARTUP_IMPORT_BUDGET_MS = 1000
+STARTUP_LAZY_MODULES = ["azure.cognitiveservices.speech", "requests", "numpy", "pykakasi", "jaconv",
+                        "soundfile", "streamlit_webrtc", "openai", "cutlet"]
+
+# Benchmarks (benchmark.py)
+BENCHMARK_BASELINE_PATH = "benchmark_baselines.json"
+BENCHMARK_REGRESSION_THRESHOLD = 0.25  # fail when a case is more than 25% slower than its baseline
+
 # UI Configuration
 PAGE_TITLE = "Multilingual Pronunciation Assessment"
 PAGE_ICON = "🗣️"
-LAYOUT = "centered"
\ No newline at end of file
+LAYOUT = "centered"
+DEBUG_MODE = False  # keep the raw Azure JSON in session state and show it under the results
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""Measure how many concurrent learners one replica can serve.
+
+Drives N simulated sessions through the same convert -> assess -> parse path as
+the app, using the fake recognizer backend by default so no Azure quota is
+spent. Each session records, waits a think time and submits again. For every
+concurrency level it reports p50/p95/p99 latency, throughput, errors, CPU use
+and peak memory of this process. Latencies are measured from the end of the
+recording; with --streaming, sessions push 20 ms chunks in real time while
+"recording", as the live capture mode does.
+
+    python load_test.py --sessions 1,5,10,20 --duration 30
+    python load_test.py --sessions 10 --latency 1.0 --jitter 0.5 --failure-rate 0.05
+    python load_test.py --sessions 1,5 --audio-seconds 60 --streaming
+    python load_test.py --sessions 20 --endpoints fast:0.3,slow:1.5,flaky:0.4:0.5,tight:0.3:0:2:8
+    python load_test.py --backend azure --sessions 2 --duration 20   # real service, uses quota
+"""
+import argparse
+import random
+import resource
+import statistics
+import threading
+import time
+
+from benchmark import make_audio
+from config import *
+from utils.assessment_result import AssessmentResult
+from utils.audio_utils import prepare_pcm_audio, trim_silence
+from utils.corpus import get_corpus
+from utils.live_capture import LiveAssessment
+from utils.recognizer_pool import RecognizerPool
+from utils.speech_router import SpeechEndpoint, SpeechRouter
+
+STAGES = ("convert", "assess", "parse", "total")
+
+
+def run_request(pool, audio, reference_text, language):
+    """One submission through the app's pipeline; returns (stage timings, success)"""
+    timings = {}
+    started = time.perf_counter()
+    pcm_audio = prepare_pcm_audio(audio)
+    if VAD_ENABLED:
+        pcm_audio, _ = trim_silence(pcm_audio)
+    timings['convert'] = time.perf_counter() - started
+
+    t0 = time.perf_counter()
+    with pool.acquire(language) as assessor:
+        result = assessor.assess_recording(pcm_audio, reference_text)
+    timings['assess'] = time.perf_counter() - t0
+    if not result or not result.get('success'):
+        return timings, False
+
+    t0 = time.perf_counter()
+    AssessmentResult.from_result(result, language)
+    timings['parse'] = time.perf_counter() - t0
+    timings['total'] = time.perf_counter() - started
+    return timings, True
+
+
+def run_streaming_request(pool, audio, reference_text, language):
+    """Push the clip in real time while it is "recorded", then time everything after Stop"""
+    live = LiveAssessment(language, reference_text, pool)
+    chunk_ms = 20
+    chunk_bytes = audio.frame_rate * chunk_ms // 1000 * audio.frame_width
+    data = audio.raw_data
+    started = time.perf_counter()
+    convert = 0.0
+    for index, start in enumerate(range(0, len(data), chunk_bytes)):
+        t0 = time.perf_counter()
+        live.feed(data[start:start + chunk_bytes], audio.frame_rate, audio.channels, audio.sample_width)
+        convert += time.perf_counter() - t0
+        time.sleep(max(0.0, started + (index + 1) * chunk_ms / 1000 - time.perf_counter()))
+
+    timings = {'convert': convert}
+    stopped = time.perf_counter()
+    result = None
+    for result in live.finish():
+        pass
+    timings['assess'] = time.perf_counter() - stopped
+    if not result or not result.get('success'):
+        return timings, False
+
+    t0 = time.perf_counter()
+    AssessmentResult.from_result(result, language)
+    timings['parse'] = time.perf_counter() - t0
+    timings['total'] = time.perf_counter() - stopped
+    return timings, True
+
+
+def run_session(pool, language, texts, audio, deadline, think_time, samples, rng, streaming=False):
+    request = run_streaming_request if streaming else run_request
+    while time.monotonic() < deadline:
+        timings, success = request(pool, audio, rng.choice(texts), language)
+        samples.append((timings, success))
+        time.sleep(rng.uniform(0.5, 1.5) * think_time)
+
+
+def percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def run_level(sessions, args, pool, texts, audio):
+    samples = []
+    deadline = time.monotonic() + args.duration
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+
+    threads = [threading.Thread(target=run_session,
+                                args=(pool, args.language, texts, audio, deadline, args.think_time, samples,
+                                      random.Random(i), args.streaming),
+                                daemon=True)
+               for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    succeeded = [timings for timings, success in samples if success]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(succeeded),
+        'throughput': len(succeeded) / elapsed,
+        'stages': {stage: percentiles([t[stage] for t in succeeded]) for stage in STAGES},
+        'cpu_percent': 100 * cpu / elapsed,
+        'max_rss_mb': usage_after.ru_maxrss / 1024  # kilobytes on Linux
+    }
+
+
+def build_router(spec, args):
+    """Router over local stand-in endpoints given as name:latency[:failure_rate[:quota[:max_concurrency]]]
+
+    quota is the concurrency the simulated service accepts before answering 429;
+    max_concurrency is what the router believes it may send (default: the quota).
+    """
+    endpoints = []
+    for item in spec.split(","):
+        name, *values = item.split(":")
+        latency, failure_rate, quota, max_concurrency = (
+            [float(v) for v in values] + [args.latency, args.failure_rate, 0, 0][len(values):])
+        endpoints.append(SpeechEndpoint(
+            name, backend="fake", max_concurrency=int(max_concurrency or quota or ROUTER_DEFAULT_CONCURRENCY),
+            service_concurrency=int(quota) or None, latency=latency, real_time_factor=args.real_time_factor,
+            jitter=args.jitter, failure_rate=failure_rate))
+    return SpeechRouter(endpoints)
+
+
+def print_router_stats(router):
+    for endpoint in router.stats():
+        latency = f"{endpoint['latency'] * 1000:.0f}ms" if endpoint['latency'] is not None else "-"
+        print(f"    {endpoint['name']:>12} {endpoint['requests']:>6} requests, latency {latency:>7}, "
+              f"{endpoint['errors']} errors, {endpoint['throttled']} throttled, "
+              f"{endpoint['circuit_opens']} circuit opens, now {endpoint['circuit']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the assessment pipeline with simulated learners")
+    parser.add_argument("--sessions", default="1,5,10,20", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per concurrency level")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean pause between submissions")
+    parser.add_argument("--audio-seconds", type=float, default=5, help="length of each recording")
+    parser.add_argument("--language", default="English", choices=sorted(LANGUAGE_CONFIG))
+    parser.add_argument("--backend", default="fake", choices=["fake", "azure"])
+    parser.add_argument("--streaming", action="store_true", help="push audio while recording (live capture)")
+    parser.add_argument("--latency", type=float, default=FAKE_BACKEND_LATENCY)
+    parser.add_argument("--real-time-factor", type=float, default=FAKE_BACKEND_REAL_TIME_FACTOR)
+    parser.add_argument("--jitter", type=float, default=FAKE_BACKEND_JITTER)
+    parser.add_argument("--failure-rate", type=float, default=FAKE_BACKEND_FAILURE_RATE)
+    parser.add_argument("--endpoints", help="route over stand-in endpoints, see build_router()")
+    args = parser.parse_args()
+
+    backend_options = {}
+    router = None
+    if args.endpoints:
+        router = build_router(args.endpoints, args)
+        args.backend, backend_options = "azure", {'router': router}
+    elif args.backend == "fake":
+        backend_options = {'latency': args.latency, 'real_time_factor': args.real_time_factor,
+                           'jitter': args.jitter, 'failure_rate': args.failure_rate}
+    texts = get_corpus(args.language).search(limit=1000)[0]
+    audio = make_audio(args.audio_seconds, 48000, 2)  # what the browser recorder typically delivers
+
+    print(f"{'sessions':>8} {'requests':>8} {'errors':>6} {'req/s':>7} "
+          + " ".join(f"{stage + ' p50/p95/p99 (ms)':>26}" for stage in STAGES)
+          + f" {'cpu':>6} {'max rss':>9}")
+    for sessions in [int(level) for level in args.sessions.split(",")]:
+        pool = RecognizerPool(max_idle=sessions, backend=args.backend, backend_options=backend_options)
+        report = run_level(sessions, args, pool, texts, audio)
+        stages = " ".join("{:>26}".format("/".join(f"{p * 1000:.0f}" for p in report['stages'][stage]))
+                          for stage in STAGES)
+        print(f"{sessions:>8} {report['requests']:>8} {report['errors']:>6} {report['throughput']:>7.2f} "
+              f"{stages} {report['cpu_percent']:>5.0f}% {report['max_rss_mb']:>7.0f}MB")
+        if router is not None:
+            print_router_stats(router)
+
+
+if __name__ == "__main__":
+    main()
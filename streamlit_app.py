@@ -1,16 +1,36 @@
+import queue
+import time
 import streamlit as st
 from audiorecorder import audiorecorder
-from utils.speech_service import PronunciationAssessment, generate_speech_audio
-from utils.audio_utils import convert_audio_format, save_audio_to_temp_file, cleanup_temp_file, get_audio_duration
-from utils.language_utils import get_sample_texts, get_romanization_with_words, get_pronunciation_tips
+from utils.tts_cache import get_speech_audio, get_tts_cache, prefetch_sample_audio
+from utils.assessment_executor import get_assessment_executor
+from utils.session_store import SessionStore, get_session_stats
+from utils.history_store import get_history_store
+from utils.recognizer_pool import get_recognizer_pool, warm_up_recognizers
+from utils.result_cache import get_cached_assessment, get_result_cache
+from utils.assessment_result import AssessmentResult
+from utils.result_html import build_result_html, build_reference_html, build_score_cards_html
+from utils.metrics import count_error, set_gauge, span, start_metrics_server
+from utils.audio_utils import prepare_pcm_audio, trim_silence, get_audio_duration
+from utils.language_utils import get_romanization_with_words, get_pronunciation_tips
+from utils.corpus import get_corpus
+from utils.lazy_import import lazy_import
+from utils.live_capture import LiveAssessment
+from utils.local_scoring import quick_score
+from utils.pitch import get_pitch_track, syllable_tones
 from config import *
 
+np = lazy_import("numpy")
+webrtc = lazy_import("streamlit_webrtc")
+
 st.set_page_config(page_title=PAGE_TITLE, page_icon=PAGE_ICON, layout=LAYOUT)
 
 # Mobile-friendly CSS
 st.markdown("""
 <style>
+    .metric-row { display: flex; flex-wrap: wrap; }
     .metric-card {
+        flex: 1 1 20%;
         background-color: #f8f9fa;
         padding: 0.3rem;
         border-radius: 0.3rem;
@@ -48,7 +68,7 @@ st.markdown("""
     .phoneme-score { color: #666; }
     .phoneme-letter { color: #333; }
     @media (max-width: 768px) {
-        .metric-card { padding: 0.2rem; }
+        .metric-card { padding: 0.2rem; flex-basis: 40%; }
         .metric-card h3 { font-size: 0.8rem; margin: 0; }
         .metric-card h2 { font-size: 1.2rem; margin: 0; }
     }
@@ -56,85 +76,377 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+def stream_segment_results(results):
+    """Show each segment as Azure finishes it and return the aggregated result"""
+    progress = st.empty()
+    recognized = []
+    for segment in results:
+        if segment.get('final'):
+            progress.empty()
+            return segment
+        recognized.append(segment['recognized_text'])
+        progress.info(f"🗣️ Segment {segment['segment_index'] + 1} "
+                      f"(accuracy {segment['accuracy_score']:.0f}): {' '.join(recognized)}")
+    return {'success': False, 'error': "No result"}
+
+
 def assess_pronunciation(reference_text, audio_data, language, enable_word_analysis, enable_phoneme_analysis):
-    with st.spinner("🔄 Analyzing pronunciation..."):
-        try:
-            wav_data = convert_audio_format(audio_data, "webm", "wav")
-            if not wav_data:
-                st.error("Failed to process audio")
-                return
-
-            temp_audio_file = save_audio_to_temp_file(wav_data, "wav")
-            if not temp_audio_file:
-                st.error("Failed to save audio file")
-                return
-
-            assessor = PronunciationAssessment(language)
-            result = assessor.assess_pronunciation(temp_audio_file, reference_text)
-            cleanup_temp_file(temp_audio_file)
-
-            if result['success']:
-                st.session_state['assessment_result'] = {
-                    'result': result,
-                    'reference_text': reference_text,
-                    'language': language,
-                    'assessor': assessor,
-                    'enable_word_analysis': enable_word_analysis,
-                    'enable_phoneme_analysis': enable_phoneme_analysis
-                }
-            else:
-                st.error(f"Assessment failed: {result['error']}")
+    """Queue the recording on the shared executor; display_assessment_results polls the job"""
+    st.session_state['assessment_job'] = get_assessment_executor().submit(
+        lambda job: run_assessment_job(job, audio_data),
+        reference_text=reference_text,
+        language=language,
+        enable_word_analysis=enable_word_analysis,
+        enable_phoneme_analysis=enable_phoneme_analysis
+    )
+
+
+def run_assessment_job(job, audio_data):
+    """Convert, assess and parse one recording on an executor thread, reporting progress on the job"""
+    reference_text, language = job.details['reference_text'], job.details['language']
+    with span("assessment_total"):
+        started = time.perf_counter()
+        pcm_audio = prepare_pcm_audio(audio_data, "webm")
+        if pcm_audio is None:
+            count_error("audio_conversion")
+            return {'success': False, 'error': "Failed to process audio"}
+        if VAD_ENABLED:
+            pcm_audio, job.details['trimmed_seconds'] = trim_silence(pcm_audio)
+
+        def run_assessment():
+            with get_recognizer_pool().acquire(language) as assessor:
+                return assessor.assess_recording(pcm_audio, reference_text, job.segments.append)
+
+        with span("assessment"):
+            result = get_cached_assessment(pcm_audio, reference_text, language, run_assessment)
+
+        audio_duration = len(pcm_audio) / 1000.0
+        set_gauge("audio_duration_seconds", audio_duration)
+        if audio_duration > 0:
+            set_gauge("real_time_factor", (time.perf_counter() - started) / audio_duration)
+
+        if result['success']:
+            with span("result_parse"):
+                job.assessment = AssessmentResult.from_result(result, language)
+            if language in TONE_LANGUAGES:
+                try:
+                    with span("pitch"):
+                        job.details['pitch_track'] = get_pitch_track(np.frombuffer(pcm_audio.raw_data, dtype='<i2'))
+                except Exception:
+                    count_error("pitch")  # tone feedback is optional, the assessment still stands
+        return result
+
+
+@st.fragment(run_every=ASSESSMENT_POLL_INTERVAL)
+def show_assessment_progress():
+    """Refresh only this part of the page while the submitted job is queued or running"""
+    job = st.session_state.get('assessment_job')
+    if job is None:
+        return
+    if job.done:
+        st.rerun()  # once, to render the results with the rest of the page
+
+    if job.status == "queued":
+        position = get_assessment_executor().queue_position(job)
+        st.info(f"⏳ Waiting for a free slot (position {position} in queue)...")
+        return
+
+    trimmed_seconds = job.details.get('trimmed_seconds', 0)
+    if trimmed_seconds >= 0.5:
+        st.caption(f"✂️ Trimmed {trimmed_seconds:.1f}s of silence before analysis")
+    segments = list(job.segments)
+    if segments:
+        recognized = " ".join(segment['recognized_text'] for segment in segments)
+        st.info(f"🗣️ Segment {len(segments)} (accuracy {segments[-1]['accuracy_score']:.0f}): {recognized}")
+    else:
+        st.info("🔄 Analyzing pronunciation...")
+
+
+def forget_widgets_on_text_change(reference_text, language, *keys):
+    """Clear the state of widgets with stable keys once the practice text changes.
+
+    Keying widgets by text would add a session-state entry for every sentence
+    practiced; a fixed key that is reset here keeps one entry per widget.
+    """
+    practice = (language, reference_text)
+    if st.session_state.get('practice_text') != practice:
+        for key in keys:
+            st.session_state.pop(key, None)
+        st.session_state['practice_text'] = practice
+
+
+def get_session_store():
+    """This session's bounded store for generated audio, results and recordings"""
+    if 'store' not in st.session_state:
+        st.session_state['store'] = SessionStore()
+    return st.session_state['store']
+
+
+def store_assessment(result, reference_text, language, enable_word_analysis, enable_phoneme_analysis,
+                     assessment=None, pitch_track=None):
+    if result['success']:
+        if assessment is None:
+            with span("result_parse"):
+                assessment = AssessmentResult.from_result(result, language)
+        data = {
+            'assessment': assessment,
+            'reference_text': reference_text,
+            'language': language,
+            'enable_word_analysis': enable_word_analysis,
+            'enable_phoneme_analysis': enable_phoneme_analysis,
+            'pitch_track': pitch_track
+        }
+        if DEBUG_MODE:
+            data['result'] = result
+        get_session_store().put('assessment_result', data)
+        record_attempt(assessment, reference_text, language)
+    else:
+        count_error("assessment")
+        st.error(f"Assessment failed: {result['error']}")
+
+
+def sample_text_picker(corpus, language):
+    """One page of practice texts filtered by level, length and sound, plus a random pick"""
+    col1, col2 = st.columns([2, 1])
+    level = col1.radio("Level:", CORPUS_LEVELS, horizontal=True, key=f"corpus_level_{language}")
+    unit_counts = dict(sorted(corpus.unit_counts(), key=lambda item: -item[1]))
+    unit = col2.selectbox("Containing sound:", [None, *unit_counts], key=f"corpus_unit_{language}",
+                          format_func=lambda u: "Any" if u is None else f"{u} ({unit_counts[u]} texts)",
+                          help="A mora, character or spelling, most common first")
+    shortest, longest = corpus.length_range()
+    min_length, max_length = None, None
+    if longest > shortest:
+        min_length, max_length = st.slider("Length:", shortest, longest, (shortest, longest),
+                                           key=f"corpus_length_{language}")
+
+    filters = {'level': level, 'min_length': min_length, 'max_length': max_length, 'unit': unit}
+    # One page index for the current filters; changing language or any filter starts again at page 1
+    position = (language, tuple(filters.values()))
+    saved_position, page = st.session_state.get('corpus_page', (None, 0))
+    if saved_position != position:
+        page = 0
+    texts, total = corpus.search(offset=page * CORPUS_PAGE_SIZE, **filters)
+    if not texts:
+        st.write("No texts match these filters")
+        return
+
+    cols = st.columns(min(len(texts), 3))
+    for i, text in enumerate(texts):
+        if cols[i % len(cols)].button(text, key=f"corpus_{language}_{page}_{i}"):
+            st.session_state.selected_text = text
+
+    pages = (total + CORPUS_PAGE_SIZE - 1) // CORPUS_PAGE_SIZE
+    col1, col2, col3, col4 = st.columns([1, 2, 1, 1])
+    if col1.button("◀", key=f"corpus_prev_{language}", disabled=page == 0):
+        st.session_state['corpus_page'] = (position, page - 1)
+        st.rerun()
+    col2.caption(f"Page {page + 1} of {pages} ({total} texts)")
+    if col3.button("▶", key=f"corpus_next_{language}", disabled=page + 1 >= pages):
+        st.session_state['corpus_page'] = (position, page + 1)
+        st.rerun()
+    if col4.button("🎲 Random", key=f"corpus_random_{language}"):
+        st.session_state.selected_text = corpus.sample(**filters)
+
+
+def quick_check(reference_text, audio_data, language):
+    """Offline comparison with the generated reference audio, for fast try-again loops without Azure"""
+    reference_path = get_tts_cache().get_path(reference_text, language)  # None if it has been evicted
+    if not reference_path:
+        st.info("Generate the audio first, the quick check compares your recording with it")
+        return
+    pcm_audio = prepare_pcm_audio(audio_data, "webm")
+    if pcm_audio is None:
+        count_error("audio_conversion")
+        return
+    result = quick_score(pcm_audio, reference_path)
+    if not result['success']:
+        count_error("local_score")
+        st.warning(result['error'])
+        return
+
+    scores = [("Similarity", result['similarity_score']), ("Rhythm", result['rhythm_score'])]
+    scores += [(label, result[key]) for label, key in (("Stress", 'stress_score'), ("Intonation", 'intonation_score'))
+               if result[key] is not None]
+    st.markdown(build_score_cards_html(scores), unsafe_allow_html=True)
+    st.caption(f"Quick check against the reference audio: you took {result['tempo_ratio']:.1f}x its time. "
+               "Use Assess for word and phoneme scores.")
 
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+
+def get_learner():
+    """Name the learner entered for progress tracking, or "" when history is off"""
+    if not HISTORY_ENABLED:
+        return ""
+    return st.session_state.get('learner', "").strip()
+
+
+def record_attempt(assessment, reference_text, language):
+    learner = get_learner()
+    if not learner:
+        return
+    try:
+        with span("history_record"):
+            get_history_store().record_attempt(learner, language, reference_text, assessment)
+    except Exception:
+        count_error("history")  # losing one history row must not hide the result
+
+
+def display_progress(language):
+    """Recent overall scores and the learner's weakest phonemes"""
+    learner = get_learner()
+    if not learner:
+        return
+    with st.expander("📈 My Progress"):
+        history = get_history_store()
+        attempts = history.recent_attempts(learner, language)
+        if not attempts:
+            st.write("No attempts recorded yet")
+            return
+        st.write(f"**Last {len(attempts)} attempts:**")
+        st.line_chart([attempt['pronunciation'] for attempt in attempts])
+
+        weakest = history.weakest_phonemes(learner, language)
+        if weakest:
+            st.write("**🔤 Sounds to practice:**")
+            st.table([{
+                'Phoneme': row['phoneme'],
+                'Average': f"{row['average_score']:.0f}",
+                'Errors': f"{row['error_rate']:.0%}",
+                'Times heard': row['count']
+            } for row in weakest])
+
+        recent = {f"#{a['id']} {a['reference_text'][:40]} ({a['pronunciation'] or 0:.0f})": a['id']
+                  for a in reversed(attempts)}
+        label = st.selectbox("Review an attempt:", list(recent), key="history_attempt")
+        words = history.attempt_words(recent[label]) if label else None
+        if words:
+            st.table([{
+                'Word': word,
+                'Accuracy': f"{accuracy:.0f}",
+                'Error': error_type,
+                'Phonemes': " ".join(f"{phoneme}:{score:.0f}" for phoneme, score in phonemes)
+            } for word, accuracy, error_type, phonemes in words])
+
+
+def live_capture(reference_text, language):
+    """Record over WebRTC and assess while the learner speaks, so results follow Stop almost at once"""
+    key = f"live_{language}_{hash(reference_text)}"  # session store entry, which is bounded
+    col1, col2 = st.columns(2)
+    enable_word_analysis = col1.checkbox("Word Analysis", True, key="live_words")
+    enable_phoneme_analysis = col2.checkbox("Phoneme Analysis", True, key="live_phonemes")
+
+    store = get_session_store()
+    previous_key = st.session_state.get('live_key')
+    if previous_key is not None and previous_key != key:
+        abandoned = store.pop(previous_key)  # recording for another text or language
+        if abandoned is not None:
+            abandoned.close()
+    st.session_state['live_key'] = key
+
+    ctx = webrtc.webrtc_streamer(
+        key="webrtc_live",
+        mode=webrtc.WebRtcMode.SENDONLY,
+        audio_receiver_size=1024,
+        media_stream_constraints={"audio": True, "video": False}
+    )
+    live = store.get(key)
+    if live is not None and live.recognition is not None and not live.finished and not ctx.state.playing:
+        # Stop was pressed: only the last segment is still being recognized
+        with st.spinner("🔄 Finishing analysis..."), span("assessment_total"):
+            try:
+                result = stream_segment_results(live.finish())
+                store_assessment(result, reference_text, language, enable_word_analysis, enable_phoneme_analysis)
+            except Exception as e:
+                count_error("assessment")
+                st.error(f"Error: {str(e)}")
+    if live is None or live.finished:
+        live = LiveAssessment(language, reference_text)
+        store.put(key, live)
+
+    status = st.empty()
+    while ctx.state.playing and ctx.audio_receiver:
+        try:
+            frames = ctx.audio_receiver.get_frames(timeout=1)
+        except queue.Empty:
+            continue
+        for frame in frames:
+            live.feed_frame(frame)
+        store.resize(key)
+        status.caption(f"🎙️ Listening... {live.duration:.1f}s")
+
+
+def display_tones(assessment, pitch_track, language):
+    """Pitch contour of the recording and the contour heard on each syllable"""
+    rows = syllable_tones(pitch_track, assessment)
+    if not rows:
+        return
+    st.write("**🎵 Tones:**")
+    st.line_chart({
+        'Time (s)': np.arange(len(pitch_track)) / 100,
+        'Pitch (semitones)': pitch_track.semitones()
+    }, x='Time (s)', y='Pitch (semitones)', height=200)
+
+    table = []
+    for row in rows:
+        entry = {'Syllable': row['syllable'], 'Word': row['word']}
+        if row['shape'] is None:
+            entry['Contour'] = "not voiced"
+        else:
+            entry['Contour'] = f"{row['height']} {row['shape']} ({row['start']:+.0f} → {row['end']:+.0f} st)"
+        if language == "Mandarin":
+            entry['Heard as'] = f"tone {row['mandarin_tone']}" if row['mandarin_tone'] else ""
+        table.append(entry)
+    st.table(table)
+    st.caption("Pitch in semitones from your median. Compare each syllable with the tone it should carry.")
 
 
 def display_assessment_results():
-    if 'assessment_result' not in st.session_state:
+    job = st.session_state.get('assessment_job')
+    if job is not None:
+        if job.done:
+            del st.session_state['assessment_job']
+            details = {key: job.details[key] for key in
+                       ('reference_text', 'language', 'enable_word_analysis', 'enable_phoneme_analysis')}
+            store_assessment(job.result, assessment=job.assessment, pitch_track=job.details.get('pitch_track'),
+                             **details)
+        else:
+            show_assessment_progress()
+
+    data = get_session_store().get('assessment_result')
+    if data is None:
         return
 
-    data = st.session_state['assessment_result']
-    result = data['result']
+    assessment = data['assessment']
     reference_text = data['reference_text']
     language = data['language']
-    assessor = data['assessor']
     enable_word_analysis = data['enable_word_analysis']
     enable_phoneme_analysis = data['enable_phoneme_analysis']
 
     st.subheader("📊 Assessment Results")
 
+    if DEBUG_MODE and 'result' in data:
+        with st.expander("🐞 Raw Azure result"):
+            st.json(data['result'])
+
+    show_phonemes = enable_phoneme_analysis and language in ["English", "Mandarin"]
+    with span("result_html"):
+        sections = build_result_html(assessment, phonemes=show_phonemes)
+
     # Word analysis first (moved up)
-    if enable_word_analysis and 'detailed_result' in result:
-        words_assessment = assessor.get_word_level_assessment(result['detailed_result'])
-        if words_assessment:
-            st.write("**📝 Word Analysis:**")
-            word_html = ""
-            for word_info in words_assessment:
-                accuracy = word_info['accuracy_score']
-                css_class = "word-correct" if accuracy >= 80 else "word-partial" if accuracy >= 60 else "word-incorrect"
-                word_html += f'<span class="{css_class}">{word_info["word"]}</span> '
-            st.markdown(word_html, unsafe_allow_html=True)
+    if enable_word_analysis and assessment.words:
+        st.write("**📝 Word Analysis:**")
+        st.markdown(sections['words'], unsafe_allow_html=True)
 
     # Compact score display (mobile-friendly)
     scores = [
-        ("Accuracy", result.get('accuracy_score', 0)),
-        ("Fluency", result.get('fluency_score', 0)),
-        ("Completeness", result.get('completeness_score', 0)),
-        ("Overall", result.get('pronunciation_score', 0))
+        ("Accuracy", assessment.accuracy_score),
+        ("Fluency", assessment.fluency_score),
+        ("Completeness", assessment.completeness_score),
+        ("Overall", assessment.pronunciation_score)
     ]
 
     # Mobile: 2 rows of 2, Desktop: 1 row of 4
     st.write("**Scores:**")
-    col1, col2, col3, col4 = st.columns(4)
-    for i, (label, score) in enumerate(scores):
-        color = "success-card" if score >= 80 else "warning-card" if score >= 60 else "error-card"
-        with [col1, col2, col3, col4][i]:
-            st.markdown(f"""
-            <div class="metric-card {color}">
-                <h3>{label}</h3>
-                <h2>{score:.0f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
+    st.markdown(build_score_cards_html(scores), unsafe_allow_html=True)
 
     # Reference vs Recognition
     col1, col2 = st.columns(2)
@@ -142,46 +454,24 @@ def display_assessment_results():
         st.write("**📖 Reference:**")
         if language == "Japanese":
             words_with_romaji = get_romanization_with_words(reference_text, language)
-            word_html = ""
-            for word, romaji in words_with_romaji:
-                word_html += f'<span class="japanese-word" title="{romaji}">{word}</span>'
-            st.markdown(word_html, unsafe_allow_html=True)
+            st.markdown(build_reference_html(words_with_romaji), unsafe_allow_html=True)
         else:
             st.write(reference_text)
 
     with col2:
         st.write("**🗣️ You said:**")
-        st.write(result.get('recognized_text', 'No speech detected'))
+        st.write(assessment.recognized_text or 'No speech detected')
 
     # Better phoneme analysis
-    if enable_phoneme_analysis and language in ["English", "Mandarin"] and 'detailed_result' in result:
-        words_assessment = assessor.get_word_level_assessment(result['detailed_result'])
-        if words_assessment:
-            st.write("**🔤 Phoneme Analysis:**")
-            for word_info in words_assessment:
-                if word_info['phonemes']:
-                    scores_html = '<div class="phoneme-scores">'
-                    letters_html = '<div class="phoneme-letters">'
-
-                    for phoneme in word_info['phonemes']:
-                        score = phoneme['accuracy_score']
-                        letter = phoneme['phoneme']
-                        scores_html += f'<span class="phoneme-score">{score:.0f}</span>'
-                        letters_html += f'<span class="phoneme-letter">{letter}</span>'
-
-                    scores_html += '</div>'
-                    letters_html += '</div>'
-
-                    st.markdown(f"""
-                    <div class="phoneme-container">
-                        <strong>{word_info['word']}:</strong>
-                        {scores_html}
-                        {letters_html}
-                    </div>
-                    """, unsafe_allow_html=True)
+    if sections['phonemes']:
+        st.write("**🔤 Phoneme Analysis:**")
+        st.markdown(sections['phonemes'], unsafe_allow_html=True)
+
+    if data.get('pitch_track') is not None:
+        display_tones(assessment, data['pitch_track'], language)
 
     # Feedback
-    overall_score = result.get('pronunciation_score', 0)
+    overall_score = assessment.pronunciation_score
     if overall_score >= 90:
         st.success("🎉 Excellent pronunciation!")
     elif overall_score >= 80:
@@ -193,6 +483,9 @@ def display_assessment_results():
 
 
 def main():
+    start_metrics_server()
+    warm_up_recognizers()
+    prefetch_sample_audio()
     st.title(f"{PAGE_ICON} {PAGE_TITLE}")
 
     # Language selection
@@ -202,20 +495,19 @@ def main():
     with col2:
         st.markdown(f"### {LANGUAGE_CONFIG[language]['icon']}")
 
+    if HISTORY_ENABLED:
+        st.text_input("Your name (to track progress):", value=st.query_params.get("learner", ""), key="learner")
+
     # Sample texts
-    sample_texts = get_sample_texts()[language]
+    corpus = get_corpus(language)
     with st.expander("📚 Sample Texts"):
-        for level, texts in sample_texts.items():
-            st.write(f"**{level}:**")
-            cols = st.columns(len(texts))
-            for i, text in enumerate(texts):
-                if cols[i].button(text, key=f"{language}_{level}_{i}"):
-                    st.session_state.selected_text = text
+        sample_text_picker(corpus, language)
 
     # Text input
+    default_text = next(iter(corpus.search(level=CORPUS_LEVELS[0], limit=1)[0]), "")
     reference_text = st.text_area(
         "Enter text to practice:",
-        value=st.session_state.get('selected_text', sample_texts['Beginner'][0]),
+        value=st.session_state.get('selected_text', default_text),
         height=60
     )
 
@@ -225,28 +517,34 @@ def main():
 
         with col1:
             st.write("**🎤 Record (max 1 min):**")
-            # Single recording button with unique key
-            audio_data = audiorecorder(
-                start_prompt="🎙️ Record",
-                stop_prompt="⏹️ Stop",
-                key=f"recorder_{language}_{hash(reference_text)}"
-            )
+            if STREAMING_CAPTURE:
+                live_capture(reference_text, language)
+                audio_data = None
+            else:
+                # One recorder key for every text, emptied when the text changes
+                forget_widgets_on_text_change(reference_text, language, "recorder")
+                audio_data = audiorecorder(
+                    start_prompt="🎙️ Record",
+                    stop_prompt="⏹️ Stop",
+                    key="recorder"
+                )
 
         with col2:
             st.write("**🔊 Listen:**")
+            audio_key = f'audio_{language}_{hash(reference_text)}'
             if st.button("🎵 Generate Audio", key="gen_audio"):
                 with st.spinner("🎼 Creating audio..."):
-                    audio_url = generate_speech_audio(reference_text, language)
-                    if audio_url:
-                        st.session_state[f'audio_{hash(reference_text)}'] = audio_url
+                    if get_speech_audio(reference_text, language):
+                        get_session_store().put(audio_key, True)
                         st.success("✅ Audio ready!")
                     else:
                         st.error("Audio generation failed")
 
-        # Display audio player if available
-        audio_key = f'audio_{hash(reference_text)}'
-        if audio_key in st.session_state:
-            st.audio(st.session_state[audio_key])
+        # Display audio player if available; the file is looked up again because the cache may have evicted it
+        if get_session_store().get(audio_key):
+            audio_path = get_speech_audio(reference_text, language)
+            if audio_path:
+                st.audio(audio_path)
 
         # Handle recording
         if audio_data is not None:
@@ -266,9 +564,14 @@ def main():
                     if st.button("🔍 Assess", type="primary"):
                         assess_pronunciation(reference_text, audio_data, language, enable_word_analysis,
                                              enable_phoneme_analysis)
+                    quick_check_clicked = LOCAL_SCORING_ENABLED and st.button("⚡ Quick check")
+                if quick_check_clicked:
+                    quick_check(reference_text, audio_data, language)
 
     # Display results (persistent)
-    display_assessment_results()
+    with span("render"):
+        display_assessment_results()
+    display_progress(language)
 
     # Tips
     with st.expander("💡 Pronunciation Tips"):
@@ -276,6 +579,20 @@ def main():
         for tip in tips:
             st.markdown(f"- {tip}")
 
+    if DEBUG_MODE:
+        with st.expander("🛠️ Replica Stats"):
+            stats = get_session_stats()
+            st.write(f"Sessions: {stats['sessions']}, total {stats['total_bytes'] / 1e6:.1f} MB, "
+                     f"largest {stats['largest_session_bytes'] / 1e6:.1f} MB, evictions {stats['evictions']}")
+            st.write(f"This session: {get_session_store().total_bytes / 1e6:.2f} MB")
+            pool = get_recognizer_pool().stats()
+            st.write(f"Recognizer pool: {pool['size']} idle, {pool['in_use']} in use, {pool['hits']} hits / "
+                     f"{pool['misses']} misses ({pool['hit_rate']:.0%}), {pool['recycled']} recycled")
+            if RESULT_CACHE_ENABLED:
+                cache = get_result_cache().stats()
+                st.write(f"Result cache: {cache['entries']} results, {cache['bytes'] / 1e6:.1f} MB, "
+                         f"{cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from config import SAMPLE_RATE
+from utils.audio_utils import trim_silence
+
+
+def make_segment(pcm16):
+    return AudioSegment(data=pcm16.astype('<i2').tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * 220 * t)
+
+
+@pytest.mark.parametrize("seconds", [0.3, 0.45])
+def test_trim_silence_handles_clips_shorter_than_the_padding_window(seconds):
+    pcm16 = np.concatenate((np.zeros(int(SAMPLE_RATE * 0.05)), tone(seconds - 0.1), np.zeros(int(SAMPLE_RATE * 0.05))))
+    audio = make_segment(pcm16)
+    trimmed, removed = trim_silence(audio)
+    assert removed == 0.0
+    assert len(trimmed.raw_data) == len(audio.raw_data)
+
+
+def test_trim_silence_keeps_padding_around_speech():
+    pcm16 = np.concatenate((np.zeros(SAMPLE_RATE * 2), tone(1.0), np.zeros(SAMPLE_RATE * 2)))
+    trimmed, removed = trim_silence(make_segment(pcm16))
+    assert removed == pytest.approx(3.5, abs=0.05)
+    assert len(trimmed) == pytest.approx(1500, abs=50)
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from batch_assess import load_manifest
+
+
+def write_csv(path, rows):
+    path.write_text("audio_path,reference_text,language\n" + "".join(f"{','.join(row)}\n" for row in rows),
+                    encoding="utf-8")
+    return str(path)
+
+
+def test_rows_without_a_language_are_reported(tmp_path):
+    manifest = write_csv(tmp_path / "manifest.csv", [("a.wav", "hello", "English"), ("b.wav", "hallo", ""),
+                                                     ("c.wav", "hi", "Klingon")])
+    with pytest.raises(ValueError) as error:
+        load_manifest(manifest)
+    message = str(error.value)
+    assert "2 rows" in message
+    assert "line 3: no language" in message and "line 4: unknown language 'Klingon'" in message
+
+
+def test_language_option_fills_in_missing_languages(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("\n".join(json.dumps(row) for row in [
+        {'audio_path': "a.wav", 'reference_text': "hello", 'language': "English"},
+        {'audio_path': "b.wav", 'reference_text': "hallo", 'id': "b"},
+    ]), encoding="utf-8")
+
+    items = load_manifest(str(manifest), default_language="German")
+    assert [(item['id'], item['language']) for item in items] == [("a.wav", "English"), ("b", "German")]
+    assert items[0]['audio_path'] == str(tmp_path / "a.wav")
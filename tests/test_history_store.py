@@ -0,0 +1,83 @@
+import random
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from config import HISTORY_ERROR_SCORE
+from utils.history_store import HistoryStore
+
+PHONEMES = ["th", "r", "l", "ae", "iy", "s"]
+
+
+class StubAssessment:
+    """The parts of AssessmentResult that HistoryStore reads"""
+
+    def __init__(self, words):
+        self.words = [SimpleNamespace(word=word, accuracy_score=80.0, error_type="None") for word, _ in words]
+        self._phonemes = {id(w): phonemes for w, (_, phonemes) in zip(self.words, words)}
+        self.accuracy_score = self.fluency_score = self.completeness_score = 80.0
+        self.prosody_score = None
+        self.pronunciation_score = 80.0
+
+    def word_phonemes(self, word):
+        return self._phonemes[id(word)]
+
+
+def random_attempt(rng):
+    return StubAssessment([(f"w{i}", [(rng.choice(PHONEMES), float(rng.randint(20, 100))) for _ in range(3)])
+                           for i in range(4)])
+
+
+def brute_force(store, attempt_ids, min_count):
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    for attempt_id in attempt_ids:
+        for _, _, _, phonemes in store.attempt_words(attempt_id):
+            for phoneme, score in phonemes:
+                totals[phoneme][0] += 1
+                totals[phoneme][1] += score
+                totals[phoneme][2] += score < HISTORY_ERROR_SCORE
+    return {phoneme: (count, score_sum / count, errors / count)
+            for phoneme, (count, score_sum, errors) in totals.items() if count >= min_count}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite3"))
+
+
+def test_windowed_totals_match_a_rescan(store):
+    rng = random.Random(7)
+    ids = [store.record_attempt("alice", "English", "text", random_attempt(rng)) for _ in range(30)]
+    store.record_attempt("bob", "English", "text", random_attempt(rng))  # other learners do not count
+
+    for window in (1, 5, 17, 30, 100):
+        expected = brute_force(store, ids[-window:], min_count=2)
+        rows = store.weakest_phonemes("alice", "English", limit=len(PHONEMES), last_attempts=window, min_count=2)
+        assert {row['phoneme'] for row in rows} == set(expected)
+        for row in rows:
+            count, average, error_rate = expected[row['phoneme']]
+            assert row['count'] == count
+            assert row['average_score'] == pytest.approx(average)
+            assert row['error_rate'] == pytest.approx(error_rate)
+        assert [row['average_score'] for row in rows] == sorted(row['average_score'] for row in rows)
+
+
+def test_totals_continue_after_reopening(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    rng = random.Random(3)
+    first = HistoryStore(path)
+    ids = [first.record_attempt("alice", "German", "text", random_attempt(rng)) for _ in range(5)]
+    reopened = HistoryStore(path)  # schema creation is idempotent and the running totals carry on
+    ids += [reopened.record_attempt("alice", "German", "text", random_attempt(rng)) for _ in range(5)]
+
+    expected = brute_force(reopened, ids[-8:], min_count=1)
+    rows = reopened.weakest_phonemes("alice", "German", limit=len(PHONEMES), last_attempts=8, min_count=1)
+    assert {row['phoneme']: row['count'] for row in rows} == {p: v[0] for p, v in expected.items()}
+
+
+def test_japanese_morae_are_stored_but_not_aggregated(store):
+    attempt_id = store.record_attempt("alice", "Japanese", "こんにちは", StubAssessment([("こんにちは", [("こ", 100.0)])]))
+    assert store.attempt_words(attempt_id) == [["こんにちは", 80.0, "None", [["こ", 100.0]]]]
+    assert store.weakest_phonemes("alice", "Japanese", min_count=1) == []
+    assert [a['id'] for a in store.recent_attempts("alice", "Japanese")] == [attempt_id]
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils import http_client
+from utils.http_client import HttpClient, SingleFlight
+
+
+class StandIn:
+    """Local HTTP server that answers each request with the next planned action"""
+
+    def __init__(self, *plan, delay=0.0):
+        self.plan = list(plan)
+        self.delay = delay
+        self.hits = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.hits += 1
+                    action = stand_in.plan.pop(0) if len(stand_in.plan) > 1 else stand_in.plan[0]
+                time.sleep(stand_in.delay)
+                if action == "reset":
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                body = f"hit {stand_in.hits}".encode()
+                self.send_response(action)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0.01)
+
+
+def test_retries_server_errors():
+    server = StandIn(503, 500, 200)
+    try:
+        response = HttpClient(max_retries=3, deadline=5).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 200
+    assert server.hits == 3
+
+
+def test_gives_up_after_max_retries_and_returns_the_last_response():
+    server = StandIn(502)
+    try:
+        response = HttpClient(max_retries=2, deadline=5).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 502
+    assert server.hits == 3
+
+
+def test_retries_connection_reset():
+    server = StandIn("reset", 200)
+    try:
+        response = HttpClient(max_retries=3, deadline=5).get(server.url)
+    finally:
+        server.close()
+    assert response.status_code == 200
+    assert server.hits >= 2
+
+
+def test_deadline_bounds_the_whole_request():
+    server = StandIn(200, delay=2.0)
+    started = time.monotonic()
+    try:
+        with pytest.raises(requests.Timeout):
+            HttpClient(max_retries=3, deadline=0.3).get(server.url)
+    finally:
+        server.close()
+    assert time.monotonic() - started < 1.5
+
+
+def test_single_flight_shares_one_request_between_concurrent_callers():
+    server = StandIn(200, delay=0.3)
+    client = HttpClient(max_retries=0, deadline=5)
+    flight = SingleFlight()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            bodies = list(executor.map(lambda _: flight.do(server.url, lambda: client.get(server.url).text), range(8)))
+    finally:
+        server.close()
+    assert server.hits == 1
+    assert bodies == ["hit 1"] * 8
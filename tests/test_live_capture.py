@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+
+from utils.live_capture import LiveAssessment
+from utils.recognizer_pool import RecognizerPool
+from utils.session_store import SessionStore
+
+
+def make_pool():
+    return RecognizerPool(backend="fake", backend_options={'latency': 0, 'jitter': 0, 'failure_rate': 0})
+
+
+def record(live, seconds):
+    live.feed(np.zeros(16000 * seconds, dtype='<i2').tobytes(), 16000, 1)
+
+
+def wait_until_idle(pool, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pool.in_use and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pool.in_use == 0
+
+
+def test_close_returns_recognizer_to_pool():
+    pool = make_pool()
+    live = LiveAssessment("English", "hello world", pool=pool)
+    record(live, 2)
+    assert pool.in_use == 1
+
+    live.close()
+    assert live.finished
+    assert wait_until_idle(pool)
+    live.close()  # closing twice is harmless
+
+
+def test_store_closes_evicted_and_replaced_recordings():
+    pool = make_pool()
+    store = SessionStore(max_entries=2)
+    first = LiveAssessment("English", "first text", pool=pool)
+    record(first, 1)
+    store.put('live_first', first)
+    store.put('other', "audio path")
+    store.put('third', "audio path")  # evicts the oldest entry, the first recording
+    assert first.finished
+
+    second = LiveAssessment("English", "second text", pool=pool)
+    record(second, 1)
+    store.put('live', second)
+    store.put('live', LiveAssessment("English", "second text", pool=pool))
+    assert second.finished
+    assert wait_until_idle(pool)
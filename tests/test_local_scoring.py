@@ -0,0 +1,22 @@
+import numpy as np
+
+from config import SAMPLE_RATE
+from utils.local_scoring import extract_features
+from utils.pitch import track_pitch
+
+
+def glide(start_hz, end_hz, seconds=1.0):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(np.linspace(start_hz, end_hz, len(t))) / SAMPLE_RATE
+    return (6000 * sum(np.sin(k * phase) / k for k in range(1, 6))).astype(np.int16)
+
+
+def test_local_scoring_pitch_matches_the_tone_tracker():
+    pcm16 = glide(110, 220)
+    features = extract_features(pcm16)
+    semitones = track_pitch(pcm16).semitones()
+
+    assert len(features.pitch) == len(features.mfcc) == len(semitones)
+    np.testing.assert_allclose(features.pitch, semitones, atol=1e-4)
+    voiced = features.pitch[~np.isnan(features.pitch)]
+    assert voiced[-1] - voiced[0] > 10  # an octave glide spans about 12 semitones
@@ -0,0 +1,36 @@
+import io
+import json
+
+from utils import metrics
+
+
+def test_metrics_log_emits_json_lines(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_LOG", True)
+    monkeypatch.setattr(metrics.logger, "handlers", [])
+    monkeypatch.setattr(metrics.logger, "level", metrics.logger.level)
+    monkeypatch.setattr(metrics.logger, "propagate", metrics.logger.propagate)
+    metrics.configure_logging(stream)
+    metrics.observe("test_stage", 0.25)
+    metrics.count_error("test_stage")
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines == [{'stage': 'test_stage', 'seconds': 0.25, 'error': False},
+                     {'stage': 'test_stage', 'error': True}]
+
+
+def test_prometheus_label_values_are_escaped(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_LOG", False)
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    stage = 'endpoint_west "eu"\\2\nx'
+    metrics.observe(stage, 0.1, error=True)
+
+    lines = metrics.render_prometheus().splitlines()
+    escaped = 'stage="endpoint_west \\"eu\\"\\\\2\\nx"'
+    assert f'pronunciation_stage_seconds_sum{{{escaped}}} 0.1' in lines
+    assert f'pronunciation_errors_total{{{escaped}}} 1' in lines
+    assert all(line.startswith(("#", "pronunciation_")) for line in lines)  # no line broken by the newline
@@ -0,0 +1,78 @@
+import io
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+
+from config import SAMPLE_RATE
+from utils.audio_utils import convert_audio_format
+from utils.pcm_engine import PcmStreamConverter, normalize_to_pcm16
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+EDGE = SAMPLE_RATE // 20  # resampler transients at both ends are ignored
+TOLERANCE = 0.01 * 32768  # 1% of full scale
+
+
+def make_wav(rate, channels, seconds=1.5):
+    t = np.arange(int(rate * seconds)) / rate
+    tones = [0.3 * np.sin(2 * np.pi * 440 * t), 0.3 * np.sin(2 * np.pi * 660 * t + 1.0)]
+    samples = np.stack(tones[:channels], axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(np.round(samples * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def read_wav(data):
+    with wave.open(io.BytesIO(data), 'rb') as wav_file:
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+        return samples, wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth()
+
+
+def ffmpeg_reference(data):
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "wav", "-i", "pipe:0", "-ar", str(SAMPLE_RATE), "-ac", "1",
+         "-acodec", "pcm_s16le", "-f", "wav", "pipe:1"],
+        input=data, capture_output=True, check=True)
+    samples, rate, channels, _ = read_wav(result.stdout)
+    assert (rate, channels) == (SAMPLE_RATE, 1)
+    return samples
+
+
+def assert_matches(pcm16, reference):
+    assert abs(len(pcm16) - len(reference)) <= 1
+    length = min(len(pcm16), len(reference))
+    difference = pcm16[EDGE:length - EDGE].astype(np.int32) - reference[EDGE:length - EDGE]
+    assert np.abs(difference).max() <= TOLERANCE
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("rate, channels", [(44100, 2), (48000, 1), (22050, 2), (8000, 1)])
+def test_normalize_to_pcm16_matches_ffmpeg(rate, channels):
+    data = make_wav(rate, channels)
+    pcm16 = normalize_to_pcm16(data, "wav")
+    assert pcm16.dtype == np.int16
+    assert_matches(pcm16, ffmpeg_reference(data))
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("rate, channels", [(44100, 2), (16000, 1)])
+def test_convert_audio_format_matches_ffmpeg(rate, channels):
+    data = make_wav(rate, channels)
+    samples, out_rate, out_channels, sample_width = read_wav(convert_audio_format(data, "wav"))
+    assert (out_rate, out_channels, sample_width) == (SAMPLE_RATE, 1, 2)
+    assert_matches(samples, ffmpeg_reference(data))
+
+
+def test_target_format_is_passed_through_without_dither():
+    data = make_wav(SAMPLE_RATE, 1)
+    samples, _, _, _ = read_wav(data)
+    np.testing.assert_array_equal(normalize_to_pcm16(data, "wav"), samples)
+    np.testing.assert_array_equal(read_wav(convert_audio_format(data, "wav"))[0], samples)
+    np.testing.assert_array_equal(PcmStreamConverter().feed(samples.tobytes(), SAMPLE_RATE, 1), samples)
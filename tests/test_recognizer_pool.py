@@ -0,0 +1,26 @@
+from utils.recognizer_pool import RecognizerPool
+
+
+def make_pool(**options):
+    return RecognizerPool(backend="fake", backend_options={'latency': 0, 'jitter': 0, 'failure_rate': 0}, **options)
+
+
+def test_warm_up_serves_the_first_requests_from_the_pool():
+    pool = make_pool(max_idle=2)
+    pool.warm_up("English", count=3)
+    assert pool.stats()['size'] == 2  # never more than max_idle per locale
+
+    with pool.acquire("English"), pool.acquire("English"):
+        pass
+    with pool.acquire("German"):
+        pass
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['in_use']) == (2, 1, 0)
+    assert stats['hit_rate'] == 2 / 3
+
+
+def test_unhealthy_assessors_are_recycled():
+    pool = make_pool()
+    with pool.acquire("English") as assessor:
+        assessor.healthy = False
+    assert pool.stats()['recycled'] == 1 and pool.stats()['size'] == 0
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import result_cache
+from utils.result_cache import ResultCache, get_cached_assessment, make_cache_key
+
+PCM = b"\x01\x00" * 1600
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(time=tick))
+    return now
+
+
+def make_cache(tmp_path, **options):
+    return ResultCache(str(tmp_path / "results.sqlite3"), **options)
+
+
+def test_hit_and_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    key = make_cache_key(PCM, "hello", "English")
+    assert cache.get(key) is None
+    cache.put(key, {'success': True, 'accuracy_score': 90.0})
+
+    assert cache.get(key) == {'success': True, 'accuracy_score': 90.0}
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 1, 0.5)
+
+
+def test_key_covers_audio_reference_text_and_locale():
+    key = make_cache_key(PCM, "hello", "English")
+    assert key == make_cache_key(PCM, "hello", "English")
+    assert len({key, make_cache_key(PCM, "hello", "German"), make_cache_key(PCM, "hello!", "English"),
+                make_cache_key(PCM[:-2], "hello", "English")}) == 4
+    # Mandarin and Cantonese share the text but not the locale
+    assert make_cache_key(PCM, "你好", "Mandarin") != make_cache_key(PCM, "你好", "Cantonese")
+
+
+def test_evicts_least_recently_used_beyond_max_bytes(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=250)
+    value = {'text': "x" * 80}
+    for key in ("a", "b"):
+        cache.put(key, value)
+    assert cache.get("a") == value  # "b" is now the least recently used
+    cache.put("c", value)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == value and cache.get("c") == value
+    assert cache.stats()['bytes'] <= 250
+
+
+def test_expired_results_are_dropped(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=10)
+    cache.put("a", {'success': True})
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_get_cached_assessment_stores_only_successes(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(result_cache, "_cache", make_cache(tmp_path))
+    calls = []
+
+    def assess(result):
+        calls.append(result)
+        return result
+
+    failure = {'success': False, 'error': "busy"}
+    assert get_cached_assessment(PCM, "hello", "English", lambda: assess(failure)) == failure
+    success = {'success': True, 'accuracy_score': 80.0}
+    assert get_cached_assessment(PCM, "hello", "English", lambda: assess(success)) == success
+    assert get_cached_assessment(PCM, "hello", "English", lambda: assess(failure)) == success
+    assert calls == [failure, success]
@@ -0,0 +1,129 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+from pydub import AudioSegment
+
+from config import ROUTER_FAILURE_THRESHOLD, ROUTER_OPEN_SECONDS, ROUTER_THROTTLE_SECONDS
+from utils import speech_router
+from utils.speech_router import RoutedSpeechBackend, SpeechEndpoint, SpeechRouter
+
+AUDIO = AudioSegment.silent(duration=1000, frame_rate=16000)
+TEXT = "hello world"
+
+
+class FirstChoice(random.Random):
+    """Always picks the first eligible endpoint, so tests control the order"""
+
+    def choices(self, population, weights=None, k=1):
+        return [population[0]]
+
+
+class StubEndpoint(SpeechEndpoint):
+    def __init__(self, name, backend):
+        super().__init__(name, backend="stub")
+        self.stub = backend
+
+    def create_backend(self, locale, upload_format):
+        return self.stub
+
+
+class SegmentThenFailure:
+    """Continuous backend that recognizes one segment and then loses the connection"""
+
+    locale = "en-US"
+    bytes_sent = 0
+    healthy = True
+
+    def assess_continuous(self, audio_input, reference_text):
+        yield {'success': True, 'recognized_text': "hello", 'segment_index': 0}
+        yield {'success': False, 'error': "Recognition Canceled", 'error_code': "ConnectionFailure", 'final': True}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(speech_router, "time", SimpleNamespace(monotonic=lambda: now[0],
+                                                               perf_counter=time.perf_counter))
+    return now
+
+
+def fake_endpoint(name, failure_rate):
+    return SpeechEndpoint(name, backend="fake", latency=0, real_time_factor=0, jitter=0, failure_rate=failure_rate)
+
+
+def make_backend(*endpoints):
+    router = SpeechRouter(endpoints, rng=FirstChoice())
+    return router, RoutedSpeechBackend("en-US", router=router, upload_format="pcm")
+
+
+def test_fails_over_to_the_next_endpoint_after_a_retryable_error(clock):
+    failing, healthy = fake_endpoint("failing", 1.0), fake_endpoint("healthy", 0.0)
+    router, backend = make_backend(failing, healthy)
+
+    result = backend.assess(AUDIO, TEXT)
+    assert result['success'] and backend.healthy
+    assert (failing.requests, failing.errors, healthy.requests) == (1, 1, 1)
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    failing, healthy = fake_endpoint("failing", 1.0), fake_endpoint("healthy", 0.0)
+    router, backend = make_backend(failing, healthy)
+
+    for _ in range(ROUTER_FAILURE_THRESHOLD):
+        assert failing.circuit(clock[0]) == "closed"
+        assert backend.assess(AUDIO, TEXT)['success']
+    assert failing.circuit(clock[0]) == "open" and failing.circuit_opens == 1
+
+    backend.assess(AUDIO, TEXT)
+    assert failing.requests == ROUTER_FAILURE_THRESHOLD  # skipped while open
+
+
+def test_half_open_circuit_lets_one_trial_request_through(clock):
+    first, second = fake_endpoint("first", 0.0), fake_endpoint("second", 0.0)
+    router = SpeechRouter([first, second], rng=FirstChoice())
+    for _ in range(ROUTER_FAILURE_THRESHOLD):
+        router.release(router.acquire(exclude={"second"}), 0.1, "failed")
+    clock[0] += ROUTER_OPEN_SECONDS + 1
+    assert first.circuit(clock[0]) == "half_open"
+
+    trial = router.acquire()
+    assert trial is first
+    assert router.acquire() is second  # no second request while the trial is running
+    router.release(trial, 0.1, "ok")
+    assert first.circuit(clock[0]) == "closed"
+    assert router.acquire() is first
+
+
+def test_throttled_endpoint_is_skipped_for_the_back_off(clock):
+    first, second = fake_endpoint("first", 0.0), fake_endpoint("second", 0.0)
+    router = SpeechRouter([first, second], rng=FirstChoice())
+    router.release(router.acquire(), 0.1, "throttled")
+    assert first.throttled == 1 and first.failures == 0
+
+    clock[0] += ROUTER_THROTTLE_SECONDS - 1
+    endpoint = router.acquire()
+    assert endpoint is second
+    router.release(endpoint, 0.1, "ok")
+    clock[0] += 2
+    assert router.acquire() is first
+
+
+def test_continuous_assessment_is_not_retried_after_a_segment(clock):
+    broken, healthy = StubEndpoint("broken", SegmentThenFailure()), fake_endpoint("healthy", 0.0)
+    router, backend = make_backend(broken, healthy)
+
+    results = list(backend.assess_continuous(AUDIO, TEXT))
+    assert [r.get('final', False) for r in results] == [False, True]
+    assert not results[-1]['success'] and not backend.healthy
+    assert healthy.requests == 0 and broken.errors == 1 and broken.in_flight == 0
+
+
+def test_continuous_assessment_fails_over_before_any_segment(clock):
+    failing, healthy = fake_endpoint("failing", 1.0), fake_endpoint("healthy", 0.0)
+    router, backend = make_backend(failing, healthy)
+
+    results = list(backend.assess_continuous(AUDIO, TEXT))
+    assert results[-1]['final'] and results[-1]['success']
+    assert (failing.errors, healthy.requests) == (1, 1)
@@ -0,0 +1,92 @@
+from utils.speech_service import aggregate_segment_results
+
+REFERENCE_TEXT = "the quick brown fox jumps over the lazy dog and runs far away"
+
+
+def make_segment(words, offset):
+    return {
+        'recognized_text': " ".join(word for word, _ in words),
+        'accuracy_score': 80.0, 'fluency_score': 90.0, 'completeness_score': 100.0, 'prosody_score': 85.0,
+        'offset': offset, 'duration': 10_000_000,
+        'detailed_result': {'NBest': [{'Words': [
+            {'Word': word, 'PronunciationAssessment': {'AccuracyScore': 60.0 if error != 'None' else 95.0,
+                                                       'ErrorType': error}}
+            for word, error in words]}]}
+    }
+
+
+def test_completeness_counts_spoken_words_with_errors():
+    words = [(word, 'None') for word in REFERENCE_TEXT.split()]
+    words[1] = (words[1][0], 'Mispronunciation')
+    words[4] = (words[4][0], 'Mispronunciation')
+    words[8] = (words[8][0], 'UnexpectedBreak')
+    segments = [make_segment(words[:7], 0), make_segment(words[7:], 10_000_000)]
+
+    result = aggregate_segment_results(segments, REFERENCE_TEXT)
+    assert result['completeness_score'] == 100.0
+
+
+def test_completeness_excludes_omitted_and_inserted_words():
+    words = [(word, 'None') for word in REFERENCE_TEXT.split()]
+    words[-1] = (words[-1][0], 'Omission')
+    words.append(("extra", 'Insertion'))
+    result = aggregate_segment_results([make_segment(words, 0)], REFERENCE_TEXT)
+
+    reference_chars = sum(1 for c in REFERENCE_TEXT if c.isalnum())
+    assert result['completeness_score'] == 100.0 * (reference_chars - len("away")) / reference_chars
+
+
+def test_continuous_results_are_aggregated_per_locale():
+    from pydub import AudioSegment
+    from utils.fake_backend import FakeSpeechBackend
+
+    audio = AudioSegment.silent(duration=20_000, frame_rate=16000)
+    for locale, text, separator in (("en-US", "one two three four five", " "), ("zh-CN", "你好世界", "")):
+        backend = FakeSpeechBackend(locale, latency=0, real_time_factor=0, jitter=0, failure_rate=0)
+        results = list(backend.assess_continuous(audio, text))
+        segments, final = results[:-1], results[-1]
+
+        assert final['final'] and final['success']
+        assert [s['segment_index'] for s in segments] == list(range(len(segments)))
+        assert final['recognized_text'] == separator.join(s['recognized_text'] for s in segments)
+
+
+class _PausingBackend:
+    """Azure-like backend for a 3 s clip with a pause in the middle: recognize_once stops at the pause"""
+
+    def __init__(self, locale, segments):
+        self.locale = locale
+        self.healthy = True
+        self.segments = segments
+
+    def assess(self, audio_input, reference_text):
+        return dict(self.segments[0], success=True)
+
+    def assess_continuous(self, audio_input, reference_text):
+        from queue import Queue
+        from utils.speech_service import collect_segments
+
+        events = Queue()
+        for segment in self.segments:
+            events.put(('recognized', dict(segment)))
+        events.put(('stopped', None))
+        return collect_segments(self, events, reference_text, 0.0)
+
+
+def test_short_clip_with_a_pause_scores_every_segment(monkeypatch):
+    from pydub import AudioSegment
+    from utils import speech_service
+
+    words = [(word, 'None') for word in REFERENCE_TEXT.split()]
+    segments = [make_segment(words[:6], 0), make_segment(words[6:], 15_000_000)]
+    monkeypatch.setattr(speech_service, "create_backend",
+                        lambda name, locale, **options: _PausingBackend(locale, segments))
+    assessor = speech_service.PronunciationAssessment("English")
+    received = []
+
+    result = assessor.assess_recording(AudioSegment.silent(duration=3_000, frame_rate=16000), REFERENCE_TEXT,
+                                       received.append)
+    assert result['success'] and 'final' not in result
+    assert len(received) == 2
+    assert result['recognized_text'] == REFERENCE_TEXT
+    assert result['completeness_score'] == 100.0
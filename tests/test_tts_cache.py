@@ -0,0 +1,23 @@
+import os
+
+from utils.tts_cache import TTSAudioCache
+
+
+def test_evicted_audio_is_generated_again(tmp_path, monkeypatch):
+    cache = TTSAudioCache(str(tmp_path), max_bytes=1500)
+    first = cache.put("first", "English", b"\0" * 1000, "audio/mpeg")
+    os.utime(first, (0, 0))  # least recently used
+    cache.put("second", "English", b"\0" * 1000, "audio/wav")
+    assert not os.path.exists(first)
+    assert cache.get_path("first", "English") is None
+
+    downloads = []
+
+    def download(text, language):
+        downloads.append(text)
+        return cache.put(text, language, b"\0" * 10, "audio/mpeg")
+
+    monkeypatch.setattr(cache, "_download", download)
+    path = cache.get_or_generate("first", "English")
+    assert os.path.exists(path) and downloads == ["first"]
+    assert cache.get_or_generate("first", "English") == path and downloads == ["first"]
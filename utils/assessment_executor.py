@@ -0,0 +1,111 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import *
+from utils.metrics import count_error, observe, set_gauge
+
+
+class AssessmentJob:
+    """Handle for a submitted assessment, kept in session state and polled across reruns.
+
+    The worker appends partial results to `segments` as they arrive and sets
+    `result` (and `assessment`, the parsed AssessmentResult, on success) before
+    marking the job done.
+    """
+
+    def __init__(self, job_id, details):
+        self.id = job_id
+        self.details = details
+        self.status = "queued"
+        self.segments = []
+        self.result = None
+        self.assessment = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status == "done"
+
+
+class AssessmentExecutor:
+    """Process-wide pool that runs assessments off the script thread.
+
+    At most max_concurrency jobs run at once, which keeps all sessions together
+    within the Azure concurrent-request quota; up to max_queue more wait in
+    FIFO order and anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_concurrency=ASSESSMENT_MAX_CONCURRENCY, max_queue=ASSESSMENT_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self._waiting = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._workers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="assessment")
+
+    def submit(self, fn, **details):
+        """Queue fn(job) and return the job; a full queue yields a job that already failed"""
+        job = AssessmentJob(next(self._ids), details)
+        with self._lock:
+            if len(self._waiting) >= self.max_queue:
+                job.status = "done"
+                job.result = {'success': False, 'error': "Too many assessments in progress, please try again shortly"}
+                count_error("assessment_queue")
+                return job
+            self._waiting.append(job)
+        self._update_gauges()
+        self._workers.submit(self._run, fn, job)
+        return job
+
+    def _run(self, fn, job):
+        with self._lock:
+            self._waiting.remove(job)
+            self.running += 1
+            job.status = "running"
+            job.started_at = time.monotonic()
+        self._update_gauges()
+        observe("queue_wait", job.started_at - job.submitted_at)
+
+        try:
+            job.result = fn(job)
+        except Exception as e:
+            count_error("assessment")
+            job.result = {'success': False, 'error': f"Assessment error: {str(e)}"}
+        finally:
+            with self._lock:
+                self.running -= 1
+                job.finished_at = time.monotonic()
+                job.status = "done"
+            self._update_gauges()
+
+    def queue_position(self, job):
+        """1-based position among waiting jobs, or 0 once the job has started"""
+        with self._lock:
+            for position, waiting in enumerate(self._waiting, 1):
+                if waiting is job:
+                    return position
+            return 0
+
+    def _update_gauges(self):
+        with self._lock:
+            queued, running = len(self._waiting), self.running
+        set_gauge("assessment_queue_depth", queued)
+        set_gauge("assessments_running", running)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_assessment_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = AssessmentExecutor()
+        return _executor
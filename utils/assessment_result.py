@@ -0,0 +1,126 @@
+import sys
+from array import array
+
+from utils.language_utils import get_japanese_morae
+
+JAPANESE_FILLED_PHONEME_SCORE = 85
+
+
+class WordResult:
+    """One assessed word; its phonemes live in the parent result's arrays"""
+    __slots__ = ('word', 'accuracy_score', 'error_type', 'offset', 'duration', 'phoneme_start', 'phoneme_end')
+
+    def __init__(self, word, accuracy_score, error_type, offset, duration, phoneme_start, phoneme_end):
+        self.word = word
+        self.accuracy_score = accuracy_score
+        self.error_type = error_type
+        self.offset = offset
+        self.duration = duration
+        self.phoneme_start = phoneme_start
+        self.phoneme_end = phoneme_end
+
+
+class AssessmentResult:
+    """Compact assessment built once from the Azure JSON and consumed directly by the renderer.
+
+    Phonemes of all words are stored back to back: phoneme labels in a list and
+    scores, offsets and durations (100 ns ticks) in typed arrays, with each word
+    holding the [phoneme_start, phoneme_end) range of its phonemes.
+    """
+    __slots__ = ('language', 'recognized_text', 'accuracy_score', 'fluency_score', 'completeness_score',
+                 'prosody_score', 'pronunciation_score', 'words', 'phonemes', 'phoneme_scores',
+                 'phoneme_offsets', 'phoneme_durations')
+
+    def __init__(self, language, recognized_text, accuracy_score, fluency_score, completeness_score,
+                 prosody_score, pronunciation_score):
+        self.language = language
+        self.recognized_text = recognized_text
+        self.accuracy_score = accuracy_score
+        self.fluency_score = fluency_score
+        self.completeness_score = completeness_score
+        self.prosody_score = prosody_score
+        self.pronunciation_score = pronunciation_score
+        self.words = []
+        self.phonemes = []
+        self.phoneme_scores = array('f')
+        self.phoneme_offsets = array('q')
+        self.phoneme_durations = array('q')
+
+    @classmethod
+    def from_result(cls, result, language):
+        """Walk the NBest/Words/Phonemes JSON of an assessment result dict exactly once"""
+        assessment = cls(
+            language,
+            result.get('recognized_text', ''),
+            result.get('accuracy_score', 0),
+            result.get('fluency_score', 0),
+            result.get('completeness_score', 0),
+            result.get('prosody_score'),
+            result.get('pronunciation_score', 0)
+        )
+
+        nbest = result.get('detailed_result', {}).get('NBest') or [{}]
+        words = nbest[0].get('Words', [])
+        if language == "Japanese":
+            # Azure leaves Japanese phonemes empty, so segment every word into morae in one batch
+            japanese_morae = get_japanese_morae([word_info.get('Word', '') for word_info in words])
+
+        for index, word_info in enumerate(words):
+            word = word_info.get('Word', '')
+            scores = word_info.get('PronunciationAssessment', {})
+            start = len(assessment.phonemes)
+
+            for phoneme in word_info.get('Phonemes', []):
+                assessment._add_phoneme(
+                    phoneme.get('Phoneme', ''),
+                    phoneme.get('PronunciationAssessment', {}).get('AccuracyScore', 0),
+                    phoneme.get('Offset', 0),
+                    phoneme.get('Duration', 0)
+                )
+
+            # Fill empty Japanese phonemes
+            if language == "Japanese" and all(p == '' for p in assessment.phonemes[start:]):
+                del assessment.phonemes[start:]
+                del assessment.phoneme_scores[start:]
+                del assessment.phoneme_offsets[start:]
+                del assessment.phoneme_durations[start:]
+                for mora in japanese_morae[index]:
+                    assessment._add_phoneme(mora, JAPANESE_FILLED_PHONEME_SCORE, 0, 0)
+
+            assessment.words.append(WordResult(
+                word,
+                scores.get('AccuracyScore', 0),
+                scores.get('ErrorType', 'None'),
+                word_info.get('Offset', 0),
+                word_info.get('Duration', 0),
+                start,
+                len(assessment.phonemes)
+            ))
+        return assessment
+
+    def _add_phoneme(self, phoneme, score, offset, duration):
+        self.phonemes.append(phoneme)
+        self.phoneme_scores.append(score)
+        self.phoneme_offsets.append(offset)
+        self.phoneme_durations.append(duration)
+
+    def word_phonemes(self, word):
+        """(phoneme, accuracy_score) pairs for one word"""
+        return zip(self.phonemes[word.phoneme_start:word.phoneme_end],
+                   self.phoneme_scores[word.phoneme_start:word.phoneme_end])
+
+    def memory_bytes(self):
+        """Approximate size including words, phoneme labels and score arrays"""
+        words = sum(sys.getsizeof(word) + sys.getsizeof(word.word) for word in self.words)
+        phonemes = sys.getsizeof(self.phonemes) + sum(sys.getsizeof(p) for p in self.phonemes)
+        arrays = sum(sys.getsizeof(a) for a in (self.phoneme_scores, self.phoneme_offsets, self.phoneme_durations))
+        return sys.getsizeof(self) + sys.getsizeof(self.recognized_text) + words + phonemes + arrays
+
+    def to_word_dicts(self):
+        """The list-of-dicts shape returned by PronunciationAssessment.get_word_level_assessment"""
+        return [{
+            'word': word.word,
+            'accuracy_score': word.accuracy_score,
+            'error_type': word.error_type,
+            'phonemes': [{'phoneme': p, 'accuracy_score': s} for p, s in self.word_phonemes(word)]
+        } for word in self.words]
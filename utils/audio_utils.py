@@ -1,22 +1,114 @@
 import streamlit as st
 from pydub import AudioSegment
 import io
-import tempfile
-import os
+from config import SAMPLE_RATE, VAD_ENERGY_MARGIN_DB, VAD_PADDING_MS, VAD_COMPRESS_PAUSES, VAD_MAX_PAUSE_MS
+from utils.lazy_import import lazy_import
+from utils.pcm_engine import normalize_to_pcm16, encode_wav
+from utils.metrics import span
+
+np = lazy_import("numpy")
+
+VAD_FRAME = SAMPLE_RATE // 50  # 20 ms analysis frames
+VAD_MIN_ENERGY_DB = -60  # never call anything quieter than this speech
+VAD_ZCR_THRESHOLD = 0.3  # fricatives are quiet but cross zero often
+
+
+def prepare_pcm_audio(audio_input, input_format="webm"):
+    """Return an Azure-compatible 16 kHz mono 16-bit AudioSegment kept in memory"""
+    try:
+        pcm16 = _normalize(audio_input, input_format)
+        return AudioSegment(data=pcm16.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
+    except Exception as e:
+        st.error(f"Audio conversion error: {str(e)}")
+        return None
+
+
+def detect_speech_frames(pcm16):
+    """Per 20 ms frame, True where energy or zero-crossing rate indicates speech"""
+    frames = pcm16[:len(pcm16) // VAD_FRAME * VAD_FRAME].reshape(-1, VAD_FRAME)
+    if not len(frames):
+        return np.zeros(0, dtype=bool)
+    samples = frames.astype(np.float32) / 32768.0
+    energy_db = 10 * np.log10(np.einsum('ij,ij->i', samples, samples) / VAD_FRAME + 1e-10)
+    signs = np.signbit(frames)
+    zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (VAD_FRAME - 1)
+
+    # Threshold above the noise floor, but never above loud speech when the clip has no silence at all
+    noise_floor, peak = np.percentile(energy_db, (10, 95))
+    threshold = max(VAD_MIN_ENERGY_DB, min(noise_floor + VAD_ENERGY_MARGIN_DB, peak - 10))
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > threshold - VAD_ENERGY_MARGIN_DB / 2) & (zero_crossing_rate > VAD_ZCR_THRESHOLD)
+    return voiced | unvoiced
+
+
+def trim_silence(audio, compress_pauses=VAD_COMPRESS_PAUSES):
+    """Cut leading/trailing silence from 16 kHz mono PCM, keeping VAD_PADDING_MS around speech.
+
+    With compress_pauses, internal pauses keep their padding plus VAD_MAX_PAUSE_MS of
+    silence, which is still long enough to count as a pause for fluency scoring.
+    Returns (audio, seconds removed); audio with no detected speech is returned unchanged.
+    """
+    with span("vad"):
+        pcm16 = np.frombuffer(audio.raw_data, dtype='<i2')
+        speech = detect_speech_frames(pcm16)
+        if not speech.any():
+            return audio, 0.0
+
+        padding = VAD_PADDING_MS * SAMPLE_RATE // 1000 // VAD_FRAME
+        # mode='same' would return the kernel's length for clips shorter than it, so slice the full result
+        padded = np.convolve(speech, np.ones(2 * padding + 1))[padding:padding + len(speech)] > 0
+        spoken = np.flatnonzero(padded)
+        first, last = spoken[0], spoken[-1] + 1
+        keep = np.zeros(len(padded), dtype=bool)
+        keep[first:last] = True
+
+        if compress_pauses:
+            # Drop the middle of each long pause, so the padding on both sides survives
+            max_pause = VAD_MAX_PAUSE_MS * SAMPLE_RATE // 1000 // VAD_FRAME
+            edges = np.flatnonzero(np.diff(padded[first:last].astype(np.int8))) + first + 1
+            for pause_start, pause_end in zip(edges[::2], edges[1::2]):
+                if pause_end - pause_start > max_pause:
+                    keep[pause_start + max_pause // 2:pause_end - (max_pause - max_pause // 2)] = False
+
+        samples_keep = np.repeat(keep, VAD_FRAME)
+        if last == len(keep):
+            # The partial frame at the end belongs to the speech that runs up to it
+            samples_keep = np.concatenate((samples_keep, np.ones(len(pcm16) - len(samples_keep), dtype=bool)))
+        trimmed = pcm16[:len(samples_keep)][samples_keep]
+
+    removed = (len(pcm16) - len(trimmed)) / SAMPLE_RATE
+    if not removed:
+        return audio, 0.0
+    return AudioSegment(data=trimmed.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=1), removed
+
+
+def _normalize(audio_input, input_format):
+    with span("resample"):
+        pcm16 = normalize_to_pcm16(audio_input, input_format)
+    if pcm16 is None:
+        # ffmpeg is only needed to decode containers such as webm
+        with span("decode"):
+            decoded = AudioSegment.from_file(io.BytesIO(audio_input), format=input_format)
+        with span("resample"):
+            pcm16 = normalize_to_pcm16(decoded)
+    return pcm16
 
 
 def convert_audio_format(audio_input, input_format="webm", output_format="wav"):
     try:
-        if isinstance(audio_input, AudioSegment):
-            audio = audio_input
-        else:
-            audio = AudioSegment.from_file(io.BytesIO(audio_input), format=input_format)
+        if output_format == "wav":
+            pcm16 = _normalize(audio_input, input_format)
+            with span("wav_export"):
+                return encode_wav(pcm16)
 
         # ENSURE AZURE-COMPATIBLE FORMAT
-        audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)  # 16-bit
+        audio = prepare_pcm_audio(audio_input, input_format)
+        if audio is None:
+            return None
 
         output_buffer = io.BytesIO()
-        audio.export(output_buffer, format=output_format, parameters=["-acodec", "pcm_s16le"])
+        with span("export"):
+            audio.export(output_buffer, format=output_format, parameters=["-acodec", "pcm_s16le"])
         output_buffer.seek(0)
         return output_buffer.getvalue()
     except Exception as e:
@@ -24,25 +116,6 @@ def convert_audio_format(audio_input, input_format="webm", output_format="wav"):
         return None
 
 
-def save_audio_to_temp_file(audio_data_bytes, format="wav"):
-    try:
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{format}")
-        temp_file.write(audio_data_bytes)
-        temp_file.close()
-        return temp_file.name
-    except Exception as e:
-        st.error(f"File save error: {str(e)}")
-        return None
-
-
-def cleanup_temp_file(file_path):
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    except:
-        pass
-
-
 def get_audio_duration(audio_input):
     try:
         if isinstance(audio_input, AudioSegment):
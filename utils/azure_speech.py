@@ -8,14 +8,14 @@ import os
 
 class JapanesePronunciationAssessment:
     def __init__(self):
-        if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION:
+        if not get_secret("AZURE_SPEECH_KEY") or not get_secret("AZURE_SPEECH_REGION"):
             st.error("⚠️ Azure Speech Service credentials not configured!")
             st.info("Please add your Azure Speech Service key and region to Streamlit secrets.")
             st.stop()
 
         self.speech_config = speechsdk.SpeechConfig(
-            subscription=AZURE_SPEECH_KEY,
-            region=AZURE_SPEECH_REGION
+            subscription=get_secret("AZURE_SPEECH_KEY"),
+            region=get_secret("AZURE_SPEECH_REGION")
         )
         self.speech_config.speech_recognition_language = JAPANESE_LOCALE
 
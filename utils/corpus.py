@@ -0,0 +1,212 @@
+import mmap
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+
+from config import *
+from utils.language_utils import convert_japanese, split_morae
+from utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+INDEX_VERSION = 1
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def sentence_units(text, language):
+    """Sounds a sentence practices: morae for Japanese, characters for Chinese, spelling units otherwise"""
+    if language == "Japanese":
+        try:
+            reading = "".join(hira for _, hira, _ in convert_japanese.__wrapped__(text))  # bypass the UI's LRU
+        except Exception:
+            reading = text
+        return [mora for mora in split_morae(reading) if mora.isalpha()]
+    if language in ("Mandarin", "Cantonese"):
+        return [char for char in text if char.isalpha()]
+
+    digraphs = CORPUS_DIGRAPHS.get(language, ())
+    units = []
+    for word in WORD_RE.findall(text.lower()):
+        i = 0
+        while i < len(word):
+            unit = next((d for d in digraphs if word.startswith(d, i)), word[i])
+            units.append(unit)
+            i += len(unit)
+    return units
+
+
+def sentence_length(text, language, units):
+    """Words for space-delimited languages, morae or characters otherwise"""
+    if language in ("English", "German"):
+        return len(WORD_RE.findall(text))
+    return len(units)
+
+
+class Corpus:
+    """Graded practice sentences of one language, read from a memory-mapped TSV file.
+
+    Each line of the file is "level<TAB>sentence". Only line offsets, levels,
+    lengths and an inverted index of sounds are kept in memory, as numpy arrays
+    saved next to the other caches so later processes load them without
+    re-reading the file; sentence text is decoded from the mapping on demand.
+    """
+
+    def __init__(self, language, path, index_dir=CORPUS_INDEX_DIR):
+        self.language = language
+        self.path = path
+        self.index_dir = index_dir
+        self._data = b""
+        self._matches = OrderedDict()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._load_index()
+
+        # Ids grouped by level, so sampling within a level is a single random index
+        self._by_level = np.argsort(self.levels, kind="stable").astype(np.int32)
+        self._level_starts = np.searchsorted(self.levels[self._by_level], np.arange(len(CORPUS_LEVELS) + 1))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _index_path(self):
+        return os.path.join(self.index_dir, f"{os.path.basename(self.path)}.npz")
+
+    def _source_key(self):
+        if not self._data:
+            return np.array([INDEX_VERSION, 0, 0], dtype=np.int64)
+        stat = os.stat(self.path)
+        return np.array([INDEX_VERSION, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    def _load_index(self):
+        key = self._source_key()
+        try:
+            with np.load(self._index_path(), allow_pickle=False) as index:
+                if np.array_equal(index['key'], key):
+                    self._set_index(**{name: index[name] for name in index.files if name != 'key'})
+                    return
+        except (OSError, KeyError, ValueError):
+            pass  # missing or written by another version
+        arrays = self._build_index()
+        self._set_index(**arrays)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_path = f"{self._index_path()}.{os.getpid()}.{threading.get_ident()}.npz"
+        np.savez(temp_path, key=key, **arrays)
+        os.replace(temp_path, self._index_path())  # readers never see a partial index
+
+    def _set_index(self, starts, ends, levels, lengths, units, unit_starts, postings):
+        self.starts, self.ends, self.levels, self.lengths = starts, ends, levels, lengths
+        self.units = units
+        self._unit_ids = {unit: i for i, unit in enumerate(units.tolist())}
+        self._unit_starts, self._postings = unit_starts, postings
+
+    def _build_index(self):
+        """One pass over the file: line offsets are found vectorized, then each line is parsed once"""
+        data = self._data
+        raw = np.frombuffer(data, dtype=np.uint8) if data else np.zeros(0, dtype=np.uint8)
+        line_ends = np.append(np.flatnonzero(raw == 0x0A), len(raw))
+        level_ids = {level: i for i, level in enumerate(CORPUS_LEVELS)}
+
+        starts, ends, levels, lengths = [], [], [], []
+        postings_by_unit = {}
+        line_start = 0
+        for line_end in line_ends.tolist():
+            line = data[line_start:line_end].decode("utf-8").rstrip("\r")
+            level, _, text = line.partition("\t")
+            if text.strip() and level in level_ids:
+                sentence_id = len(starts)
+                text_start = line_start + len(level.encode("utf-8")) + 1
+                starts.append(text_start)
+                ends.append(text_start + len(text.encode("utf-8")))
+                levels.append(level_ids[level])
+                units = sentence_units(text, self.language)
+                lengths.append(sentence_length(text, self.language, units))
+                for unit in set(units):
+                    postings_by_unit.setdefault(unit, []).append(sentence_id)
+            line_start = line_end + 1
+
+        units = sorted(postings_by_unit)
+        counts = [len(postings_by_unit[unit]) for unit in units]
+        return {
+            'starts': np.array(starts, dtype=np.int64),
+            'ends': np.array(ends, dtype=np.int64),
+            'levels': np.array(levels, dtype=np.int8),
+            'lengths': np.array(lengths, dtype=np.int32),
+            'units': np.array(units, dtype=str) if units else np.zeros(0, dtype="<U1"),
+            'unit_starts': np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            'postings': np.array([i for unit in units for i in postings_by_unit[unit]], dtype=np.int32)
+        }
+
+    def text(self, sentence_id):
+        return self._data[self.starts[sentence_id]:self.ends[sentence_id]].decode("utf-8").rstrip()
+
+    def unit_counts(self):
+        """(unit, number of sentences containing it) for every indexed sound"""
+        return list(zip(self.units.tolist(), np.diff(self._unit_starts).tolist()))
+
+    def length_range(self):
+        if not len(self):
+            return 0, 0
+        return int(self.lengths.min()), int(self.lengths.max())
+
+    def matching_ids(self, level=None, min_length=None, max_length=None, unit=None):
+        """Sorted ids of sentences matching every given filter; recent filter sets are cached"""
+        key = (level, min_length, max_length, unit)
+        with self._lock:
+            if key in self._matches:
+                self._matches.move_to_end(key)
+                return self._matches[key]
+
+        if level is not None:
+            level_id = CORPUS_LEVELS.index(level)
+            ids = self._by_level[self._level_starts[level_id]:self._level_starts[level_id + 1]]  # stable, so sorted
+        else:
+            ids = np.arange(len(self), dtype=np.int32)
+        if unit is not None:
+            unit_id = self._unit_ids.get(unit)
+            if unit_id is None:
+                ids = ids[:0]
+            else:
+                postings = self._postings[self._unit_starts[unit_id]:self._unit_starts[unit_id + 1]]
+                ids = postings if level is None else postings[self.levels[postings] == level_id]
+        if min_length is not None:
+            ids = ids[self.lengths[ids] >= min_length]
+        if max_length is not None:
+            ids = ids[self.lengths[ids] <= max_length]
+
+        with self._lock:
+            self._matches[key] = ids
+            while len(self._matches) > CORPUS_QUERY_CACHE_SIZE:
+                self._matches.popitem(last=False)
+        return ids
+
+    def search(self, level=None, min_length=None, max_length=None, unit=None, offset=0, limit=CORPUS_PAGE_SIZE):
+        """One page of matching sentences, with the total number of matches"""
+        ids = self.matching_ids(level, min_length, max_length, unit)
+        return [self.text(i) for i in ids[offset:offset + limit].tolist()], len(ids)
+
+    def sample(self, level=None, min_length=None, max_length=None, unit=None, rng=random):
+        """A random matching sentence, or None if nothing matches"""
+        if level is not None and min_length is None and max_length is None and unit is None:
+            level_id = CORPUS_LEVELS.index(level)
+            start, end = self._level_starts[level_id], self._level_starts[level_id + 1]
+            return self.text(self._by_level[rng.randrange(start, end)]) if end > start else None
+        ids = self.matching_ids(level, min_length, max_length, unit)
+        return self.text(ids[rng.randrange(len(ids))]) if len(ids) else None
+
+
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(language):
+    """The process-wide corpus of a language, indexed on first use"""
+    with _corpora_lock:
+        if language not in _corpora:
+            _corpora[language] = Corpus(language, os.path.join(CORPUS_DIR, f"{language.lower()}.tsv"))
+        return _corpora[language]
@@ -0,0 +1,295 @@
+import json
+import math
+import queue
+import random
+import re
+import threading
+import time
+import wave
+
+from config import *
+from utils.metrics import count_error, span
+from utils.speech_service import (RecognitionStream, collect_segments, weighted_pronunciation_score,
+                                  word_separator, write_audio_to_stream)
+
+TICKS_PER_SECOND = 10_000_000  # Azure offsets and durations are in 100 ns ticks
+SEGMENT_SECONDS = 8  # typical length of one continuous-recognition segment
+WORDS_PER_SECOND = 2.5  # speaking rate used to spread the reference text over live segments
+OMISSION_RATE = 0.03
+
+
+def _clamp(score):
+    return max(0.0, min(100.0, score))
+
+
+def get_audio_seconds(audio_input):
+    """Length of a WAV file path, or of 16 kHz mono 16-bit PCM as an AudioSegment or bytes"""
+    if isinstance(audio_input, str):
+        with wave.open(audio_input, 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    if hasattr(audio_input, 'duration_seconds'):
+        return audio_input.duration_seconds
+    return len(audio_input) / (2 * SAMPLE_RATE)
+
+
+class FakeServiceQuota:
+    """Concurrent-request limit of one simulated key, shared by every backend that uses it"""
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            if self.in_flight >= self.max_concurrency:
+                return False
+            self.in_flight += 1
+            return True
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _DiscardStream:
+    def write(self, data):
+        pass
+
+
+class FakeSpeechBackend:
+    """Local stand-in for the Azure recognizer, for load tests and offline development.
+
+    Each request sleeps for a fixed service overhead plus a real-time factor of
+    the audio length with gaussian jitter, then returns Azure-shaped detailed
+    JSON for the reference text. A share of requests fail like a service error,
+    and with a FakeServiceQuota requests beyond its concurrency get a 429.
+    Audio is encoded exactly as for Azure, and with upload_kbps set the upload
+    time of the encoded bytes is added, so upload formats can be compared offline.
+    """
+
+    def __init__(self, locale, latency=FAKE_BACKEND_LATENCY, real_time_factor=FAKE_BACKEND_REAL_TIME_FACTOR,
+                 jitter=FAKE_BACKEND_JITTER, failure_rate=FAKE_BACKEND_FAILURE_RATE,
+                 upload_format=AUDIO_UPLOAD_FORMAT, upload_kbps=FAKE_BACKEND_UPLOAD_KBPS, seed=None, quota=None):
+        self.locale = locale
+        self.latency = latency
+        self.real_time_factor = real_time_factor
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.upload_format = upload_format
+        self.upload_kbps = upload_kbps
+        self.bytes_sent = 0
+        self.rng = random.Random(seed)
+        self.quota = quota
+        self.healthy = True
+
+    def prewarm(self):
+        pass  # no connection to open
+
+    def _split_words(self, reference_text):
+        if not word_separator(self.locale):
+            return [c for c in reference_text if c.isalnum()]
+        return re.findall(r"[\w']+", reference_text)
+
+    def _upload(self, audio_input):
+        """Encode as the Azure backend would and simulate sending the bytes"""
+        self.bytes_sent = write_audio_to_stream(_DiscardStream(), audio_input, self.upload_format)
+        if self.upload_kbps:
+            time.sleep(self.bytes_sent * 8 / (self.upload_kbps * 1000))
+
+    def _wait(self, seconds):
+        time.sleep(max(0.0, seconds + self.rng.gauss(0, self.jitter)))
+
+    def _failed(self):
+        if self.rng.random() >= self.failure_rate:
+            return None
+        self.healthy = False
+        count_error("recognition")
+        return {'success': False, 'error_code': "ServiceUnavailable",
+                'error': "Recognition Canceled: CancellationReason.Error. Error Details: simulated service error"}
+
+    def _throttled(self):
+        """A 429 result if the shared quota is used up, else None with a slot taken (release with quota.exit)"""
+        if self.quota is None or self.quota.enter():
+            return None
+        self.healthy = False
+        count_error("recognition")
+        return {'success': False, 'error_code': "TooManyRequests",
+                'error': "Recognition Canceled: CancellationReason.Error. Error Details: simulated 429"}
+
+    def _make_words(self, words, offset, duration, skill):
+        spacing = duration // max(len(words), 1)
+        results = []
+        for i, word in enumerate(words):
+            accuracy = _clamp(self.rng.gauss(skill, 12))
+            if self.rng.random() < OMISSION_RATE:
+                results.append({'Word': word, 'Offset': 0, 'Duration': 0,
+                                'PronunciationAssessment': {'AccuracyScore': 0, 'ErrorType': 'Omission'}})
+                continue
+
+            word_offset = offset + i * spacing
+            word_duration = int(spacing * 0.9)
+            word_info = {
+                'Word': word,
+                'Offset': word_offset,
+                'Duration': word_duration,
+                'PronunciationAssessment': {
+                    'AccuracyScore': accuracy,
+                    'ErrorType': 'Mispronunciation' if accuracy < 60 else 'None',
+                    'Feedback': {'Prosody': {
+                        'Break': {'ErrorTypes': ['None'], 'BreakLength': 0},
+                        'Intonation': {'ErrorTypes': [], 'Monotone': {'SyllablePitchDeltaConfidence': 0.9}}
+                    }}
+                }
+            }
+            if not self.locale.startswith("ja"):  # Azure leaves Japanese phonemes empty
+                labels = list(word.lower()) if word.isascii() else [word]
+                phoneme_duration = word_duration // len(labels)
+                word_info['Phonemes'] = [{
+                    'Phoneme': label,
+                    'PronunciationAssessment': {'AccuracyScore': _clamp(self.rng.gauss(accuracy, 10))},
+                    'Offset': word_offset + j * phoneme_duration,
+                    'Duration': phoneme_duration
+                } for j, label in enumerate(labels)]
+            results.append(word_info)
+        return results
+
+    def _make_result(self, words, offset, duration):
+        """Build a recognized result and round-trip it through JSON like the SDK response"""
+        skill = self.rng.uniform(55, 95)
+        word_results = self._make_words(words, offset, duration, skill)
+        spoken = [w for w in word_results if w['PronunciationAssessment']['ErrorType'] != 'Omission']
+        accuracy = sum(w['PronunciationAssessment']['AccuracyScore'] for w in spoken) / len(spoken) if spoken else 0.0
+        completeness = 100.0 * len(spoken) / len(word_results) if word_results else 0.0
+        fluency = _clamp(self.rng.gauss(skill + 5, 8))
+        prosody = _clamp(self.rng.gauss(skill, 10)) if ENABLE_PROSODY else None
+        pronunciation = weighted_pronunciation_score(accuracy, completeness, fluency, prosody)
+
+        display_text = word_separator(self.locale).join(w['Word'] for w in spoken)
+        json_result = json.dumps({
+            'RecognitionStatus': 'Success',
+            'Offset': offset,
+            'Duration': duration,
+            'DisplayText': display_text,
+            'NBest': [{
+                'Confidence': 0.9,
+                'Lexical': display_text,
+                'Display': display_text,
+                'PronunciationAssessment': {
+                    'AccuracyScore': accuracy, 'FluencyScore': fluency, 'CompletenessScore': completeness,
+                    'PronScore': pronunciation, 'ProsodyScore': prosody
+                },
+                'Words': word_results
+            }]
+        }, ensure_ascii=False)
+
+        with span("json_parse"):
+            detailed_result = json.loads(json_result)
+        return {
+            'success': True,
+            'recognized_text': display_text,
+            'accuracy_score': accuracy,
+            'fluency_score': fluency,
+            'completeness_score': completeness,
+            'prosody_score': prosody,
+            'pronunciation_score': pronunciation,
+            'offset': offset,
+            'duration': duration,
+            'detailed_result': detailed_result
+        }
+
+    def assess(self, audio_input, reference_text):
+        audio_seconds = get_audio_seconds(audio_input)
+        with span("sdk_setup"):
+            self._upload(audio_input)
+        throttled = self._throttled()
+        if throttled:
+            return throttled
+        try:
+            with span("recognition"):
+                self._wait(self.latency + self.real_time_factor * audio_seconds)
+        finally:
+            if self.quota is not None:
+                self.quota.exit()
+        failed = self._failed()
+        if failed:
+            return failed
+        return self._make_result(self._split_words(reference_text), 0, int(audio_seconds * TICKS_PER_SECOND))
+
+    def assess_continuous(self, audio_input, reference_text):
+        with span("sdk_setup"):
+            self._upload(audio_input)
+        recognition = self.open_stream(reference_text)
+        write_audio_to_stream(recognition, audio_input)
+        recognition.close()
+        yield from recognition.results()
+
+    def open_stream(self, reference_text):
+        live = _FakeLiveRecognition(self, reference_text)
+        return RecognitionStream(live, live.results)
+
+
+class _FakeLiveRecognition:
+    """Push stream of the fake backend that emits a segment result for every SEGMENT_SECONDS of audio.
+
+    Segments are processed one at a time on a worker thread, each taking the
+    backend's real-time factor of its length, so results of audio written while
+    recording arrive shortly after the audio itself.
+    """
+
+    def __init__(self, backend, reference_text):
+        self.backend = backend
+        self.reference_text = reference_text
+        self._words = backend._split_words(reference_text)
+        self._jobs = queue.Queue()
+        self._events = queue.Queue()
+        self._pending = 0  # samples received but not yet part of a segment
+        self._segment_start = 0
+        self._ready_at = time.monotonic() + backend.latency
+        throttled = backend._throttled()
+        if throttled:
+            self._events.put(('canceled', throttled))
+            return
+        threading.Thread(target=self._work, name="fake-recognizer", daemon=True).start()
+
+    def write(self, data):
+        self._pending += len(data) // 2
+        while self._pending >= SEGMENT_SECONDS * SAMPLE_RATE:
+            self._schedule(SEGMENT_SECONDS * SAMPLE_RATE, last=False)
+
+    def close(self):
+        self._schedule(self._pending, last=True)
+
+    def _schedule(self, samples, last):
+        seconds = samples / SAMPLE_RATE
+        processing = max(0.0, self.backend.real_time_factor * seconds + self.backend.rng.gauss(0, self.backend.jitter))
+        self._ready_at = max(time.monotonic(), self._ready_at) + processing
+
+        words_per_segment = math.ceil(SEGMENT_SECONDS * WORDS_PER_SECOND)
+        words = self._words if last else self._words[:words_per_segment]
+        self._words = [] if last else self._words[words_per_segment:]
+        offset = self._segment_start * TICKS_PER_SECOND // SAMPLE_RATE
+        self._jobs.put((self._ready_at, words, offset, int(seconds * TICKS_PER_SECOND), last))
+        self._segment_start += samples
+        self._pending -= samples
+
+    def _work(self):
+        try:
+            while True:
+                ready_at, words, offset, duration, last = self._jobs.get()
+                time.sleep(max(0.0, ready_at - time.monotonic()))
+                failed = self.backend._failed()
+                if failed:
+                    self._events.put(('canceled', failed))
+                    return
+                if words:
+                    self._events.put(('recognized', self.backend._make_result(words, offset, duration)))
+                if last:
+                    self._events.put(('stopped', None))
+                    return
+        finally:
+            if self.backend.quota is not None:
+                self.backend.quota.exit()
+
+    def results(self):
+        return collect_segments(self.backend, self._events, self.reference_text, time.perf_counter())
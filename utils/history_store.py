@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from config import *
+
+
+class HistoryStore:
+    """SQLite history of every learner's attempts with per-phoneme aggregates kept up to date on insert.
+
+    Each attempt stores its scores plus its words and phonemes as compressed
+    JSON. Per-phoneme rows carry running totals as of that attempt, so totals
+    over the last N attempts are the latest totals minus those just before the
+    window: one index lookup per phoneme instead of a scan of the attempts.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    id INTEGER PRIMARY KEY,
+                    learner TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    reference_text TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accuracy REAL, fluency REAL, completeness REAL, prosody REAL, pronunciation REAL,
+                    word_count INTEGER NOT NULL,
+                    detail BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS attempts_learner ON attempts (learner, language, id);
+
+                CREATE TABLE IF NOT EXISTS attempt_phonemes (
+                    learner TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    phoneme TEXT NOT NULL,
+                    attempt_id INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    score_sum REAL NOT NULL,
+                    errors INTEGER NOT NULL,
+                    cum_count INTEGER NOT NULL,
+                    cum_score_sum REAL NOT NULL,
+                    cum_errors INTEGER NOT NULL,
+                    PRIMARY KEY (learner, language, phoneme, attempt_id)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS phoneme_stats (
+                    learner TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    phoneme TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    score_sum REAL NOT NULL,
+                    errors INTEGER NOT NULL,
+                    last_attempt_id INTEGER NOT NULL,
+                    PRIMARY KEY (learner, language, phoneme)
+                ) WITHOUT ROWID;
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def record_attempt(self, learner, language, reference_text, assessment):
+        """Store one AssessmentResult and fold its phonemes into the learner's aggregates"""
+        words = []
+        per_phoneme = defaultdict(lambda: [0, 0.0, 0])
+        for word in assessment.words:
+            phonemes = [[p, round(s, 1)] for p, s in assessment.word_phonemes(word)]
+            words.append([word.word, round(word.accuracy_score, 1), word.error_type, phonemes])
+            if language == "Japanese":
+                continue  # morae are filled in locally with a fixed score, not measured
+            for phoneme, score in phonemes:
+                totals = per_phoneme[phoneme]
+                totals[0] += 1
+                totals[1] += score
+                totals[2] += score < HISTORY_ERROR_SCORE
+        detail = zlib.compress(json.dumps(words, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # running totals must not interleave between processes
+        try:
+            attempt_id = conn.execute(
+                "INSERT INTO attempts (learner, language, reference_text, created, accuracy, fluency, completeness,"
+                " prosody, pronunciation, word_count, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (learner, language, reference_text, time.time(), assessment.accuracy_score,
+                 assessment.fluency_score, assessment.completeness_score, assessment.prosody_score,
+                 assessment.pronunciation_score, len(assessment.words), detail)
+            ).lastrowid
+
+            for phoneme, (count, score_sum, errors) in per_phoneme.items():
+                row = conn.execute(
+                    "INSERT INTO phoneme_stats (learner, language, phoneme, count, score_sum, errors, last_attempt_id)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (learner, language, phoneme) DO UPDATE SET"
+                    " count = count + excluded.count, score_sum = score_sum + excluded.score_sum,"
+                    " errors = errors + excluded.errors, last_attempt_id = excluded.last_attempt_id"
+                    " RETURNING count, score_sum, errors",
+                    (learner, language, phoneme, count, score_sum, errors, attempt_id)
+                ).fetchone()
+                conn.execute(
+                    "INSERT INTO attempt_phonemes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (learner, language, phoneme, attempt_id, count, score_sum, errors, *row)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return attempt_id
+
+    def weakest_phonemes(self, learner, language, limit=10, last_attempts=HISTORY_WINDOW,
+                         min_count=HISTORY_MIN_PHONEME_COUNT):
+        """Lowest average phoneme scores over the learner's last `last_attempts` attempts.
+
+        Returns dicts with phoneme, count, average score and error rate, weakest first.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id FROM attempts WHERE learner = ? AND language = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (learner, language, last_attempts)
+        ).fetchone()
+        window_start = row[0] if row else 0  # last attempt before the window
+
+        rows = conn.execute("""
+            SELECT phoneme, count, score_sum / count AS average, CAST(errors AS REAL) / count
+            FROM (
+                SELECT s.phoneme,
+                       s.count - COALESCE(b.cum_count, 0) AS count,
+                       s.score_sum - COALESCE(b.cum_score_sum, 0) AS score_sum,
+                       s.errors - COALESCE(b.cum_errors, 0) AS errors
+                FROM phoneme_stats s
+                LEFT JOIN attempt_phonemes b
+                  ON b.learner = s.learner AND b.language = s.language AND b.phoneme = s.phoneme
+                 AND b.attempt_id = (SELECT MAX(p.attempt_id) FROM attempt_phonemes p
+                                     WHERE p.learner = s.learner AND p.language = s.language
+                                       AND p.phoneme = s.phoneme AND p.attempt_id <= ?)
+                WHERE s.learner = ? AND s.language = ? AND s.last_attempt_id > ?
+            )
+            WHERE count >= ?
+            ORDER BY average
+            LIMIT ?
+        """, (window_start, learner, language, window_start, min_count, limit)).fetchall()
+        return [{'phoneme': phoneme, 'count': count, 'average_score': average, 'error_rate': error_rate}
+                for phoneme, count, average, error_rate in rows]
+
+    def recent_attempts(self, learner, language, limit=50):
+        """Overall scores of the latest attempts, oldest first, for a progress chart"""
+        rows = self._connect().execute(
+            "SELECT id, created, reference_text, accuracy, fluency, completeness, prosody, pronunciation"
+            " FROM attempts WHERE learner = ? AND language = ? ORDER BY id DESC LIMIT ?",
+            (learner, language, limit)
+        ).fetchall()
+        keys = ('id', 'created', 'reference_text', 'accuracy', 'fluency', 'completeness', 'prosody',
+                'pronunciation')
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+    def attempt_words(self, attempt_id):
+        """[word, accuracy, error_type, [[phoneme, score], ...]] rows of one stored attempt"""
+        row = self._connect().execute("SELECT detail FROM attempts WHERE id = ?", (attempt_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
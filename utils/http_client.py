@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from config import *
+from utils.lazy_import import lazy_import
+from utils.rate_limit import backoff_delay
+
+requests = lazy_import("requests")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution whose result they all share"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class HttpClient:
+    """Shared keep-alive session with bounded concurrency, deadlines and backoff on 429/5xx"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, max_concurrency=HTTP_MAX_CONCURRENCY,
+                 max_retries=HTTP_MAX_RETRIES, deadline=HTTP_DEADLINE):
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, deadline=None, **kwargs):
+        """Send a request, retrying until it succeeds or `deadline` seconds have passed.
+
+        The last response is returned as-is, so callers still call raise_for_status().
+        """
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                raise requests.Timeout(f"Deadline exceeded for {method} {url}")
+            try:
+                response = self.session.request(method, url, timeout=min(HTTP_TIMEOUT, remaining), **kwargs)
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            finally:
+                self._slots.release()
+
+            retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+            if not retryable or attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = backoff_delay(attempt)
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            if time.monotonic() + delay >= expires:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
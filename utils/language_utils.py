@@ -1,62 +1,70 @@
-import jaconv
-import cutlet
-import pykakasi
 import re
+import threading
+from functools import lru_cache
+
+from config import ROMANIZATION_CACHE_SIZE
+from utils.lazy_import import lazy_import
+
+jaconv = lazy_import("jaconv")
+pykakasi = lazy_import("pykakasi")
+
+SMALL_KANA = set("ぁぃぅぇぉゃゅょゎゕゖァィゥェォャュョヮヵヶ")
+
+_kakasi = None
+_kakasi_lock = threading.Lock()
+
+
+def _get_kakasi():
+    """Building a converter loads its dictionaries, so one instance is shared by the whole process"""
+    global _kakasi
+    if _kakasi is None:
+        with _kakasi_lock:
+            if _kakasi is None:
+                _kakasi = pykakasi.kakasi()
+    return _kakasi
+
+
+@lru_cache(maxsize=ROMANIZATION_CACHE_SIZE)
+def convert_japanese(text):
+    """Cached pykakasi conversion as a tuple of (orig, hira, hepburn) tokens"""
+    kks = _get_kakasi()
+    with _kakasi_lock:
+        result = kks.convert(text)
+    return tuple((item['orig'], item['hira'], item['hepburn']) for item in result)
+
+
+def split_morae(kana):
+    """Split kana into morae, keeping small kana (きょ, しゃ, ファ) with the preceding character"""
+    morae = []
+    for char in kana:
+        if char in SMALL_KANA and morae:
+            morae[-1] += char
+        elif not char.isspace():
+            morae.append(char)
+    return morae
+
+
+def get_japanese_morae(words):
+    """Mora segmentation for all words of an utterance, converting each distinct word once"""
+    morae_by_word = {}
+    for word in set(words):
+        try:
+            morae_by_word[word] = split_morae("".join(hira for _, hira, _ in convert_japanese(word)))
+        except Exception:
+            morae_by_word[word] = []
+    return [morae_by_word[word] for word in words]
 
-def get_sample_texts():
-    return {
-        "Japanese": {
-            "Beginner": ["こんにちは", "ありがとう", "すみません"],
-            "Intermediate": ["おはようございます", "よろしくお願いします"],
-            "Advanced": ["日本語を勉強しています", "今日は良い天気ですね"]
-        },
-        "English": {
-            "Beginner": ["Hello", "Thank you", "Good morning"],
-            "Intermediate": ["How are you today?", "Nice to meet you"],
-            "Advanced": ["I am learning English pronunciation", "The weather is beautiful today"]
-        },
-        "Mandarin": {
-            "Beginner": ["你好", "谢谢", "对不起"],
-            "Intermediate": ["你好吗？", "很高兴见到你"],
-            "Advanced": ["我在学习中文发音", "今天天气很好"]
-        },
-        "Cantonese": {
-            "Beginner": ["你好", "多謝", "唔好意思"],
-            "Intermediate": ["你好嗎？", "好高興見到你"],
-            "Advanced": ["我喺度學粵語發音", "今日天氣好好"]
-        },
-        "German": {
-            "Beginner": ["Hallo", "Danke", "Entschuldigung"],
-            "Intermediate": ["Wie geht es dir?", "Freut mich dich kennenzulernen"],
-            "Advanced": ["Ich lerne deutsche Aussprache", "Das Wetter ist heute schön"]
-        }
-    }
 
 def get_romanization_with_words(text, language):
     """Get word-by-word romanization for hover display"""
     if language == "Japanese":
         try:
-            kks = pykakasi.kakasi()
-            result = kks.convert(text)
-            return [(item['orig'], item['hepburn']) for item in result]
+            return [(orig, hepburn) for orig, _, hepburn in convert_japanese(text)]
         except:
             # Fallback to simple conversion
             return [(char, jaconv.kana2alphabet(char)) for char in text]
     return [(text, text)]
 
-def fill_japanese_phonemes(word):
-    """Fill empty Japanese phonemes using pykakasi"""
-    try:
-        kks = pykakasi.kakasi()
-        result = kks.convert(word)
-        if result:
-            # Convert to phoneme-like representation
-            romaji = result[0]['hira']
-            return list(romaji)  # Simple character split as phonemes
-    except:
-        pass
-    return []
-
 def get_pronunciation_tips(language):
     tips = {
         "Japanese": [
@@ -0,0 +1,21 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a heavy module that is only imported on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__['_module']
+        if module is None:
+            # import_module holds the import lock, so concurrent first use is safe
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
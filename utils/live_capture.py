@@ -0,0 +1,114 @@
+import threading
+from contextlib import ExitStack
+
+from pydub import AudioSegment
+
+from config import *
+from utils.lazy_import import lazy_import
+from utils.metrics import count_error, span
+from utils.pcm_engine import PcmStreamConverter
+from utils.recognizer_pool import get_recognizer_pool
+
+np = lazy_import("numpy")
+
+
+class LiveAssessment:
+    """Assessment that runs while the learner records.
+
+    Browser audio chunks are converted to 16 kHz mono PCM and pushed to the
+    recognizer as they arrive, so after Stop only the last segment is left to
+    recognize. feed() may be called from the capture thread; finish() is called
+    once from the script thread, or close() if the recording is abandoned.
+    """
+
+    def __init__(self, language, reference_text, pool=None):
+        self.language = language
+        self.reference_text = reference_text
+        self.pool = pool or get_recognizer_pool()
+        self.recognition = None
+        self.finished = False
+        self._converter = PcmStreamConverter()
+        self._pcm = bytearray()
+        self._leases = ExitStack()
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return len(self._pcm) / (2 * SAMPLE_RATE)
+
+    def memory_bytes(self):
+        return len(self._pcm)
+
+    def feed(self, data, frame_rate, channels, sample_width=2):
+        """Convert one chunk of interleaved PCM and push it to the recognizer"""
+        with self._lock:
+            if self.finished or self.duration >= MAX_RECORDING_DURATION:
+                return
+            if self.recognition is None:
+                assessor = self._leases.enter_context(self.pool.acquire(self.language))
+                self.recognition = assessor.open_stream(self.reference_text)
+            with span("live_convert"):
+                pcm16 = self._converter.feed(data, frame_rate, channels, sample_width).tobytes()
+            self._pcm.extend(pcm16)
+            self.recognition.write(pcm16)
+
+    def feed_frame(self, frame):
+        """Push one av.AudioFrame as received from the WebRTC connection"""
+        samples = frame.to_ndarray()
+        if frame.format.is_planar:
+            samples = samples.T  # (channels, samples) -> interleaved
+        if samples.dtype.kind == 'f':
+            samples = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+        self.feed(samples.tobytes(), frame.sample_rate, len(frame.layout.channels), samples.dtype.itemsize)
+
+    def finish(self):
+        """End the recording; yields each remaining segment, then the final result with 'final' set"""
+        with self._lock:
+            self.finished = True
+            if self.recognition is None:
+                yield {'success': False, 'error': "No audio was recorded", 'final': True}
+                return
+            tail = self._converter.flush().tobytes()
+            self._pcm.extend(tail)
+            self.recognition.write(tail)
+            self.recognition.close()
+
+        try:
+            for result in self.recognition.results():
+                if result.get('final') and not result.get('success'):
+                    count_error("assessment")
+                yield result
+        finally:
+            self._leases.close()
+
+    def close(self):
+        """Abandon an unfinished recording, e.g. when its text changes or the session store evicts it.
+
+        The recognizer gets the end of its stream and is drained on a background
+        thread, so continuous recognition stops and the pool lease is returned
+        without blocking the script.
+        """
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            recognition = self.recognition
+        if recognition is None:
+            self._leases.close()
+            return
+        threading.Thread(target=self._drain, args=(recognition,), name="live-close", daemon=True).start()
+
+    def _drain(self, recognition):
+        try:
+            recognition.close()
+            for _ in recognition.results():
+                pass
+        except Exception:
+            count_error("recognition")
+        finally:
+            self._leases.close()
+
+    def audio(self):
+        """Everything recorded so far as 16 kHz mono PCM"""
+        with self._lock:
+            return AudioSegment(data=bytes(self._pcm), sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
@@ -0,0 +1,306 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from pydub import AudioSegment
+
+from config import *
+from utils.audio_utils import VAD_FRAME, detect_speech_frames
+from utils.lazy_import import lazy_import
+from utils.metrics import span
+from utils.pcm_engine import decode_native, downmix, quantize_int16, resample
+from utils.pitch import track_pitch
+
+np = lazy_import("numpy")
+soundfile = lazy_import("soundfile")
+
+FEATURE_VERSION = 2
+FRAME_LENGTH = SAMPLE_RATE // 40  # 25 ms analysis window
+HOP_LENGTH = SAMPLE_RATE // 100  # 10 ms between frames
+N_FFT = 1024
+N_MELS = 40
+N_MFCC = 13
+RHYTHM_BLOCK = 20  # reference frames (200 ms) per local tempo measurement
+MIN_FRAMES = 20
+MAX_BAND_RADIUS = 300  # frames; a learner 3 s off the reference's pace at any point is not following it
+FEATURE_CHUNK = 1000  # frames analyzed per batch, which bounds memory for long recordings
+DTW_CHUNK = 256  # rows of the DTW band whose distances are computed together
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _get_tables():
+    """Window, mel filterbank and DCT tables, built once per process"""
+    with _tables_lock:
+        if not _tables:
+            window = np.hamming(FRAME_LENGTH).astype(np.float32)
+
+            def mel(hz):
+                return 2595 * np.log10(1 + hz / 700)
+
+            edges_mel = np.linspace(mel(0), mel(SAMPLE_RATE / 2), N_MELS + 2)
+            edges = 700 * (10 ** (edges_mel / 2595) - 1) * N_FFT / SAMPLE_RATE
+            bins = np.arange(N_FFT // 2 + 1)[:, None]
+            rising = (bins - edges[:-2]) / (edges[1:-1] - edges[:-2])
+            falling = (edges[2:] - bins) / (edges[2:] - edges[1:-1])
+            filterbank = np.maximum(0, np.minimum(rising, falling))  # (bins, mels)
+            # Pre-emphasis folded into the filterbank as its power response |1 - 0.97 e^{-jw}|^2
+            emphasis = np.abs(1 - 0.97 * np.exp(-2j * np.pi * np.arange(N_FFT // 2 + 1) / N_FFT)) ** 2
+
+            n = np.arange(N_MELS)
+            dct = np.cos(np.pi / N_MELS * (n[:, None] + 0.5) * np.arange(N_MFCC)).astype(np.float32)
+            _tables.update(window=window, filterbank=(filterbank * emphasis[:, None]).astype(np.float32), dct=dct)
+        return _tables
+
+
+class SpeechFeatures:
+    """Per-frame features of one utterance (10 ms frames, silence at the edges removed).
+
+    mfcc has the per-utterance mean removed, so microphone and voice differences
+    matter less; pitch is in semitones from the utterance median, NaN where unvoiced.
+    """
+
+    def __init__(self, mfcc, log_energy, pitch):
+        self.mfcc = mfcc
+        self.log_energy = log_energy
+        self.pitch = pitch
+
+    def __len__(self):
+        return len(self.mfcc)
+
+    @property
+    def duration(self):
+        return len(self) * HOP_LENGTH / SAMPLE_RATE
+
+
+def _speech_only(pcm16):
+    """The stretch from the first to the last frame the VAD calls speech"""
+    speech = np.flatnonzero(detect_speech_frames(pcm16))
+    if not len(speech):
+        return pcm16
+    return pcm16[speech[0] * VAD_FRAME:(speech[-1] + 1) * VAD_FRAME]
+
+
+def _analyze_frames(frames, tables):
+    """Unnormalized MFCC and log energy of a batch of windowed frames"""
+    log_energy = np.log(np.einsum('ij,ij->i', frames, frames) + 1e-10).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2
+    log_mel = np.log(power.astype(np.float32) @ tables['filterbank'] + 1e-10)
+    mfcc = (log_mel @ tables['dct'])[:, 1:]  # c0 is overall level, already in log_energy
+    return mfcc, log_energy
+
+
+def extract_features(pcm16):
+    """MFCC, log energy and pitch of 16 kHz mono int16 PCM, computed in vectorized batches of frames.
+
+    Pitch comes from the same YIN tracker as the tone display, so both agree on the same audio.
+    """
+    tables = _get_tables()
+    speech = _speech_only(pcm16)
+    samples = speech.astype(np.float32) / 32768.0
+    if len(samples) < FRAME_LENGTH:
+        return SpeechFeatures(np.zeros((0, N_MFCC - 1), np.float32), np.zeros(0, np.float32),
+                              np.zeros(0, np.float32))
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_LENGTH)[::HOP_LENGTH]
+    batches = [_analyze_frames(frames[start:start + FEATURE_CHUNK] * tables['window'], tables)
+               for start in range(0, len(frames), FEATURE_CHUNK)]
+    mfcc, log_energy = [np.concatenate(parts) for parts in zip(*batches)]
+    mfcc -= mfcc.mean(axis=0)
+    pitch = track_pitch(speech).semitones()  # same 25 ms / 10 ms framing, so one value per frame
+    return SpeechFeatures(mfcc, log_energy, pitch)
+
+
+def banded_dtw(a, b, band=LOCAL_DTW_BAND):
+    """Align two sequences of unit vectors by cosine distance; returns (path rows, path cols, mean distance).
+
+    Uses the symmetric slope-constrained steps (1,1), (1,2) and (2,1), so each
+    row depends only on the two before it and is computed as one vector
+    operation. Only a Sakoe-Chiba band around the diagonal is computed or
+    stored, so memory grows with the length of the clips, not its square. The
+    path is None when the lengths differ by more than the slope limit of 2.
+    """
+    n, m = len(a), len(b)
+    if m - 1 > 2 * (n - 1) or n - 1 > 2 * (m - 1):
+        return None, None, None
+    radius = max(RHYTHM_BLOCK, min(MAX_BAND_RADIUS, int(band * max(n, m))))
+    centers = np.arange(n) * (m - 1) / max(n - 1, 1)
+    # Rows 0 and 1 are infinite padding; row r stores columns from lows[r] - 2, and the band
+    # moves at most 2 columns per row, so the extra width covers the steps' reach into earlier rows
+    lows = np.concatenate(([0, 0], np.maximum(0, (centers - radius).astype(int))))
+    highs = np.concatenate(([0, 0], np.minimum(m, (centers + radius).astype(int) + 1)))
+    width = int((highs - lows).max()) + 6
+    cost = np.full((n + 2, width), np.inf, dtype=np.float32)
+    total = np.full((n + 2, width), np.inf, dtype=np.float32)
+    columns = lows[2:, None] - 2 + np.arange(width)
+    outside = (columns < lows[2:, None]) | (columns >= highs[2:, None])
+    for start in range(0, n, DTW_CHUNK):
+        rows = slice(start, start + DTW_CHUNK)
+        cost[start + 2:start + 2 + DTW_CHUNK] = np.where(
+            outside[rows], np.inf, 1 - np.einsum('ijk,ik->ij', b[np.clip(columns[rows], 0, m - 1)], a[rows]))
+    double = 2 * cost
+    total[2, 2] = double[2, 2]
+
+    lows, highs = lows.tolist(), highs.tolist()  # plain ints keep the per-row bookkeeping cheap
+    minimum, add = np.minimum, np.add
+    for r in range(3, n + 2):
+        k = highs[r] - lows[r]
+        p, q = lows[r] - lows[r - 1] + 2, lows[r] - lows[r - 2] + 2  # band start's position in rows r-1, r-2
+        row = total[r, 2:2 + k]
+        skip = add(total[r - 1, p - 2:p - 2 + k], double[r, 1:1 + k])  # (1,2) through (i, j-1)
+        minimum(skip, add(total[r - 2, q - 1:q - 1 + k], double[r - 1, p:p + k]), out=skip)  # (2,1) via (i-1, j)
+        skip += cost[r, 2:2 + k]
+        add(total[r - 1, p - 1:p - 1 + k], double[r, 2:2 + k], out=row)  # (1,1)
+        minimum(row, skip, out=row)
+
+    def at(matrix, r, j):
+        index = j - lows[r] + 2
+        return float(matrix[r, index]) if 0 <= index < width else np.inf
+
+    if not np.isfinite(at(total, n + 1, m - 1)):
+        return None, None, None
+    # Walk back choosing the step each cell came from, which is cheaper than storing every choice
+    rows, cols = [n - 1], [m - 1]
+    r, j = n + 1, m - 1
+    while r > 2 or j > 0:
+        diagonal = at(total, r - 1, j - 1) + at(cost, r, j)
+        horizontal = at(total, r - 1, j - 2) + 2 * at(cost, r, j - 1)
+        vertical = at(total, r - 2, j - 1) + 2 * at(cost, r - 1, j)
+        if diagonal <= horizontal and diagonal <= vertical:
+            r, j = r - 1, j - 1
+        elif horizontal <= vertical:
+            rows.append(r - 2)
+            cols.append(j - 1)
+            r, j = r - 1, j - 2
+        else:
+            rows.append(r - 3)
+            cols.append(j)
+            r, j = r - 2, j - 1
+        rows.append(r - 2)
+        cols.append(j)
+    return np.array(rows[::-1]), np.array(cols[::-1]), at(total, n + 1, m - 1) / (n + m)
+
+
+def _correlation(a, b):
+    valid = ~(np.isnan(a) | np.isnan(b))
+    if valid.sum() < MIN_FRAMES or a[valid].std() == 0 or b[valid].std() == 0:
+        return None
+    return float(np.corrcoef(a[valid], b[valid])[0, 1])
+
+
+def compare_features(learner, reference):
+    """Similarity, rhythm, stress and intonation scores (0-100) of a recording against the reference"""
+    if len(learner) < MIN_FRAMES or len(reference) < MIN_FRAMES:
+        return {'success': False, 'error': "Recording too short for a quick check"}
+
+    a = learner.mfcc / (np.linalg.norm(learner.mfcc, axis=1, keepdims=True) + 1e-10)
+    b = reference.mfcc / (np.linalg.norm(reference.mfcc, axis=1, keepdims=True) + 1e-10)
+    rows, cols, distance = banded_dtw(a, b)
+    tempo_ratio = len(learner) / len(reference)
+    if rows is None:
+        return {'success': False, 'error': f"Speed too different from the reference ({tempo_ratio:.1f}x) to compare"}
+
+    good, bad = LOCAL_SIMILARITY_RANGE
+    similarity = 100 * float(np.clip((bad - distance) / (bad - good), 0, 1))
+
+    # Learner time spent on each 200 ms block of the reference, relative to the overall tempo
+    position = np.bincount(cols, weights=rows) / np.bincount(cols)  # learner frame aligned to each reference frame
+    spent = np.diff(position[::RHYTHM_BLOCK])
+    deviation = np.abs(np.log2(np.maximum(spent, 1) / (RHYTHM_BLOCK * tempo_ratio)))
+    rhythm = 100 * max(0.0, 1 - float(deviation.mean()) / LOCAL_RHYTHM_TOLERANCE) if len(deviation) else 100.0
+
+    stress = _correlation(learner.log_energy[rows], reference.log_energy[cols])
+    intonation = _correlation(learner.pitch[rows], reference.pitch[cols])
+    stress, intonation = [None if c is None else 100 * max(0.0, c) for c in (stress, intonation)]
+    scores = [score for score in (similarity, rhythm, stress, intonation) if score is not None]
+    return {
+        'success': True,
+        'similarity_score': similarity,
+        'rhythm_score': rhythm,
+        'stress_score': stress,
+        'intonation_score': intonation,
+        'overall_score': sum(scores) / len(scores),
+        'tempo_ratio': tempo_ratio,
+        'duration': learner.duration,
+        'reference_duration': reference.duration
+    }
+
+
+def load_audio_file(path):
+    """Any audio file as 16 kHz mono int16: WAV natively, MP3/OGG/FLAC via libsndfile, else ffmpeg"""
+    with open(path, "rb") as f:
+        data = f.read()
+    decoded = decode_native(data, input_format=None)
+    if decoded is None:
+        try:
+            decoded = soundfile.read(io.BytesIO(data), dtype='float32', always_2d=True)
+        except Exception:
+            decoded = decode_native(AudioSegment.from_file(io.BytesIO(data)))
+    samples, rate = decoded
+    return quantize_int16(resample(downmix(samples), rate, SAMPLE_RATE), dither=False)
+
+
+class ReferenceFeatureCache:
+    """Features of reference clips such as generated TTS audio, keyed by file content.
+
+    Recently used features stay in memory and all are saved as .npz, so each
+    reference is decoded and analyzed once across reruns and processes.
+    """
+
+    def __init__(self, directory=LOCAL_SCORING_CACHE_DIR, max_entries=LOCAL_SCORING_MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, path):
+        with open(path, "rb") as f:
+            key = hashlib.sha256(f.read() + str(FEATURE_VERSION).encode()).hexdigest()
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        cache_path = os.path.join(self.directory, f"{key}.npz")
+        try:
+            with np.load(cache_path, allow_pickle=False) as saved:
+                features = SpeechFeatures(saved['mfcc'], saved['log_energy'], saved['pitch'])
+        except (OSError, KeyError, ValueError):
+            with span("reference_features"):
+                features = extract_features(load_audio_file(path))
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.npz"
+            np.savez(temp_path, mfcc=features.mfcc, log_energy=features.log_energy, pitch=features.pitch)
+            os.replace(temp_path, cache_path)
+
+        with self._lock:
+            self._memory[key] = features
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return features
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_reference_feature_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReferenceFeatureCache()
+        return _cache
+
+
+def quick_score(audio, reference_path):
+    """Offline scores of a 16 kHz mono PCM AudioSegment against a reference clip, no service involved"""
+    try:
+        reference = get_reference_feature_cache().get(reference_path)
+        with span("local_score"):
+            learner = extract_features(np.frombuffer(audio.raw_data, dtype='<i2'))
+            return compare_features(learner, reference)
+    except Exception as e:
+        return {'success': False, 'error': f"Quick check error: {str(e)}"}
@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_LOG, METRICS_PORT
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "pronunciation"
+
+logger = logging.getLogger("pronunciation.metrics")
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count, sum]
+_counters = {}  # (name, stage) -> count
+_gauges = {}  # name -> value
+_server = None
+
+
+def configure_logging(stream=None):
+    """Send the JSON measurement lines to stderr (or ``stream``); done once at import when METRICS_LOG is set"""
+    if not any(getattr(handler, '_metrics_handler', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler._metrics_handler = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # the handler above already writes each line once
+
+
+if METRICS_LOG:
+    configure_logging()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+def span(stage):
+    """Time a pipeline stage; a shared no-op when metrics are disabled"""
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(stage)
+
+
+def observe(stage, seconds, error=False):
+    """Record a stage latency directly, for stages that do not fit a with-block"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(LATENCY_BUCKETS)] += 1
+        histogram[-1] += seconds
+        if error:
+            _counters[("errors_total", stage)] = _counters.get(("errors_total", stage), 0) + 1
+
+    if METRICS_LOG:
+        logger.info(json.dumps({'stage': stage, 'seconds': round(seconds, 6), 'error': error}))
+
+
+def count_error(stage):
+    """Count a failure that was reported as a result rather than raised"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[("errors_total", stage)] = _counters.get(("errors_total", stage), 0) + 1
+    if METRICS_LOG:
+        logger.info(json.dumps({'stage': stage, 'error': True}))
+
+
+def set_gauge(name, value):
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _gauges[name] = value
+    if METRICS_LOG:
+        logger.info(json.dumps({'gauge': name, 'value': value}))
+
+
+def _label(value):
+    """A label value escaped as the text format requires; stages can carry endpoint names from secrets"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {stage: list(values) for stage, values in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+    for stage, values in sorted(histograms.items()):
+        stage = _label(stage)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, values):
+            cumulative += count
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        cumulative += values[len(LATENCY_BUCKETS)]
+        lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {values[-1]}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}_{name} counter")
+        for (counter, stage), count in sorted(counters.items()):
+            if counter == name:
+                lines.append(f'{PREFIX}_{name}{{stage="{_label(stage)}"}} {count}')
+
+    for name, value in sorted(gauges.items()):
+        lines.append(f"# TYPE {PREFIX}_{name} gauge")
+        lines.append(f"{PREFIX}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics for Prometheus from a daemon thread, once per process"""
+    global _server
+    with _lock:
+        if _server is not None or not METRICS_ENABLED or not port:
+            return
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError:
+            return  # another process on this host already serves the port
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
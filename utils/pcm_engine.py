@@ -0,0 +1,222 @@
+import io
+import math
+import struct
+import wave
+
+from config import SAMPLE_RATE, RESAMPLE_ZERO_CROSSINGS, RESAMPLE_ROLLOFF, PCM_DITHER
+from utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+soundfile = lazy_import("soundfile")
+
+_filter_cache = {}
+
+
+def _raw_pcm(audio_input, input_format):
+    """(interleaved PCM bytes, sample width, channels, rate) of an AudioSegment or WAV file, or None"""
+    if hasattr(audio_input, 'raw_data'):  # pydub AudioSegment
+        return audio_input.raw_data, audio_input.sample_width, audio_input.channels, audio_input.frame_rate
+
+    if input_format == "wav" or bytes(audio_input[:4]) == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(audio_input), 'rb') as wav_file:
+                return (wav_file.readframes(wav_file.getnframes()), wav_file.getsampwidth(),
+                        wav_file.getnchannels(), wav_file.getframerate())
+        except (wave.Error, EOFError):
+            return None
+
+    return None
+
+
+def decode_native(audio_input, input_format="webm"):
+    """Decode audio without ffmpeg; returns (float32 samples of shape (frames, channels), rate) or None"""
+    raw = _raw_pcm(audio_input, input_format)
+    if raw is None:
+        return None
+    data, sample_width, channels, rate = raw
+    return _pcm_to_float(data, sample_width, channels), rate
+
+
+def _pcm_to_float(data, sample_width, channels):
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = (np.where(packed >= 1 << 23, packed - (1 << 24), packed)).astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples.reshape(-1, channels)
+
+
+def downmix(samples):
+    """Average all channels into a single mono channel"""
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def _design_filter(up, down):
+    """Kaiser-windowed sinc lowpass split into its polyphase components"""
+    key = (up, down)
+    if key not in _filter_cache:
+        factor = max(up, down)
+        half = RESAMPLE_ZERO_CROSSINGS * factor
+        n = np.arange(-half, half + 1)
+        cutoff = RESAMPLE_ROLLOFF * 0.5 / factor
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(len(n), 8.6) * up
+
+        # phases[r, k] = taps[r + k * up], reversed so it lines up with a forward sliding window
+        per_phase = math.ceil(len(taps) / up)
+        padded = np.zeros(per_phase * up)
+        padded[:len(taps)] = taps
+        phases = padded.reshape(per_phase, up).T[:, ::-1]
+        _filter_cache[key] = (np.ascontiguousarray(phases, dtype=np.float32), half)
+    return _filter_cache[key]
+
+
+def resample(samples, rate_in, rate_out=SAMPLE_RATE):
+    """Polyphase windowed-sinc resampling of a mono float signal"""
+    if rate_in == rate_out or len(samples) == 0:
+        return samples
+
+    g = math.gcd(rate_in, rate_out)
+    up, down = rate_out // g, rate_in // g
+    phases, half = _design_filter(up, down)
+    per_phase = phases.shape[1]
+
+    n_out = -(-len(samples) * up // down)
+    padded = np.concatenate([
+        np.zeros(per_phase - 1, dtype=np.float32),
+        samples.astype(np.float32, copy=False),
+        np.zeros(per_phase + half // up + 1, dtype=np.float32)
+    ])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, per_phase)
+
+    # Outputs sharing a filter phase read inputs spaced `down` apart, so each phase is one matrix-vector product
+    output = np.empty(n_out, dtype=np.float32)
+    for m0 in range(min(up, n_out)):
+        offset = m0 * down + half
+        phase, start = offset % up, offset // up
+        output[m0::up] = windows[start::down][:len(output[m0::up])] @ phases[phase]
+    return output
+
+
+class StreamResampler:
+    """Incremental version of resample() for audio that arrives in chunks.
+
+    Keeps just enough input history for the filter, so feeding a signal chunk
+    by chunk and then calling flush() gives the same samples as resample().
+    """
+
+    def __init__(self, rate_in, rate_out=SAMPLE_RATE):
+        g = math.gcd(rate_in, rate_out)
+        self.up, self.down = rate_out // g, rate_in // g
+        self.phases, self.half = _design_filter(self.up, self.down)
+        self.per_phase = self.phases.shape[1]
+        self._buffer = np.zeros(self.per_phase - 1, dtype=np.float32)
+        self._base = 0  # position of _buffer[0] in the zero-padded input
+        self._received = 0
+        self._produced = 0
+
+    def _produce(self, n_out):
+        """Outputs up to n_out (exclusive) whose filter windows are fully buffered"""
+        available = self._base + len(self._buffer) - self.per_phase
+        limit = (available * self.up - self.half) // self.down + 1 if available >= 0 else 0
+        m = np.arange(self._produced, max(self._produced, min(n_out, limit)))
+        if not len(m):
+            return np.zeros(0, dtype=np.float32)
+        offsets = m * self.down + self.half
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.per_phase)
+        output = np.einsum('ij,ij->i', windows[offsets // self.up - self._base], self.phases[offsets % self.up])
+        self._produced = int(m[-1]) + 1
+
+        # Drop input no later output can reach
+        keep_from = (self._produced * self.down + self.half) // self.up - self._base
+        self._buffer = self._buffer[keep_from:]
+        self._base += keep_from
+        return output.astype(np.float32, copy=False)
+
+    def feed(self, samples):
+        self._received += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.float32, copy=False)])
+        return self._produce(float("inf"))
+
+    def flush(self):
+        self._buffer = np.concatenate([self._buffer, np.zeros(self.per_phase + self.half // self.up + 1,
+                                                              dtype=np.float32)])
+        return self._produce(-(-self._received * self.up // self.down))
+
+
+class PcmStreamConverter:
+    """Turn chunks of interleaved PCM at any rate into SAMPLE_RATE mono int16 as they arrive"""
+
+    def __init__(self):
+        self._resamplers = {}
+        self._rng = np.random.default_rng(0)
+
+    def feed(self, data, frame_rate, channels, sample_width=2):
+        if (sample_width, channels, frame_rate) == (2, 1, SAMPLE_RATE):
+            return np.frombuffer(data, dtype='<i2')  # already in the target format, so left untouched
+        resampler = self._resamplers.get(frame_rate)
+        if resampler is None:
+            resampler = self._resamplers[frame_rate] = StreamResampler(frame_rate)
+        samples = downmix(_pcm_to_float(data, sample_width, channels))
+        if frame_rate == SAMPLE_RATE:
+            return quantize_int16(samples, rng=self._rng)
+        return quantize_int16(resampler.feed(samples), rng=self._rng)
+
+    def flush(self):
+        tails = [resampler.flush() for rate, resampler in self._resamplers.items() if rate != SAMPLE_RATE]
+        if not tails:
+            return np.zeros(0, dtype='<i2')
+        return quantize_int16(np.concatenate(tails), rng=self._rng)
+
+
+def quantize_int16(samples, dither=PCM_DITHER, rng=None):
+    """Convert floats in [-1, 1] to int16 with optional TPDF dither and clipping"""
+    scaled = samples * 32767.0
+    if dither:
+        # Fixed seed keeps the output deterministic for identical input
+        rng = rng or np.random.default_rng(0)
+        scaled += rng.random(len(scaled), dtype=np.float32) - rng.random(len(scaled), dtype=np.float32)
+    return np.clip(np.rint(scaled), -32768, 32767).astype('<i2')
+
+
+def wav_header(num_samples, sample_rate=SAMPLE_RATE, channels=1, sample_width=2):
+    data_size = num_samples * channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * channels * sample_width,
+        channels * sample_width, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def normalize_to_pcm16(audio_input, input_format="webm"):
+    """Downmix, resample and quantize to SAMPLE_RATE mono int16, or None if the container needs ffmpeg"""
+    raw = _raw_pcm(audio_input, input_format)
+    if raw is None:
+        return None
+    data, sample_width, channels, rate = raw
+    if (sample_width, channels, rate) == (2, 1, SAMPLE_RATE):
+        return np.frombuffer(data, dtype='<i2')  # nothing to convert, so no float round trip and no dither
+    return quantize_int16(resample(downmix(_pcm_to_float(data, sample_width, channels)), rate, SAMPLE_RATE))
+
+
+def encode_wav(pcm16, sample_rate=SAMPLE_RATE):
+    return wav_header(len(pcm16), sample_rate) + pcm16.tobytes()
+
+
+def encode_ogg_opus(pcm16, sample_rate=SAMPLE_RATE):
+    """Compress mono int16 PCM to Ogg/Opus in-process with libsndfile (about 30 kbit/s for speech)"""
+    buffer = io.BytesIO()
+    soundfile.write(buffer, pcm16, sample_rate, format='OGG', subtype='OPUS')
+    return buffer.getvalue()
@@ -0,0 +1,180 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import *
+from utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+HOP = SAMPLE_RATE // 100  # 10 ms, so frame i starts at Azure offset i * 100_000 ticks
+WINDOW = SAMPLE_RATE // 40  # 25 ms integration window
+MIN_LAG, MAX_LAG = SAMPLE_RATE // PITCH_MAX_F0, SAMPLE_RATE // PITCH_MIN_F0
+FRAME = WINDOW + MAX_LAG  # each frame holds the window plus its furthest shifted copy
+N_FFT = 1024  # >= FRAME, so the cross-correlation never wraps around
+CHUNK = 1000  # frames analyzed per batch, which bounds memory for long recordings
+TICKS_PER_FRAME = 100_000  # Azure offsets and durations are in 100 ns ticks
+
+MANDARIN_TONES = {"level": 1, "rising": 2, "dipping": 3, "falling": 4}
+
+
+class PitchTrack:
+    """F0 of a recording in Hz per 10 ms frame, NaN where unvoiced.
+
+    Frame i covers the 25 ms starting at i * 10 ms of the PCM that was sent
+    for assessment, so Azure word offsets index it directly.
+    """
+
+    def __init__(self, f0):
+        self.f0 = f0
+        voiced = f0[~np.isnan(f0)]
+        self.median = float(np.median(voiced)) if len(voiced) else None
+
+    def __len__(self):
+        return len(self.f0)
+
+    def memory_bytes(self):
+        return self.f0.nbytes + 64
+
+    def semitones(self):
+        """Contour relative to the speaker's median pitch, which is what tones are heard against"""
+        if self.median is None:
+            return np.full(len(self.f0), np.nan, dtype=np.float32)
+        return (12 * np.log2(self.f0 / self.median)).astype(np.float32)
+
+    def frames(self, offset, duration):
+        """Frame range of an Azure (offset, duration) span in ticks"""
+        start = int(offset // TICKS_PER_FRAME)
+        return slice(start, max(start + 1, int((offset + duration) // TICKS_PER_FRAME)))
+
+
+def _yin_frames(frames):
+    """Best lag (fractional, in samples) and its YIN aperiodicity for a batch of frames.
+
+    The difference function d(tau) = e(0) + e(tau) - 2 r(tau) comes from one
+    FFT cross-correlation per frame plus cumulative sums of squares, so no lag
+    is computed in a Python loop.
+    """
+    spectrum = np.fft.rfft(frames, N_FFT)
+    window_spectrum = np.fft.rfft(frames[:, :WINDOW], N_FFT)
+    correlation = np.fft.irfft(np.conj(window_spectrum) * spectrum, N_FFT)[:, :MAX_LAG + 1]
+    energy = np.concatenate((np.zeros((len(frames), 1)), np.cumsum(frames ** 2, axis=1)), axis=1)
+    shifted_energy = energy[:, WINDOW:WINDOW + MAX_LAG + 1] - energy[:, :MAX_LAG + 1]
+    difference = np.maximum(energy[:, WINDOW:WINDOW + 1] + shifted_energy - 2 * correlation, 0)
+
+    # Cumulative mean normalized difference, for lags 1..MAX_LAG
+    lags = np.arange(1, MAX_LAG + 1)
+    running = np.cumsum(difference[:, 1:], axis=1)
+    normalized = np.where(running > 0, difference[:, 1:] * lags / np.maximum(running, 1e-12), 1.0)
+    normalized = normalized[:, MIN_LAG - 1:]
+
+    # First dip below the threshold, followed down to its minimum; without one, the global minimum
+    below = normalized < PITCH_YIN_THRESHOLD
+    starts = below & ~np.pad(below, ((0, 0), (1, 0)))[:, :-1]
+    first_dip = below & (np.cumsum(starts, axis=1) == 1)
+    best = np.where(below.any(axis=1), np.where(first_dip, normalized, np.inf).argmin(axis=1),
+                    normalized.argmin(axis=1))
+
+    # Parabolic interpolation between neighbouring lags
+    rows = np.arange(len(best))
+    inner = np.clip(best, 1, normalized.shape[1] - 2)
+    left, middle, right = (normalized[rows, inner - 1], normalized[rows, inner], normalized[rows, inner + 1])
+    curvature = left - 2 * middle + right
+    shift = np.where(curvature > 0, 0.5 * (left - right) / np.where(curvature > 0, curvature, 1), 0)
+    lag = np.where(best == inner, best + np.clip(shift, -1, 1), best) + MIN_LAG
+    return lag, normalized[rows, best], energy[:, WINDOW] / WINDOW
+
+
+def track_pitch(pcm16):
+    """YIN pitch track of 16 kHz mono int16 PCM, computed in vectorized batches of frames"""
+    samples = pcm16.astype(np.float64) / 32768.0
+    if len(samples) < WINDOW:
+        return PitchTrack(np.full(0, np.nan, dtype=np.float32))
+    samples = np.concatenate((samples, np.zeros(FRAME - WINDOW)))  # the last windows need their shifted copies
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+    batches = [_yin_frames(frames[start:start + CHUNK]) for start in range(0, len(frames), CHUNK)]
+    lag, aperiodicity, power = [np.concatenate(parts) for parts in zip(*batches)]
+
+    voiced = (aperiodicity < PITCH_YIN_THRESHOLD) & (power > 10 ** (PITCH_MIN_POWER_DB / 10))
+    f0 = np.full(len(lag), np.nan, dtype=np.float32)
+    if voiced.any():
+        # A 5-frame median over voiced neighbours removes isolated octave jumps
+        log_f0 = np.where(voiced, np.log2(SAMPLE_RATE / lag), np.nan)
+        windows = np.lib.stride_tricks.sliding_window_view(np.pad(log_f0, 2, constant_values=np.nan), 5)
+        f0[voiced] = 2 ** np.nanmedian(windows[voiced], axis=1)
+    return PitchTrack(f0)
+
+
+def describe_contour(semitones):
+    """(height, shape, start, end) of a syllable's contour in semitones from the speaker's median, or None"""
+    contour = semitones[~np.isnan(semitones)]
+    if len(contour) < 3:
+        return None
+    edge = max(1, len(contour) // 5)
+    start, end = contour[:edge].mean(), contour[-edge:].mean()
+    low = contour[edge:-edge].min() if len(contour) > 2 * edge else min(start, end)
+    mean = contour.mean()
+
+    if min(start, end) - low > TONE_CHANGE_SEMITONES / 2:
+        shape = "dipping"
+    elif end - start > TONE_CHANGE_SEMITONES:
+        shape = "rising"
+    elif start - end > TONE_CHANGE_SEMITONES:
+        shape = "falling"
+    else:
+        shape = "level"
+    height = "high" if mean > TONE_CHANGE_SEMITONES else "low" if mean < -TONE_CHANGE_SEMITONES else "mid"
+    return height, shape, float(start), float(end)
+
+
+def syllable_tones(track, assessment):
+    """Contour of every syllable, taking each Chinese character of a word as one syllable.
+
+    Syllables use the word's phoneme timings when Azure returns one phoneme per
+    character, and otherwise split the word's span evenly.
+    """
+    semitones = track.semitones()
+    rows = []
+    for word in assessment.words:
+        if not word.duration:
+            continue  # omitted words have no timing
+        syllables = [char for char in word.word if char.isalpha()] if not word.word.isascii() else [word.word]
+        count = len(syllables)
+        if word.phoneme_end - word.phoneme_start == count and any(
+                assessment.phoneme_durations[word.phoneme_start:word.phoneme_end]):
+            spans = zip(assessment.phoneme_offsets[word.phoneme_start:word.phoneme_end],
+                        assessment.phoneme_durations[word.phoneme_start:word.phoneme_end])
+        else:
+            step = word.duration / max(count, 1)
+            spans = [(word.offset + i * step, step) for i in range(count)]
+
+        for syllable, (offset, duration) in zip(syllables, spans):
+            described = describe_contour(semitones[track.frames(offset, duration)])
+            if described is None:
+                rows.append({'word': word.word, 'syllable': syllable, 'height': None, 'shape': None,
+                             'start': None, 'end': None, 'mandarin_tone': None})
+                continue
+            height, shape, start, end = described
+            tone = 3 if height == "low" and shape != "rising" else MANDARIN_TONES[shape]
+            rows.append({'word': word.word, 'syllable': syllable, 'height': height, 'shape': shape,
+                         'start': start, 'end': end, 'mandarin_tone': tone})
+    return rows
+
+
+_tracks = OrderedDict()
+_tracks_lock = threading.Lock()
+
+
+def get_pitch_track(pcm16):
+    """Pitch track of a recording, computed once per distinct PCM and kept in a small LRU"""
+    key = hashlib.blake2b(pcm16.tobytes(), digest_size=16).digest()
+    with _tracks_lock:
+        if key in _tracks:
+            _tracks.move_to_end(key)
+            return _tracks[key]
+    track = track_pitch(pcm16)
+    with _tracks_lock:
+        _tracks[key] = track
+        while len(_tracks) > PITCH_CACHE_SIZE:
+            _tracks.popitem(last=False)
+    return track
@@ -0,0 +1,132 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from config import *
+from utils.metrics import count_error
+from utils.speech_service import PronunciationAssessment
+
+
+def get_pool_key(language):
+    """Assessors can only be shared between requests with identical settings"""
+    return (LANGUAGE_CONFIG[language]["locale"], GRADING_SYSTEM, GRANULARITY, ENABLE_MISCUE, ENABLE_PROSODY)
+
+
+class RecognizerPool:
+    """Process-wide pool of pre-configured assessors with warm service connections"""
+
+    def __init__(self, max_idle=RECOGNIZER_POOL_SIZE, idle_timeout=RECOGNIZER_IDLE_TIMEOUT,
+                 backend=RECOGNIZER_BACKEND, backend_options=None):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.backend = backend
+        self.backend_options = backend_options or {}
+        self._idle = {}  # pool key -> [(assessor, released_at), ...]
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+
+    @contextmanager
+    def acquire(self, language):
+        assessor = self._checkout(language)
+        try:
+            yield assessor
+        except BaseException:
+            assessor.healthy = False
+            raise
+        finally:
+            self._checkin(language, assessor)
+
+    def _checkout(self, language):
+        key = get_pool_key(language)
+        now = time.monotonic()
+        with self._lock:
+            self.in_use += 1
+            entries = self._idle.get(key, [])
+            while entries:
+                assessor, released_at = entries.pop()
+                if now - released_at <= self.idle_timeout:
+                    self.hits += 1
+                    return assessor
+                self.recycled += 1
+            self.misses += 1
+
+        try:
+            return self._create(language)
+        except BaseException:
+            with self._lock:
+                self.in_use -= 1
+            raise
+
+    def _create(self, language):
+        return PronunciationAssessment(language, self.backend, **self.backend_options)
+
+    def _checkin(self, language, assessor):
+        key = get_pool_key(language)
+        with self._lock:
+            self.in_use -= 1
+            if not assessor.healthy:
+                self.recycled += 1
+                return
+            if len(self._idle.get(key, [])) >= self.max_idle:
+                return
+
+        # The previous recognizer is spent, so open a fresh connection for the next caller
+        assessor.prewarm()
+        with self._lock:
+            self._idle.setdefault(key, []).append((assessor, time.monotonic()))
+
+    def warm_up(self, language, count=1):
+        """Fill the pool with ready assessors for a language before traffic arrives"""
+        assessors = [self._create(language) for _ in range(count)]
+        for assessor in assessors:
+            with self._lock:
+                self.in_use += 1
+            self._checkin(language, assessor)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': sum(len(entries) for entries in self._idle.values()),
+                'in_use': self.in_use,
+                'hits': self.hits,
+                'misses': self.misses,
+                'recycled': self.recycled,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_warm_up_started = False
+
+
+def get_recognizer_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RecognizerPool()
+        return _pool
+
+
+def warm_up_recognizers():
+    """Open RECOGNIZER_WARM_ON_STARTUP assessors for every language in the background, once per process"""
+    global _warm_up_started
+    with _pool_lock:
+        if _warm_up_started or not RECOGNIZER_WARM_ON_STARTUP:
+            return
+        _warm_up_started = True
+
+    pool = get_recognizer_pool()
+
+    def warm_all():
+        for language in LANGUAGE_CONFIG:
+            try:
+                pool.warm_up(language, RECOGNIZER_WARM_ON_STARTUP)
+            except Exception:
+                count_error("recognizer_warm_up")  # the first request opens its own connection instead
+
+    threading.Thread(target=warm_all, name="recognizer-warm-up", daemon=True).start()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import *
+
+
+def make_cache_key(pcm_audio, reference_text, language):
+    """Content hash of the normalized PCM plus everything that changes the assessment"""
+    digest = hashlib.sha256()
+    digest.update(getattr(pcm_audio, 'raw_data', pcm_audio))
+    settings = [reference_text, LANGUAGE_CONFIG[language]["locale"], GRADING_SYSTEM, GRANULARITY,
+                ENABLE_MISCUE, ENABLE_PROSODY]
+    digest.update(json.dumps(settings, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed assessment cache with LRU eviction by total size and a TTL.
+
+    Every thread gets its own connection and the database runs in WAL mode, so
+    several server processes can share one cache file.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is not None and now - row[1] > self.ttl:
+            with conn:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        with conn:
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        value = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, value, len(value), now, now))
+            conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def stats(self):
+        entries, total = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'bytes': total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def get_cached_assessment(pcm_audio, reference_text, language, assess):
+    """Return a cached result for identical audio and settings, otherwise call `assess()` and store it"""
+    if not RESULT_CACHE_ENABLED:
+        return assess()
+
+    cache = get_result_cache()
+    key = make_cache_key(pcm_audio, reference_text, language)
+    result = cache.get(key)
+    if result is None:
+        result = assess()
+        if result.get('success'):
+            cache.put(key, result)
+    return result
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from html import escape
+
+from utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# Compact single-line templates: indented lines inside st.markdown would be read as code blocks
+PHONEME_TEMPLATE = ('<div class="phoneme-container"><strong>{}:</strong>'
+                    '<div class="phoneme-scores">{}</div><div class="phoneme-letters">{}</div></div>')
+SCORE_CARD_TEMPLATE = '<div class="metric-card {}"><h3>{}</h3><h2>{:.0f}</h2></div>'
+
+# Scores are 0-100, so every phoneme score span is rendered once up front
+SCORE_SPANS = [f'<span class="phoneme-score">{score}</span>' for score in range(101)]
+
+
+def _score_spans(scores):
+    """Span for every phoneme score, looked up instead of formatted one by one"""
+    rounded = np.rint(np.frombuffer(scores, dtype=np.float32))  # half-even, like the {:.0f} format
+    if len(rounded) and (rounded.min() < 0 or rounded.max() > 100):
+        return [f'<span class="phoneme-score">{score:.0f}</span>' for score in scores]
+    return list(map(SCORE_SPANS.__getitem__, rounded.astype(np.int64).tolist()))
+
+
+def _escape(text):
+    return text if text.isalnum() else escape(text)  # most words have nothing to escape
+
+
+@lru_cache(maxsize=1024)
+def _letter_span(phoneme):
+    return f'<span class="phoneme-letter">{escape(phoneme)}</span>'
+
+
+def _word_class(accuracy):
+    return "word-correct" if accuracy >= 80 else "word-partial" if accuracy >= 60 else "word-incorrect"
+
+
+def build_result_html(assessment, phonemes=True):
+    """Word-analysis and phoneme views in one pass over the words, each as a single HTML block"""
+    words, blocks = [], []
+    if phonemes:
+        score_spans = _score_spans(assessment.phoneme_scores)
+        letter_spans = list(map(_letter_span, assessment.phonemes))
+    for word in assessment.words:
+        text = _escape(word.word)
+        words.append(f'<span class="{_word_class(word.accuracy_score)}">{text}</span> ')
+        start, end = word.phoneme_start, word.phoneme_end
+        if phonemes and end > start:
+            blocks.append(PHONEME_TEMPLATE.format(
+                text, "".join(score_spans[start:end]), "".join(letter_spans[start:end])))
+    return {
+        'words': f'<div class="word-analysis">{"".join(words)}</div>',
+        'phonemes': f'<div class="phoneme-analysis">{"".join(blocks)}</div>' if blocks else ""
+    }
+
+
+def build_reference_html(words_with_romaji):
+    spans = "".join([f'<span class="japanese-word" title="{_escape(romaji)}">{_escape(word)}</span>'
+                     for word, romaji in words_with_romaji])
+    return f'<div class="reference-text">{spans}</div>'
+
+
+def build_score_cards_html(scores):
+    """All (label, score) cards in one flex row that wraps on narrow screens"""
+    cards = "".join([SCORE_CARD_TEMPLATE.format(
+        "success-card" if score >= 80 else "warning-card" if score >= 60 else "error-card", escape(label), score)
+        for label, score in scores])
+    return f'<div class="metric-row">{cards}</div>'
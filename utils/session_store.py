@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from config import *
+from utils.metrics import count_error, set_gauge
+
+
+def estimate_size(value):
+    """Approximate bytes held by a stored value; objects can report their own via memory_bytes()"""
+    if hasattr(value, 'memory_bytes'):
+        return value.memory_bytes()
+    if hasattr(value, 'raw_data'):  # pydub AudioSegment
+        return len(value.raw_data) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def close_values(values):
+    """Release what stored values hold besides memory, such as an unfinished live recognition"""
+    for value in values:
+        close = getattr(value, 'close', None)
+        if close is None:
+            continue
+        try:
+            close()
+        except Exception:
+            count_error("session_close")
+
+
+def _close_entries(entries):
+    close_values([value for value, _, _ in list(entries.values())])
+
+
+class SessionStore:
+    """Size-bounded LRU for the large values of one browser session.
+
+    Generated audio, results and live recordings live here instead of directly
+    in st.session_state, so a long session keeps only its most recently used
+    entries within SESSION_MEMORY_BUDGET and SESSION_MAX_ENTRIES. Values with
+    a close() method are closed when evicted, replaced, or when the session
+    ends.
+    """
+
+    def __init__(self, max_bytes=SESSION_MEMORY_BUDGET, max_entries=SESSION_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size, last access)
+        self._lock = threading.Lock()
+        _registry.add(self)
+        weakref.finalize(self, _close_entries, self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries[key] = (entry[0], entry[1], time.monotonic())
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        released = []
+        with self._lock:
+            if key in self._entries:
+                old_value, old_size, _ = self._entries.pop(key)
+                self.total_bytes -= old_size
+                if old_value is not value:
+                    released.append(old_value)
+            self._entries[key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            # The entry just stored is never evicted, even if it alone exceeds the budget
+            while len(self._entries) > 1 and (self.total_bytes > self.max_bytes or
+                                              len(self._entries) > self.max_entries):
+                released.append(self._evict_oldest())
+        close_values(released)
+        _registry.enforce()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.total_bytes -= entry[1]
+            return entry[0]
+
+    def resize(self, key):
+        """Re-measure an entry that grew in place, such as a recording in progress"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            size = estimate_size(entry[0])
+            self.total_bytes += size - entry[1]
+            self._entries[key] = (entry[0], size, entry[2])
+        _registry.enforce()
+
+    def oldest_access(self):
+        with self._lock:
+            if len(self._entries) <= 1:
+                return None
+            return next(iter(self._entries.values()))[2]
+
+    def _evict_oldest(self):
+        _, (value, size, _) = self._entries.popitem(last=False)
+        self.total_bytes -= size
+        self.evictions += 1
+        return value
+
+    def evict_oldest(self):
+        with self._lock:
+            if len(self._entries) <= 1:
+                return
+            value = self._evict_oldest()
+        close_values([value])
+
+
+class _SessionRegistry:
+    """Every live SessionStore in this process, to enforce SESSION_MEMORY_PROCESS_BUDGET"""
+
+    def __init__(self, max_bytes=SESSION_MEMORY_PROCESS_BUDGET):
+        self.max_bytes = max_bytes
+        self._stores = weakref.WeakSet()  # stores disappear with their sessions
+        self._lock = threading.Lock()
+
+    def add(self, store):
+        with self._lock:
+            self._stores.add(store)
+
+    def stats(self):
+        with self._lock:
+            stores = list(self._stores)
+        return {
+            'sessions': len(stores),
+            'total_bytes': sum(store.total_bytes for store in stores),
+            'largest_session_bytes': max((store.total_bytes for store in stores), default=0),
+            'evictions': sum(store.evictions for store in stores)
+        }
+
+    def enforce(self):
+        """Evict the least recently used entries across all sessions until under the process budget"""
+        with self._lock:
+            stores = list(self._stores)
+            total = sum(store.total_bytes for store in stores)
+            while total > self.max_bytes:
+                candidates = [(store.oldest_access(), id(store), store) for store in stores]
+                candidates = [c for c in candidates if c[0] is not None]
+                if not candidates:
+                    break
+                store = min(candidates)[2]
+                before = store.total_bytes
+                store.evict_oldest()
+                total -= before - store.total_bytes
+        set_gauge("session_memory_bytes", total)
+        set_gauge("sessions", len(stores))
+
+
+_registry = _SessionRegistry()
+
+
+def get_session_stats():
+    """Memory held by all sessions of this replica, for the admin view and metrics"""
+    return _registry.stats()
@@ -0,0 +1,320 @@
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+from config import *
+from utils.metrics import count_error, observe, set_gauge
+from utils.speech_service import AzureSpeechBackend, RecognitionStream
+
+# Cancellation codes worth retrying on another endpoint; anything else (NoMatch, BadRequest) is final
+RETRYABLE_ERROR_CODES = {"ConnectionFailure", "ServiceTimeout", "ServiceError", "ServiceUnavailable",
+                         "RuntimeError", "AuthenticationFailure", "Forbidden"}
+NO_ENDPOINT_ERROR = "All speech endpoints are busy or unavailable, please try again shortly"
+NOT_CONFIGURED_ERROR = ("⚠️ Azure Speech Service not configured! Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION, "
+                        "or AZURE_SPEECH_ENDPOINTS, in secrets")
+
+
+def classify_result(result):
+    """Sort a result into ok, final (failed, but not the endpoint's fault), throttled or failed"""
+    if result.get('success'):
+        return "ok"
+    code = result.get('error_code')
+    if code == "TooManyRequests":
+        return "throttled"
+    if code in RETRYABLE_ERROR_CODES or (code is None and result.get('error', "").startswith("Assessment error")):
+        return "failed"
+    return "final"
+
+
+class SpeechEndpoint:
+    """One key/region (or local stand-in) with its limits and the router's view of its health"""
+
+    def __init__(self, name, backend="azure", max_concurrency=ROUTER_DEFAULT_CONCURRENCY, requests_per_minute=0,
+                 service_concurrency=None, **options):
+        self.name = name
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.options = options
+        if backend == "fake" and service_concurrency:
+            from utils.fake_backend import FakeServiceQuota
+            self.options['quota'] = FakeServiceQuota(service_concurrency)  # shared like a real key's limit
+
+        self.in_flight = 0
+        self.latency = None  # moving average of request seconds
+        self.failures = 0  # consecutive
+        self.open_until = 0.0
+        self.recent = deque()  # start times of requests within the last minute
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.circuit_opens = 0
+
+    def create_backend(self, locale, upload_format):
+        if self.backend == "fake":
+            from utils.fake_backend import FakeSpeechBackend
+            return FakeSpeechBackend(locale, upload_format=upload_format, **self.options)
+        return AzureSpeechBackend(locale, upload_format=upload_format, **self.options)
+
+    def circuit(self, now):
+        if now < self.open_until:
+            return "open"
+        return "half_open" if self.failures >= ROUTER_FAILURE_THRESHOLD else "closed"
+
+
+def load_endpoints():
+    """Endpoints from the AZURE_SPEECH_ENDPOINTS secret, plus the single AZURE_SPEECH_KEY/REGION pair"""
+    endpoints = []
+    for i, entry in enumerate(get_secret("AZURE_SPEECH_ENDPOINTS") or []):
+        entry = dict(entry)
+        name = entry.pop('name', None) or entry.get('region') or entry.get('host') or f"endpoint{i + 1}"
+        endpoints.append(SpeechEndpoint(name, **entry))
+    key, region = get_secret("AZURE_SPEECH_KEY"), get_secret("AZURE_SPEECH_REGION")
+    if key and region and not any(e.options.get('key') == key and e.options.get('region') == region
+                                  for e in endpoints):
+        endpoints.append(SpeechEndpoint(region, key=key, region=region))
+    return endpoints
+
+
+class SpeechRouter:
+    """Chooses an endpoint for each request and tracks how every endpoint is doing.
+
+    An endpoint is eligible while it is under its concurrency and per-minute
+    limits and its circuit is closed. Among eligible endpoints the choice is
+    random, weighted towards low recent latency and low load. A 429 backs an
+    endpoint off for ROUTER_THROTTLE_SECONDS; ROUTER_FAILURE_THRESHOLD
+    consecutive failures open its circuit for ROUTER_OPEN_SECONDS, after which
+    one trial request decides whether it closes again.
+    """
+
+    def __init__(self, endpoints, rng=None):
+        self.endpoints = list(endpoints)
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    def _eligible(self, endpoint, now):
+        if endpoint.in_flight >= endpoint.max_concurrency:
+            return False
+        circuit = endpoint.circuit(now)
+        if circuit == "open" or (circuit == "half_open" and endpoint.in_flight):
+            return False  # a half-open circuit lets a single trial request through
+        if endpoint.requests_per_minute:
+            while endpoint.recent and endpoint.recent[0] <= now - 60:
+                endpoint.recent.popleft()
+            if len(endpoint.recent) >= endpoint.requests_per_minute:
+                return False
+        return True
+
+    def _weight(self, endpoint):
+        latency = endpoint.latency if endpoint.latency is not None else ROUTER_INITIAL_LATENCY
+        latency *= 1 + endpoint.in_flight / endpoint.max_concurrency
+        return 1 / max(latency, 0.001) ** 2  # squared so traffic clearly favours the faster endpoints
+
+    def _choose(self, exclude, now):
+        candidates = [e for e in self.endpoints if e.name not in exclude and self._eligible(e, now)]
+        if not candidates:
+            return None
+        return self.rng.choices(candidates, weights=[self._weight(e) for e in candidates])[0]
+
+    def acquire(self, exclude=(), prefer=None):
+        """Reserve an endpoint for one request, or None if none is eligible; pair with release()"""
+        now = time.monotonic()
+        with self._lock:
+            endpoint = next((e for e in self.endpoints if e.name == prefer and e.name not in exclude
+                             and e.circuit(now) == "closed" and self._eligible(e, now)), None)
+            endpoint = endpoint or self._choose(exclude, now)
+            if endpoint is not None:
+                endpoint.in_flight += 1
+                endpoint.requests += 1
+                endpoint.recent.append(now)
+        return endpoint
+
+    def peek(self):
+        """The endpoint the next request would most likely use, for opening a connection early"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if self._eligible(e, now)]
+            return max(candidates, key=self._weight, default=None)
+
+    def release(self, endpoint, seconds, outcome):
+        """Record how a request went; seconds is None when it says nothing about service latency"""
+        now = time.monotonic()
+        with self._lock:
+            endpoint.in_flight -= 1
+            if outcome == "throttled":
+                endpoint.throttled += 1
+                endpoint.open_until = max(endpoint.open_until, now + ROUTER_THROTTLE_SECONDS)
+            elif outcome == "failed":
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= ROUTER_FAILURE_THRESHOLD:
+                    endpoint.open_until = now + ROUTER_OPEN_SECONDS
+                    endpoint.circuit_opens += 1
+            else:
+                endpoint.failures = 0
+                if seconds is not None:
+                    endpoint.latency = seconds if endpoint.latency is None else (
+                        ROUTER_LATENCY_DECAY * seconds + (1 - ROUTER_LATENCY_DECAY) * endpoint.latency)
+            unavailable = sum(e.circuit(now) == "open" for e in self.endpoints)
+        if seconds is not None:
+            observe(f"endpoint_{endpoint.name}", seconds, error=outcome in ("throttled", "failed"))
+        set_gauge("speech_endpoints", len(self.endpoints))
+        set_gauge("speech_endpoints_open", unavailable)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'name': e.name,
+                'circuit': e.circuit(now),
+                'in_flight': e.in_flight,
+                'latency': e.latency,
+                'requests': e.requests,
+                'errors': e.errors,
+                'throttled': e.throttled,
+                'circuit_opens': e.circuit_opens
+            } for e in self.endpoints]
+
+
+class RoutedSpeechBackend:
+    """Recognizer backend that sends each request to an endpoint chosen by a SpeechRouter.
+
+    A request that fails on one endpoint with a retryable error is sent again
+    to another, up to ROUTER_MAX_ATTEMPTS endpoints. Continuous assessment is
+    only retried while no segment has been yielded yet, and a live stream stays
+    on the endpoint it was opened on.
+    """
+
+    def __init__(self, locale, router=None, upload_format=AUDIO_UPLOAD_FORMAT):
+        self.locale = locale
+        self.router = router or get_speech_router()
+        self.upload_format = upload_format
+        self.bytes_sent = 0
+        self.healthy = True
+        self._backends = {}  # endpoint name -> backend of that endpoint for this assessor
+        self._warm = None  # endpoint name with an open connection
+
+    def _backend(self, endpoint):
+        backend = self._backends.get(endpoint.name)
+        if backend is None or not backend.healthy:
+            backend = self._backends[endpoint.name] = endpoint.create_backend(self.locale, self.upload_format)
+        return backend
+
+    def _no_endpoint_error(self):
+        return NO_ENDPOINT_ERROR if self.router.endpoints else NOT_CONFIGURED_ERROR
+
+    def _acquire(self, tried):
+        warm, self._warm = self._warm, None
+        endpoint = self.router.acquire(exclude=tried, prefer=warm)
+        if endpoint is not None:
+            tried.add(endpoint.name)
+        return endpoint
+
+    def prewarm(self):
+        endpoint = self.router.peek()
+        if endpoint is None:
+            return
+        try:
+            self._backend(endpoint).prewarm()
+            self._warm = endpoint.name
+        except Exception:
+            pass
+
+    def assess(self, audio_input, reference_text):
+        tried = set()
+        result = {'success': False, 'error': self._no_endpoint_error()}
+        for attempt in range(ROUTER_MAX_ATTEMPTS):
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                break
+            if attempt:
+                count_error("endpoint_failover")
+            started = time.perf_counter()
+            try:
+                backend = self._backend(endpoint)
+                result = backend.assess(audio_input, reference_text)
+                self.bytes_sent = backend.bytes_sent
+            except Exception as e:
+                result = {'success': False, 'error': f"Assessment error: {str(e)}"}
+            outcome = classify_result(result)
+            self.router.release(endpoint, time.perf_counter() - started, outcome)
+            if outcome in ("ok", "final"):
+                self.healthy = True
+                return result
+        self.healthy = False  # lets callers such as batch_assess back off before trying again
+        return result
+
+    def assess_continuous(self, audio_input, reference_text):
+        tried = set()
+        final = {'success': False, 'error': self._no_endpoint_error(), 'final': True}
+        for attempt in range(ROUTER_MAX_ATTEMPTS):
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                break
+            if attempt:
+                count_error("endpoint_failover")
+            started = time.perf_counter()
+            yielded, outcome = False, "final"
+            try:
+                backend = self._backend(endpoint)
+                for result in backend.assess_continuous(audio_input, reference_text):
+                    if result.get('final'):
+                        final = result
+                        break
+                    yielded = True
+                    yield result
+                self.bytes_sent = backend.bytes_sent
+                outcome = classify_result(final)
+            except Exception as e:
+                final = {'success': False, 'error': f"Assessment error: {str(e)}", 'final': True}
+                outcome = "failed"
+            finally:
+                self.router.release(endpoint, time.perf_counter() - started, outcome)
+            if outcome in ("ok", "final") or yielded:
+                break
+        self.healthy = classify_result(final) in ("ok", "final")
+        yield final
+
+    def open_stream(self, reference_text):
+        endpoint = self._acquire(set())
+        if endpoint is None:
+            raise RuntimeError(self._no_endpoint_error())
+        try:
+            recognition = self._backend(endpoint).open_stream(reference_text)
+        except Exception:
+            self.router.release(endpoint, None, "failed")
+            raise
+
+        outcome = ["final"]
+        once = threading.Lock()
+
+        def release():
+            if once.acquire(blocking=False):
+                self.router.release(endpoint, None, outcome[0])  # includes recording time, so no latency
+
+        def results():
+            try:
+                for result in recognition.results():
+                    if result.get('final'):
+                        outcome[0] = classify_result(result)
+                    yield result
+            finally:
+                release()
+
+        stream = RecognitionStream(recognition, results)
+        weakref.finalize(stream, release)  # an abandoned recording must not hold the slot forever
+        return stream
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_speech_router():
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = SpeechRouter(load_endpoints())
+        return _router
@@ -1,161 +1,487 @@
-import azure.cognitiveservices.speech as speechsdk
 import json
+import os
 import streamlit as st
-import openai
-import requests
 import re
+import queue
+import time
+import wave
 from config import *
-from utils.language_utils import fill_japanese_phonemes
+from utils.assessment_result import AssessmentResult
+from utils.http_client import SingleFlight, get_http_client
+from utils.lazy_import import lazy_import
+from utils.metrics import count_error, observe, span
+from utils.pcm_engine import encode_ogg_opus
 
+speechsdk = lazy_import("azure.cognitiveservices.speech")
+np = lazy_import("numpy")
 
-class PronunciationAssessment:
-    def __init__(self, language="Japanese"):
-        if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION:
-            st.error("⚠️ Azure Speech Service not configured!")
-            st.stop()
+_speech_requests = SingleFlight()
+
+
+def write_audio_to_stream(stream, audio_input, upload_format="pcm"):
+    """Feed audio into a push stream in small chunks and return the number of bytes sent.
+
+    PCM is written without copying the whole buffer; "ogg_opus" compresses it first.
+    """
+    if isinstance(audio_input, str):
+        if upload_format == "pcm":
+            sent = 0
+            with wave.open(audio_input, 'rb') as wav_file:
+                while True:
+                    frames = wav_file.readframes(AUDIO_CHUNK_FRAMES)
+                    if not frames:
+                        break
+                    stream.write(frames)
+                    sent += len(frames)
+            return sent
+        with wave.open(audio_input, 'rb') as wav_file:
+            audio_input = wav_file.readframes(wav_file.getnframes())
+
+    data = getattr(audio_input, 'raw_data', audio_input)
+    if upload_format == "ogg_opus":
+        with span("upload_encode"):
+            data = encode_ogg_opus(np.frombuffer(data, dtype='<i2'))
+    data = memoryview(data)
+    chunk_size = AUDIO_CHUNK_FRAMES * 2  # 200 ms of 16-bit mono PCM per write
+    for start in range(0, len(data), chunk_size):
+        stream.write(data[start:start + chunk_size].tobytes())
+    return len(data)
+
+
+def weighted_pronunciation_score(accuracy, completeness, fluency, prosody=None):
+    """Same weighting Azure applies to its overall score: the weakest component counts double"""
+    if prosody is not None:
+        ranked = sorted([accuracy, prosody, completeness, fluency])
+        return ranked[0] * 0.4 + ranked[1] * 0.2 + ranked[2] * 0.2 + ranked[3] * 0.2
+    ranked = sorted([accuracy, completeness, fluency])
+    return ranked[0] * 0.6 + ranked[1] * 0.2 + ranked[2] * 0.2
+
+
+def aggregate_segment_results(segments, reference_text, separator=" "):
+    """Combine continuous-recognition segments into one result for the whole clip"""
+    durations = [max(segment['duration'], 1) for segment in segments]
+
+    def duration_weighted(key):
+        scored = [(segment[key], d) for segment, d in zip(segments, durations) if segment.get(key) is not None]
+        if not scored:
+            return None
+        return sum(score * d for score, d in scored) / sum(d for _, d in scored)
+
+    words = []
+    for segment in segments:
+        nbest = segment['detailed_result'].get('NBest') or [{}]
+        words.extend(nbest[0].get('Words', []))
+
+    # Accuracy is a per-word average so long segments count by how much was said in them
+    spoken = [w for w in words if w.get('PronunciationAssessment', {}).get('ErrorType', 'None') not in ('Insertion', 'Omission')]
+    if spoken:
+        accuracy = sum(w['PronunciationAssessment'].get('AccuracyScore', 0) for w in spoken) / len(spoken)
+    else:
+        accuracy = duration_weighted('accuracy_score')
+
+    # Per-segment completeness only covers that segment, so measure matched characters against the full text
+    reference_chars = sum(1 for c in reference_text if c.isalnum())
+    matched_chars = sum(sum(1 for c in w.get('Word', '') if c.isalnum()) for w in spoken)
+    if reference_chars:
+        completeness = min(100.0, 100.0 * matched_chars / reference_chars)
+    else:
+        completeness = duration_weighted('completeness_score')
+
+    fluency = duration_weighted('fluency_score')
+    prosody = duration_weighted('prosody_score')
+
+    pronunciation = weighted_pronunciation_score(accuracy, completeness, fluency, prosody)
+
+    recognized_text = separator.join(segment['recognized_text'] for segment in segments)
+    return {
+        'success': True,
+        'recognized_text': recognized_text,
+        'accuracy_score': accuracy,
+        'fluency_score': fluency,
+        'completeness_score': completeness,
+        'prosody_score': prosody,
+        'pronunciation_score': pronunciation,
+        'offset': segments[0]['offset'],
+        'duration': segments[-1]['offset'] + segments[-1]['duration'] - segments[0]['offset'],
+        'segment_count': len(segments),
+        'detailed_result': {'DisplayText': recognized_text, 'NBest': [{'Words': words}]}
+    }
+
+
+def word_separator(locale):
+    """Text between recognized words and segments: none for Japanese and Chinese"""
+    return "" if locale.split("-")[0] in ("ja", "zh") else " "
+
+
+def collect_segments(backend, events, reference_text, started, parse_segment=None):
+    """Consume the event queue of a continuous recognition, for every backend.
+
+    Events are ('recognized', segment), ('canceled', error result) and
+    ('stopped', None); parse_segment turns a queued segment into its result
+    dict. Yields each segment, then the aggregated result (or the error) with
+    'final' set.
+    """
+    segments = []
+    try:
+        while True:
+            kind, payload = events.get(timeout=MAX_RECORDING_DURATION + CONTINUOUS_RESULT_TIMEOUT)
+            if kind == 'recognized':
+                segment = parse_segment(payload) if parse_segment else payload
+                segment['segment_index'] = len(segments)
+                segments.append(segment)
+                yield segment
+            elif kind == 'canceled':
+                observe("recognition", time.perf_counter() - started, error=True)
+                yield dict(payload, final=True)
+                return
+            else:
+                break  # end of stream or session stopped
+    except queue.Empty:
+        backend.healthy = False
+        count_error("recognition")
+        yield {'success': False, 'error': "Assessment error: timed out waiting for results", 'final': True}
+        return
+
+    observe("recognition", time.perf_counter() - started, error=not segments)
+    if not segments:
+        yield {'success': False, 'error': "Recognition failed: no speech recognized", 'final': True}
+        return
+    separator = word_separator(backend.locale)
+    yield dict(aggregate_segment_results(segments, reference_text, separator), final=True)
+
+
+class RecognitionStream:
+    """Recognition that runs while audio is still being recorded.
+
+    write() pushes 16 kHz mono 16-bit PCM chunks as they arrive, close() marks
+    the end of the recording, and results() yields each segment and then the
+    aggregated result with 'final' set, like assess_pronunciation_continuous().
+    """
+
+    def __init__(self, stream, results):
+        self._stream = stream
+        self._results = results
+        self.bytes_sent = 0
+
+    def write(self, pcm):
+        self._stream.write(bytes(pcm))
+        self.bytes_sent += len(pcm)
+
+    def close(self):
+        self._stream.close()
+
+    def results(self):
+        return self._results()
 
-        self.language = language
-        self.locale = LANGUAGE_CONFIG[language]["locale"]
 
-        self.speech_config = speechsdk.SpeechConfig(AZURE_SPEECH_KEY, AZURE_SPEECH_REGION)
+class AzureSpeechBackend:
+    """Recognizer backend that streams audio to the Azure Speech service"""
+
+    def __init__(self, locale, key=None, region=None, host=None, upload_format=AUDIO_UPLOAD_FORMAT):
+        self.locale = locale
+
+        if host:  # e.g. ws://localhost:5000 for a speech container, where the key is optional
+            self.speech_config = speechsdk.SpeechConfig(host=host, subscription=key)
+        elif key and region:
+            self.speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
+        else:
+            raise ValueError("Azure Speech endpoint needs a key and region, or a host")
         self.speech_config.speech_recognition_language = self.locale
 
-    def assess_pronunciation(self, audio_file_path, reference_text):
+        self.upload_format = upload_format
+        self.bytes_sent = 0
+        self.healthy = True
+        self._warm = None
+
+    def _create_stream(self):
+        if self.upload_format == "ogg_opus":
+            stream_format = speechsdk.audio.AudioStreamFormat(
+                compressed_stream_format=speechsdk.AudioStreamContainerFormat.OGG_OPUS)
+            return speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+        return speechsdk.audio.PushAudioInputStream()
+
+    def _create_stream_recognizer(self):
+        stream = self._create_stream()
+        try:
+            return stream, speechsdk.SpeechRecognizer(self.speech_config, speechsdk.audio.AudioConfig(stream=stream))
+        except RuntimeError:
+            if self.upload_format == "pcm":
+                raise
+            # The compressed codec needs GStreamer; send PCM rather than fail every assessment
+            self.upload_format = "pcm"
+            return self._create_stream_recognizer()
+
+    def prewarm(self):
+        """Open the service connection ahead of the next assessment"""
         try:
-            audio_config = speechsdk.audio.AudioConfig(filename=audio_file_path)
+            stream, recognizer = self._create_stream_recognizer()
+            connection = speechsdk.Connection.from_recognizer(recognizer)
+            connection.open(False)
+            self._warm = (stream, recognizer, connection)
+        except Exception:
+            self._warm = None
+
+    def _create_recognizer(self, audio_input):
+        warm, self._warm = self._warm, None
+        if warm is not None:
+            stream, recognizer, _ = warm
+        elif isinstance(audio_input, str) and self.upload_format == "pcm":
+            self.bytes_sent = os.path.getsize(audio_input)
+            return speechsdk.SpeechRecognizer(self.speech_config, speechsdk.audio.AudioConfig(filename=audio_input))
+        else:
+            stream, recognizer = self._create_stream_recognizer()
+
+        try:
+            self.bytes_sent = write_audio_to_stream(stream, audio_input, self.upload_format)
+        finally:
+            stream.close()
+        return recognizer
+
+    def _create_pronunciation_config(self, reference_text):
+        pronunciation_config = speechsdk.PronunciationAssessmentConfig(
+            reference_text=reference_text,
+            grading_system=getattr(speechsdk.PronunciationAssessmentGradingSystem, GRADING_SYSTEM),
+            granularity=getattr(speechsdk.PronunciationAssessmentGranularity, GRANULARITY),
+            enable_miscue=ENABLE_MISCUE
+        )
 
-            pronunciation_config = speechsdk.PronunciationAssessmentConfig(
-                reference_text=reference_text,
-                grading_system=getattr(speechsdk.PronunciationAssessmentGradingSystem, GRADING_SYSTEM),
-                granularity=getattr(speechsdk.PronunciationAssessmentGranularity, GRANULARITY),
-                enable_miscue=ENABLE_MISCUE
-            )
+        if ENABLE_PROSODY:
+            pronunciation_config.enable_prosody_assessment()
+        return pronunciation_config
 
-            if ENABLE_PROSODY:
-                pronunciation_config.enable_prosody_assessment()
+    def _parse_recognized(self, result):
+        pronunciation_result = speechsdk.PronunciationAssessmentResult(result)
+        json_result = result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonResult)
+        detailed_result = json.loads(json_result) if json_result else {}
 
-            speech_recognizer = speechsdk.SpeechRecognizer(self.speech_config, audio_config)
-            pronunciation_config.apply_to(speech_recognizer)
+        return {
+            'success': True,
+            'recognized_text': result.text,
+            'accuracy_score': pronunciation_result.accuracy_score,
+            'fluency_score': pronunciation_result.fluency_score,
+            'completeness_score': pronunciation_result.completeness_score,
+            'prosody_score': pronunciation_result.prosody_score if ENABLE_PROSODY else None,
+            'pronunciation_score': pronunciation_result.pronunciation_score,
+            'offset': result.offset,
+            'duration': result.duration,
+            'detailed_result': detailed_result
+        }
+
+    def _parse_canceled(self, cancellation_details):
+        # This block provides detailed error information for cancellations.
+        error_message = f"Recognition Canceled: {cancellation_details.reason}. "
+        if cancellation_details.reason == speechsdk.CancellationReason.Error:
+            error_message += f"Error Details: {cancellation_details.error_details}"
+            self.healthy = False
+            # e.g. TooManyRequests or ConnectionFailure, so the router can tell throttling from other errors
+            return {'success': False, 'error': error_message, 'error_code': cancellation_details.code.name}
+        return {'success': False, 'error': error_message}
+
+    def assess(self, audio_input, reference_text):
+        try:
+            with span("sdk_setup"):
+                speech_recognizer = self._create_recognizer(audio_input)
+                self._create_pronunciation_config(reference_text).apply_to(speech_recognizer)
 
-            result = speech_recognizer.recognize_once()
+            with span("recognition"):
+                result = speech_recognizer.recognize_once()
 
             if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                pronunciation_result = speechsdk.PronunciationAssessmentResult(result)
-                json_result = result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_JsonResult)
-                detailed_result = json.loads(json_result) if json_result else {}
-
-                return {
-                    'success': True,
-                    'recognized_text': result.text,
-                    'accuracy_score': pronunciation_result.accuracy_score,
-                    'fluency_score': pronunciation_result.fluency_score,
-                    'completeness_score': pronunciation_result.completeness_score,
-                    'pronunciation_score': pronunciation_result.pronunciation_score,
-                    'detailed_result': detailed_result
-                }
+                with span("json_parse"):
+                    return self._parse_recognized(result)
             elif result.reason == speechsdk.ResultReason.Canceled:
-                # This block provides detailed error information for cancellations.
-                cancellation_details = result.cancellation_details
-                error_message = f"Recognition Canceled: {cancellation_details.reason}. "
-                if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                    error_message += f"Error Details: {cancellation_details.error_details}"
-                return {'success': False, 'error': error_message}
+                count_error("recognition")
+                return self._parse_canceled(result.cancellation_details)
             else:
                 # Handles other failure reasons like NoMatch
+                count_error("recognition")
                 return {'success': False, 'error': f"Recognition failed: {result.reason}"}
 
         except Exception as e:
+            self.healthy = False
+            count_error("recognition")
             return {'success': False, 'error': f"Assessment error: {str(e)}"}
 
+    def _start_continuous(self, speech_recognizer, reference_text):
+        self._create_pronunciation_config(reference_text).apply_to(speech_recognizer)
+        events = queue.Queue()
+
+        def recognized(evt):
+            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:  # not NoMatch on a silent stretch
+                events.put(('recognized', evt.result))
+
+        def canceled(evt):
+            if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+                events.put(('canceled', self._parse_canceled(evt.cancellation_details)))
+            else:
+                events.put(('stopped', None))  # end of stream
+
+        speech_recognizer.recognized.connect(recognized)
+        speech_recognizer.canceled.connect(canceled)
+        speech_recognizer.session_stopped.connect(lambda evt: events.put(('stopped', None)))
+        speech_recognizer.start_continuous_recognition()
+        return events
+
+    def _parse_segment(self, result):
+        with span("json_parse"):
+            return self._parse_recognized(result)
+
+    def _continuous_results(self, speech_recognizer, events, reference_text, started):
+        try:
+            yield from collect_segments(self, events, reference_text, started, self._parse_segment)
+        except Exception as e:
+            self.healthy = False
+            count_error("recognition")
+            yield {'success': False, 'error': f"Assessment error: {str(e)}", 'final': True}
+        finally:
+            speech_recognizer.stop_continuous_recognition()
+
+    def assess_continuous(self, audio_input, reference_text):
+        started = time.perf_counter()
+        try:
+            with span("sdk_setup"):
+                speech_recognizer = self._create_recognizer(audio_input)
+                events = self._start_continuous(speech_recognizer, reference_text)
+        except Exception as e:
+            self.healthy = False
+            count_error("recognition")
+            yield {'success': False, 'error': f"Assessment error: {str(e)}", 'final': True}
+            return
+        yield from self._continuous_results(speech_recognizer, events, reference_text, started)
+
+    def open_stream(self, reference_text):
+        with span("sdk_setup"):
+            warm, self._warm = self._warm, None
+            if warm is not None and self.upload_format == "pcm":
+                stream, recognizer, _ = warm
+            else:
+                # Live chunks arrive as PCM, so this stream is never compressed
+                stream = speechsdk.audio.PushAudioInputStream()
+                recognizer = speechsdk.SpeechRecognizer(self.speech_config, speechsdk.audio.AudioConfig(stream=stream))
+            events = self._start_continuous(recognizer, reference_text)
+        return RecognitionStream(
+            stream, lambda: self._continuous_results(recognizer, events, reference_text, time.perf_counter()))
+
+
+def create_backend(name, locale, **options):
+    """Recognizer backend by name: "azure" (routed over all configured endpoints), or "fake" for load tests"""
+    if name == "fake":
+        from utils.fake_backend import FakeSpeechBackend
+        return FakeSpeechBackend(locale, **options)
+    if name != "azure":
+        raise ValueError(f"Unknown recognizer backend: {name}")
+    from utils.speech_router import RoutedSpeechBackend
+    return RoutedSpeechBackend(locale, **options)
+
+
+class PronunciationAssessment:
+    def __init__(self, language="Japanese", backend=RECOGNIZER_BACKEND, **backend_options):
+        self.language = language
+        self.locale = LANGUAGE_CONFIG[language]["locale"]
+        self.backend = create_backend(backend, self.locale, **backend_options)
+
+    @property
+    def healthy(self):
+        return self.backend.healthy
+
+    @healthy.setter
+    def healthy(self, value):
+        self.backend.healthy = value
+
+    def prewarm(self):
+        """Open the service connection ahead of the next assessment"""
+        self.backend.prewarm()
+
+    def assess_pronunciation(self, audio_input, reference_text):
+        """Assess a WAV file path, or 16 kHz mono 16-bit PCM given as an AudioSegment or bytes"""
+        return self.backend.assess(audio_input, reference_text)
+
+    def assess_pronunciation_continuous(self, audio_input, reference_text):
+        """Assess the whole clip segment by segment.
+
+        Yields each recognized segment as soon as it arrives, then the aggregated
+        result for the whole clip with 'final' set to True.
+        """
+        return self.backend.assess_continuous(audio_input, reference_text)
+
+    def assess_recording(self, audio_input, reference_text, on_segment=None):
+        """Assess a whole recording of any length and return the aggregated result.
+
+        Continuous recognition is used even for short clips, because a single
+        recognize_once() stops at the first pause and would score only the words
+        before it. on_segment is called with each segment as it arrives.
+        """
+        for result in self.assess_pronunciation_continuous(audio_input, reference_text):
+            if result.pop('final', False):
+                return result
+            if on_segment is not None:
+                on_segment(result)
+        return {'success': False, 'error': "No result"}
+
+    def open_stream(self, reference_text):
+        """Start recognizing before the recording exists; see RecognitionStream"""
+        return self.backend.open_stream(reference_text)
+
     def get_word_level_assessment(self, detailed_result):
-        words_assessment = []
         try:
-            if 'NBest' in detailed_result and detailed_result['NBest']:
-                nbest = detailed_result['NBest'][0]
-                if 'Words' in nbest:
-                    for word_info in nbest['Words']:
-                        word = word_info.get('Word', '')
-                        phonemes = []
-
-                        # Get phonemes from Azure
-                        if 'Phonemes' in word_info:
-                            for phoneme in word_info['Phonemes']:
-                                phonemes.append({
-                                    'phoneme': phoneme.get('Phoneme', ''),
-                                    'accuracy_score': phoneme.get('PronunciationAssessment', {}).get('AccuracyScore', 0)
-                                })
-
-                        # Fill empty Japanese phonemes
-                        if self.language == "Japanese" and (not phonemes or all(p['phoneme'] == '' for p in phonemes)):
-                            japanese_phonemes = fill_japanese_phonemes(word)
-                            phonemes = [{'phoneme': p, 'accuracy_score': 85} for p in japanese_phonemes]
-
-                        words_assessment.append({
-                            'word': word,
-                            'accuracy_score': word_info.get('PronunciationAssessment', {}).get('AccuracyScore', 0),
-                            'error_type': word_info.get('PronunciationAssessment', {}).get('ErrorType', 'None'),
-                            'phonemes': phonemes
-                        })
+            return AssessmentResult.from_result({'detailed_result': detailed_result}, self.language).to_word_dicts()
         except Exception as e:
             st.warning(f"Could not extract word assessment: {str(e)}")
+            return []
 
-        return words_assessment
 
+# Language-specific voice selection
+VOICE_CONFIG = {
+    "Japanese": " --language ja",
+    "English": "",
+    "Mandarin": " --language zh --voice James Gao",
+    "Cantonese": " --language zh --voice River",
+    "German": " --language de"
+}
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def generate_speech_audio(text, language):
-    """Generate speech using POE API and return audio URL"""
-    if not POE_API_KEY:
-        return None
 
-    try:
-        # Language-specific voice selection
-        voice_config = {
-            "Japanese": " --language ja",
-            "English": "",
-            "Mandarin": " --language zh --voice James Gao",
-            "Cantonese": " --language zh --voice River",
-            "German": " --language de"
-        }
+def request_speech_url(text, language):
+    """Ask the POE API for speech audio and return its URL; raises on HTTP errors.
 
-        prompt = text # + voice_config.get(language, "")
+    Concurrent calls for the same text and language share a single upstream request.
+    """
+    return _speech_requests.do((text.strip(), language, TTS_MODEL), lambda: _request_speech_url(text, language))
 
-        headers = {
-            "Authorization": f"Bearer {POE_API_KEY}",
-            "Content-Type": "application/json"
-        }
 
-        data = {
-            "model": "ElevenLabs-v3",
-            "messages": [{"role": "user", "content": prompt.strip()}],
-            "stream": False
-        }
+def _request_speech_url(text, language):
+    poe_api_key = get_secret("POE_API_KEY")
+    if not poe_api_key:
+        return None
 
-        response = requests.post(
-            "https://api.poe.com/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
+    prompt = text # + VOICE_CONFIG.get(language, "")
 
-        response.raise_for_status()
-        result = response.json()
-        message = result.get('choices', [{}])[0].get('message', {})
+    headers = {
+        "Authorization": f"Bearer {poe_api_key}",
+        "Content-Type": "application/json"
+    }
 
-        # Check for attachments first
-        if 'attachments' in message:
-            for attachment in message['attachments']:
-                if attachment.get('content_type', '').startswith('audio/'):
-                    return attachment.get('url')
+    data = {
+        "model": TTS_MODEL,
+        "messages": [{"role": "user", "content": prompt.strip()}],
+        "stream": False
+    }
 
-        # Fallback: search for URL in content
-        content = message.get('content', '')
-        url_match = re.search(r'https?://[^\s]+', content)
-        if url_match:
-            return url_match.group(0)
+    response = get_http_client().post(TTS_API_URL, headers=headers, json=data)
 
-        return None
+    response.raise_for_status()
+    result = response.json()
+    message = result.get('choices', [{}])[0].get('message', {})
+
+    # Check for attachments first
+    if 'attachments' in message:
+        for attachment in message['attachments']:
+            if attachment.get('content_type', '').startswith('audio/'):
+                return attachment.get('url')
+
+    # Fallback: search for URL in content
+    content = message.get('content', '')
+    url_match = re.search(r'https?://[^\s]+', content)
+    if url_match:
+        return url_match.group(0)
 
-    except Exception as e:
-        st.error(f"Speech generation error: {str(e)}")
-        return None
\ No newline at end of file
+    return None
@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from config import *
+from utils.http_client import SingleFlight, get_http_client
+from utils.corpus import get_corpus
+from utils.speech_service import VOICE_CONFIG, request_speech_url
+
+AUDIO_EXTENSIONS = {"audio/mpeg": "mp3", "audio/mp3": "mp3", "audio/wav": "wav", "audio/x-wav": "wav",
+                    "audio/ogg": "ogg", "audio/webm": "webm", "audio/mp4": "m4a", "audio/aac": "aac"}
+
+
+class TTSAudioCache:
+    """Generated speech stored on disk by (text, language, voice, model), bounded by total size.
+
+    Files are written atomically and their mtime doubles as the last-access
+    time, so several server processes can share the directory.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._downloads = SingleFlight()
+        os.makedirs(directory, exist_ok=True)
+
+    def make_key(self, text, language):
+        settings = [text.strip(), language, VOICE_CONFIG.get(language, ""), TTS_MODEL]
+        return hashlib.sha256(json.dumps(settings, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get_path(self, text, language):
+        """Path of the cached audio file, or None"""
+        for path in glob.glob(os.path.join(self.directory, self.make_key(text, language) + ".*")):
+            try:
+                os.utime(path)  # mark as recently used
+                return path
+            except OSError:
+                continue  # evicted by another process
+        return None
+
+    def put(self, text, language, audio_bytes, content_type):
+        extension = AUDIO_EXTENSIONS.get(content_type.split(";")[0].strip(), "mp3")
+        path = os.path.join(self.directory, f"{self.make_key(text, language)}.{extension}")
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio_bytes)
+        os.replace(temp_path, path)
+        self._evict()
+        return path
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for path in glob.glob(os.path.join(self.directory, "*")):
+                if path.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def get_or_generate(self, text, language):
+        """Cached audio path, downloading it from the TTS provider on a miss"""
+        path = self.get_path(text, language)
+        if path:
+            return path
+        return self._downloads.do(self.make_key(text, language), lambda: self._download(text, language))
+
+    def _download(self, text, language):
+        path = self.get_path(text, language)  # another caller may have just finished it
+        if path:
+            return path
+
+        audio_url = request_speech_url(text, language)
+        if not audio_url:
+            return None
+        response = get_http_client().get(audio_url)
+        response.raise_for_status()
+        return self.put(text, language, response.content, response.headers.get("Content-Type", "audio/mpeg"))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_prefetch_started = False
+
+
+def get_tts_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSAudioCache()
+        return _cache
+
+
+def get_speech_audio(text, language):
+    """Local path of generated speech for `text`, served from disk when available"""
+    try:
+        return get_tts_cache().get_or_generate(text, language)
+    except Exception as e:
+        st.error(f"Speech generation error: {str(e)}")
+        return None
+
+
+def prefetch_sample_audio():
+    """Generate audio for the first page of practice texts of every level in the background, once per process"""
+    global _prefetch_started
+    with _cache_lock:
+        if _prefetch_started or not TTS_PREFETCH_ON_STARTUP or not get_secret("POE_API_KEY"):
+            return
+        _prefetch_started = True
+
+    cache = get_tts_cache()
+
+    def fetch(text, language):
+        try:
+            cache.get_or_generate(text, language)
+        except Exception:
+            pass  # the learner can still generate it on demand
+
+    def submit_all():
+        # Indexing a corpus the first time can take a while, so it happens here rather than in the page
+        executor = ThreadPoolExecutor(max_workers=TTS_PREFETCH_WORKERS, thread_name_prefix="tts-prefetch")
+        for language in LANGUAGE_CONFIG:
+            corpus = get_corpus(language)
+            for level in CORPUS_LEVELS:
+                for text in corpus.search(level=level)[0]:
+                    executor.submit(fetch, text, language)
+        executor.shutdown(wait=False)
+
+    threading.Thread(target=submit_all, name="tts-prefetch-plan", daemon=True).start()